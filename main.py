@@ -1,8 +1,18 @@
+import asyncio
 import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import orjson
 
 from WikidataTextifier.src import JSONNormalizer, LazyLabelFactory, WikidataLabel
 
+from src.batchRetry import retry_batch
+from src.deadLetter import DeadLetterStore
 from src.JinaAI import JinaAIAPIEmbedder, JinaAITokenizer
+from src.lazyEntity import materialize_entity
 from src.WikidataDumpReader import WikidataDumpReader
 from src.WikidataFilter import WikidataItemFilter, WikidataPropertyFilter
 from src.WikidataJSONCleaner import WikidataJSONCleaner
@@ -12,8 +22,10 @@ from src.utils import (
     extract_instanceof,
     extract_pids,
 )
+from src.metricsExport import MetricsExporter
 from src.runStats import RunStatsTracker
 from src.wikidataHuggingFace import WikidataHFDatasetPublisher
+from src.wikidataParquetCache import WikidataParquetCache
 from src.wikidataVectorCache import WikidataVectorCache
 from src.wikidataVectorDB import AstraDBConnect
 
@@ -21,10 +33,32 @@ from src.wikidataVectorDB import AstraDBConnect
 # ---- Runtime config ----
 READER_QUEUE_SIZE = int(os.environ.get("READER_QUEUE_SIZE", 128))
 READER_BATCH_SIZE = int(os.environ.get("READER_BATCH_SIZE", 16))
+READER_BATCH_KB = int(os.environ.get("READER_BATCH_KB", 0))
+READER_QUEUE_MB = int(os.environ.get("READER_QUEUE_MB", 0))
+HEAVY_LINE_MB = float(os.environ.get("HEAVY_LINE_MB", 0))
+HEAVY_PROCESSES = int(os.environ.get("HEAVY_PROCESSES", 1))
+HEAVY_MEMORY_MB = int(os.environ.get("HEAVY_MEMORY_MB", 0))
+RETRY_STRATEGY = os.environ.get("RETRY_STRATEGY", "bisect")
+MAX_CONSUMER_RESTARTS = int(os.environ.get("MAX_CONSUMER_RESTARTS", 0))
+MAX_BATCH_ATTEMPTS = int(os.environ.get("MAX_BATCH_ATTEMPTS", 2))
+READER_STALL_TIMEOUT_S = float(os.environ.get("READER_STALL_TIMEOUT_S", 3600))
+ASYNC_BATCHES = int(os.environ.get("ASYNC_BATCHES", 1))
+ASYNC_PREPARE_THREADS = int(os.environ.get("ASYNC_PREPARE_THREADS", 2))
+CONSUMER_THREADS = int(os.environ.get("CONSUMER_THREADS", 1))
 NUM_PROCESSES = int(os.environ.get("NUM_PROCESSES", 4))
+MIN_PROCESSES = int(os.environ.get("MIN_PROCESSES", 0))
+AUTOSCALE_INTERVAL_S = float(os.environ.get("AUTOSCALE_INTERVAL_S", 30))
+PROGRESS_INTERVAL_S = float(os.environ.get("PROGRESS_INTERVAL_S", 60))
+NUM_PRODUCERS = int(os.environ.get("NUM_PRODUCERS", 1))
+GZIP_INDEX_SPACING_MB = int(os.environ.get("GZIP_INDEX_SPACING_MB", 128))
+READER_TRANSPORT = os.environ.get("READER_TRANSPORT", "queue")
+READER_SLOT_SIZE_MB = int(os.environ.get("READER_SLOT_SIZE_MB", 4))
 DUMP_PATH = os.environ.get("DUMP_PATH", "data/wd_dump.gz")
-LANG = os.environ.get("WD_LANG", os.environ.get("LANG", "en"))
-FALLBACK_LANG = os.environ.get("FALLBACK_LANG", LANG)
+WD_LANG = os.environ.get("WD_LANG", os.environ.get("LANG", "en"))
+WD_FALLBACK_LANG = os.environ.get("FALLBACK_LANG", WD_LANG)
+# Language of the running stage; the vector stages point it at each of their languages.
+LANG = WD_LANG
+FALLBACK_LANG = WD_FALLBACK_LANG
 WD_LANGS = tuple(lang.strip() for lang in os.environ.get("WD_LANGS", "").split(",") if lang.strip())
 
 JINA_API_PATH = os.environ.get("JINA_API_PATH", "./API_tokens/jina_api.json")
@@ -48,9 +82,59 @@ SAVE_LABELS = os.environ.get("SAVE_LABELS", "false").lower() == "true"
 DELETE_STALE_VECTORS = os.environ.get("DELETE_STALE_VECTORS", "false").lower() == "true"
 FORCE_DOWNLOAD_DUMP = os.environ.get("FORCE_DOWNLOAD_DUMP", "false").lower() == "true"
 RUN_STATS_PATH = os.environ.get("RUN_STATS_PATH", "data/run_stats.json")
+TELEMETRY_PATH = os.environ.get("TELEMETRY_PATH", "data/run_telemetry.jsonl")
+TELEMETRY_INTERVAL_S = float(os.environ.get("TELEMETRY_INTERVAL_S", 10))
+TELEMETRY_MAX_MB = int(os.environ.get("TELEMETRY_MAX_MB", 100))
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE", "")
+METRICS_INTERVAL_S = float(os.environ.get("METRICS_INTERVAL_S", 15))
+PROFILE = os.environ.get("PROFILE", "false").lower() in ("1", "true")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "data/profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 10))
+MEMORY_STATS = os.environ.get("MEMORY_STATS", "").lower()
+MEMORY_TOP_N = int(os.environ.get("MEMORY_TOP_N", 20))
+RESUME = os.environ.get("RESUME", "false").lower() == "true"
+# Checkpointing is opt-in: on a .gz/.bz2 dump it first builds an index of the dump,
+# a full extra decompression before the pass starts.
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR") or ("data/checkpoints" if RESUME else "")
+SINGLE_PASS = os.environ.get("SINGLE_PASS", "false").lower() == "true"
+LAZY_ENTITIES = os.environ.get("LAZY_ENTITIES", "false").lower() == "true"
+DEAD_LETTER_DIR = os.environ.get("DEAD_LETTER_DIR", "data/dead_letter")
+REPLAY_DEAD_LETTERS = os.environ.get("REPLAY_DEAD_LETTERS", "false").lower() == "true"
+
+VECTORDB_COUNTERS = (
+    "vector_input_items",
+    "vector_filtered_items",
+    "vector_update_items",
+    "vector_create_items",
+    "vector_candidate_docs",
+    "vector_created_docs",
+    "vector_updated_docs",
+    "vector_saved_docs",
+    "vector_cached_docs",
+)
+
+VECTORDB_SPANS = (
+    "item_filter",
+    "cache_filter",
+    "normalize",
+    "property_filter",
+    "label_resolution",
+    "tokenize_chunk",
+    "embed",
+    "astra_write",
+    "cache_write",
+)
 
 
 # ---- Process-local runtime state ----
+# Handler threads (CONSUMER_THREADS) and the worker threads of async consumers share
+# these objects. The vector cache opens one SQLAlchemy session per call, AstraDB calls
+# go through astrapy's thread-safe HTTP client and the Jina embedder posts without a
+# shared session; the tokenizer serializes its calls (a fast tokenizer is not safe to
+# call from several threads). Lazy initialization runs under RUNTIME_INIT_LOCK, so
+# threads never build the same client twice or see a half-initialized set.
+RUNTIME_INIT_LOCK = threading.Lock()
 TEXT_PROPERTY_FILTER = None
 TEXT_TOKENIZER = None
 VECTOR_ITEM_FILTER = None
@@ -58,12 +142,21 @@ VECTOR_EMBEDDER = None
 VECTORCACHE = None
 ASTRADB = None
 HF_PUBLISHER = None
+PREPARE_EXECUTOR = None
 LABEL_DB_READY = False
+LANGUAGE_STATES = {}
+FANOUT_SINKS = ()
 dump_reader = None
 STATS_TRACKER = None
+METRICS_EXPORTER = None
 
 
 # ---- Transformation steps ----
+def stage_span(name):
+    """Times a block of a batch handler as span `name` of the running stage."""
+    return STATS_TRACKER.span(name) if STATS_TRACKER is not None else nullcontext()
+
+
 def save_labels(items):
     data = {item["id"]: {"labels": item["labels"]} for item in items}
     if not data:
@@ -98,23 +191,31 @@ def item_to_text(item, label_factory=None):
         fallback_lang=FALLBACK_LANG,
         label_factory=label_factory,
     )
-    item = normalizer.normalize(
-        external_ids=False,
-        references=False,
-        all_ranks=False,
-        qualifiers=True,
-    )
+    with stage_span("normalize"):
+        item = normalizer.normalize(
+            external_ids=False,
+            references=False,
+            all_ranks=False,
+            qualifiers=True,
+        )
 
     if TEXT_PROPERTY_FILTER is None:
-        TEXT_PROPERTY_FILTER = WikidataPropertyFilter()
+        with RUNTIME_INIT_LOCK:
+            if TEXT_PROPERTY_FILTER is None:
+                TEXT_PROPERTY_FILTER = WikidataPropertyFilter()
     drop_claim_pids = PROPERTY_CONSTRAINT_PIDS if item.id.startswith("P") else ()
-    item = TEXT_PROPERTY_FILTER.sort_and_filter_textifier(item, drop_claim_pids=drop_claim_pids)
+    with stage_span("property_filter"):
+        item = TEXT_PROPERTY_FILTER.sort_and_filter_textifier(item, drop_claim_pids=drop_claim_pids)
 
-    label_factory.resolve_all()
+    with stage_span("label_resolution"):
+        label_factory.resolve_all()
 
     if TEXT_TOKENIZER is None:
-        TEXT_TOKENIZER = JinaAITokenizer()
-    chunks = chunk_item_text(item, TEXT_TOKENIZER, max_length=1024, lang=LANG)
+        with RUNTIME_INIT_LOCK:
+            if TEXT_TOKENIZER is None:
+                TEXT_TOKENIZER = JinaAITokenizer()
+    with stage_span("tokenize_chunk"):
+        chunks = chunk_item_text(item, TEXT_TOKENIZER, max_length=1024, lang=LANG)
 
     return [
         {
@@ -144,7 +245,7 @@ def push_to_hf(items, label_factory=None):
     if label_factory is None:
         label_factory = LazyLabelFactory(lang=LANG, fallback_lang=FALLBACK_LANG)
 
-    rows = [item_to_json(item, label_factory=label_factory) for item in items]
+    rows = [item_to_json(materialize_entity(item), label_factory=label_factory) for item in items]
     pushed = HF_PUBLISHER.publish_wd_batch(rows)
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("wd_hf_rows", pushed)
@@ -162,7 +263,11 @@ def save_vectors_to_hf():
     return total
 
 
-def push_to_vectorDB(items, label_factory=None):
+def prepare_vector_docs(items, label_factory=None):
+    """
+    Filters a batch, checks it against the vector cache and textifies the entities
+    that changed. Returns (to_update_docs, to_create_docs).
+    """
     global VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB
 
     if any(x is None for x in (VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB)):
@@ -170,11 +275,13 @@ def push_to_vectorDB(items, label_factory=None):
 
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_input_items", len(items))
-    items = [item for item in items if VECTOR_ITEM_FILTER.filter(item)]
+    with stage_span("item_filter"):
+        items = [materialize_entity(item) for item in items if VECTOR_ITEM_FILTER.filter(item)]
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_filtered_items", len(items))
 
-    to_update, to_create = VECTORCACHE.filter_for_update(items)
+    with stage_span("cache_filter"):
+        to_update, to_create = VECTORCACHE.filter_for_update(items)
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_update_items", len(to_update))
         STATS_TRACKER.counter_add("vector_create_items", len(to_create))
@@ -183,7 +290,8 @@ def push_to_vectorDB(items, label_factory=None):
         changed_ids = {item['id'] for item in to_update + to_create}
         unchanged_ids = [item['id'] for item in items if item['id'] not in changed_ids]
         if unchanged_ids:
-            VECTORCACHE.touch_last_dump(unchanged_ids, DUMP_DATE)
+            with stage_span("cache_write"):
+                VECTORCACHE.touch_last_dump(unchanged_ids, DUMP_DATE)
 
     if label_factory is None:
         label_factory = LazyLabelFactory(lang=LANG, fallback_lang=FALLBACK_LANG)
@@ -195,7 +303,11 @@ def push_to_vectorDB(items, label_factory=None):
     to_create_docs = []
     for item in to_create:
         to_create_docs.extend(item_to_text(item, label_factory=label_factory))
+    return to_update_docs, to_create_docs
 
+
+def save_vector_docs(to_update_docs, to_create_docs):
+    """Embeds the documents, pushes them to AstraDB and records them in the vector cache."""
     all_docs = to_update_docs + to_create_docs
     if not all_docs:
         return 0
@@ -203,14 +315,16 @@ def push_to_vectorDB(items, label_factory=None):
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_candidate_docs", len(all_docs))
 
-    vectors = VECTOR_EMBEDDER.embed_documents([doc["content"] for doc in all_docs])
+    with stage_span("embed"):
+        vectors = VECTOR_EMBEDDER.embed_documents([doc["content"] for doc in all_docs])
     for doc, vector in zip(all_docs, vectors):
         doc["$vector"] = vector
 
-    created_ids = ASTRADB.create_documents(to_create_docs)
-    not_created_docs = [doc for doc in to_create_docs if doc["_id"] not in created_ids]
-    to_update_docs.extend(not_created_docs)
-    updated_ids = ASTRADB.update_documents(to_update_docs)
+    with stage_span("astra_write"):
+        created_ids = ASTRADB.create_documents(to_create_docs)
+        not_created_docs = [doc for doc in to_create_docs if doc["_id"] not in created_ids]
+        to_update_docs.extend(not_created_docs)
+        updated_ids = ASTRADB.update_documents(to_update_docs)
     all_ids = set(created_ids) | set(updated_ids)
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_created_docs", len(created_ids))
@@ -218,39 +332,156 @@ def push_to_vectorDB(items, label_factory=None):
         STATS_TRACKER.counter_add("vector_saved_docs", len(all_ids))
 
     to_cache = [doc for doc in all_docs if doc["_id"] in all_ids]
-    VECTORCACHE.add_astra_doc(to_cache, dump_date=DUMP_DATE)
+    with stage_span("cache_write"):
+        VECTORCACHE.add_astra_doc(to_cache, dump_date=DUMP_DATE)
     if STATS_TRACKER is not None:
         STATS_TRACKER.counter_add("vector_cached_docs", len(to_cache))
     return len(all_ids)
 
 
+def push_to_vectorDB(items, label_factory=None):
+    return save_vector_docs(*prepare_vector_docs(items, label_factory=label_factory))
+
+
+async def push_to_vectorDB_async(items, label_factory=None):
+    """
+    push_to_vectorDB for consumers running several batches at once (ASYNC_BATCHES).
+    Filtering, textification and tokenization run on a pool of ASYNC_PREPARE_THREADS
+    threads, so this CPU-bound step never blocks the event loop and at most that many
+    batches compete for the GIL with it. The Jina, AstraDB and cache calls run in the
+    loop's worker threads, so other batches proceed while they wait on the network.
+    """
+    global PREPARE_EXECUTOR
+
+    # Created on first use, in the consumer: executor threads do not survive a fork.
+    if PREPARE_EXECUTOR is None:
+        PREPARE_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, ASYNC_PREPARE_THREADS))
+    loop = asyncio.get_running_loop()
+    docs = await loop.run_in_executor(PREPARE_EXECUTOR, prepare_vector_docs, items, label_factory)
+    return await asyncio.to_thread(save_vector_docs, *docs)
+
+
+def push_to_sinks(items):
+    """
+    Hands one parsed batch to every sink of a single-pass run. Each sink runs with
+    its own language and counter scope, and a failing sink retries the batch on its
+    own (RETRY_STRATEGY), so one sink's errors never replay a batch into the others.
+    """
+    for sink in FANOUT_SINKS:
+        activate_language(sink["lang"], sink["fallback_lang"], enable_vector=sink["vector"])
+        if STATS_TRACKER is not None:
+            STATS_TRACKER.use_counter_scope(sink["scope"])
+
+        try:
+            sink["handler"](items)
+        except Exception as exc:
+            if STATS_TRACKER is not None:
+                STATS_TRACKER.counter_add("handler_errors", 1)
+            print(f"Sink {sink['scope']} failed, retrying ({RETRY_STRATEGY}): {exc}")
+            traceback.print_exc()
+
+            def item_failed(item, item_exc, sink=sink):
+                if STATS_TRACKER is not None:
+                    STATS_TRACKER.counter_add("handler_errors", 1)
+                print(f"Sink {sink['scope']} failed for {item.get('id')}: {item_exc}")
+                traceback.print_exception(type(item_exc), item_exc, item_exc.__traceback__)
+                sink["dead_letter"].add(item, item_exc, attempts=2)
+
+            retry_batch(sink["handler"], items, RETRY_STRATEGY, item_failed, exc=exc)
+
+    if STATS_TRACKER is not None:
+        STATS_TRACKER.use_counter_scope(None)
+
+
 # ---- Worker and batch handlers ----
 def init_worker(enable_vector=False):
     global LABEL_DB_READY
     global VECTORCACHE, ASTRADB
     global VECTOR_ITEM_FILTER, VECTOR_EMBEDDER
 
-    if not LABEL_DB_READY:
-        WikidataLabel.initialize_database()
-        LABEL_DB_READY = True
+    with RUNTIME_INIT_LOCK:
+        if not LABEL_DB_READY:
+            WikidataLabel.initialize_database()
+            LABEL_DB_READY = True
+
+        if enable_vector and any(x is None for x in (VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB)):
+            VECTOR_ITEM_FILTER = WikidataItemFilter(lang=LANG, fallback_lang=FALLBACK_LANG)
+            VECTOR_EMBEDDER = JinaAIAPIEmbedder(config_path=JINA_API_PATH)
+            VECTORCACHE = WikidataVectorCache(lang=LANG, data_dir="./data/Wikidata/")
+            ASTRADB = AstraDBConnect(lang=LANG, config_path=ASTRA_API_PATH)
+
+
+def preload_text_state():
+    """
+    Builds the read-only textification state (property filter and tokenizer) in the
+    parent before the reader forks, so consumers share it copy-on-write instead of
+    each loading the tokenizer and parsing property_sort.json.
+    """
+    global TEXT_PROPERTY_FILTER, TEXT_TOKENIZER
+
+    if TEXT_PROPERTY_FILTER is None:
+        TEXT_PROPERTY_FILTER = WikidataPropertyFilter()
+    if TEXT_TOKENIZER is None:
+        TEXT_TOKENIZER = JinaAITokenizer()
+
+
+def activate_language(lang, fallback_lang, enable_vector=False):
+    """
+    Points the process-local language globals at `lang`, so one consumer can serve
+    several languages in a single pass. Vector clients are created once per language
+    and process; the embedder is shared by all languages.
+    """
+    global LANG, FALLBACK_LANG
+    global VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB
 
-    if enable_vector and any(x is None for x in (VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB)):
-        VECTOR_ITEM_FILTER = WikidataItemFilter(lang=LANG, fallback_lang=FALLBACK_LANG)
+    LANG = lang
+    FALLBACK_LANG = fallback_lang
+    state = LANGUAGE_STATES.setdefault(lang, {})
+    if enable_vector and not state:
+        state.update({
+            "item_filter": WikidataItemFilter(lang=lang, fallback_lang=fallback_lang),
+            "vectorcache": WikidataVectorCache(lang=lang, data_dir="./data/Wikidata/"),
+            "astradb": AstraDBConnect(lang=lang, config_path=ASTRA_API_PATH),
+        })
+    if enable_vector and VECTOR_EMBEDDER is None:
         VECTOR_EMBEDDER = JinaAIAPIEmbedder(config_path=JINA_API_PATH)
-        VECTORCACHE = WikidataVectorCache(lang=LANG, data_dir="./data/Wikidata/")
-        ASTRADB = AstraDBConnect(lang=LANG, config_path=ASTRA_API_PATH)
+
+    VECTOR_ITEM_FILTER = state.get("item_filter")
+    VECTORCACHE = state.get("vectorcache")
+    ASTRADB = state.get("astradb")
 
 
 # ---- Orchestration ----
-def create_dump_reader():
+def create_dump_reader(threads_per_consumer=1):
     global FORCE_DOWNLOAD_DUMP, DUMP_DATE, HF_BRANCH, VECTOR_HF_BRANCH
 
     check_wdtextifier_stack()
+    if WikidataParquetCache.is_cache(DUMP_PATH):
+        raise ValueError(
+            f"DUMP_PATH={DUMP_PATH} is a Parquet dump cache, which lacks aliases, sitelink titles "
+            "and page metadata; only the stats and filter scripts read it. Point DUMP_PATH at the dump file."
+        )
     reader = WikidataDumpReader(
         DUMP_PATH,
         num_processes=NUM_PROCESSES,
+        min_processes=MIN_PROCESSES or None,
+        autoscale_interval_s=AUTOSCALE_INTERVAL_S,
+        progress_interval_s=PROGRESS_INTERVAL_S,
         queue_size=READER_QUEUE_SIZE,
         batch_size=READER_BATCH_SIZE,
+        num_producers=NUM_PRODUCERS,
+        index_spacing=GZIP_INDEX_SPACING_MB * 1024 * 1024,
+        transport=READER_TRANSPORT,
+        slot_size=READER_SLOT_SIZE_MB * 1024 * 1024,
+        batch_bytes=READER_BATCH_KB * 1024 or None,
+        queue_bytes=READER_QUEUE_MB * 1024 * 1024 or None,
+        heavy_line_bytes=int(HEAVY_LINE_MB * 1024 * 1024) or None,
+        heavy_processes=HEAVY_PROCESSES,
+        heavy_memory_bytes=HEAVY_MEMORY_MB * 1024 * 1024 or None,
+        retry_strategy=RETRY_STRATEGY,
+        threads_per_consumer=threads_per_consumer,
+        metrics=METRICS_EXPORTER,
+        stall_timeout_s=READER_STALL_TIMEOUT_S or None,
     )
 
     if FORCE_DOWNLOAD_DUMP or (not os.path.exists(DUMP_PATH)):
@@ -271,12 +502,75 @@ def create_dump_reader():
     return reader
 
 
+def checkpoint_path(name):
+    """Returns where the checkpoint of a pass is saved, or None without CHECKPOINT_DIR."""
+    if not CHECKPOINT_DIR:
+        return None
+    return f"{CHECKPOINT_DIR}/{name}.json"
+
+
+def profile_path(stage_name):
+    """Returns where the consumer profile of a stage is merged, or None without PROFILE."""
+    if not PROFILE:
+        return None
+    return f"{PROFILE_DIR}/{stage_name.replace(':', '_')}.collapsed"
+
+
+def collect_reader_stats(reader):
+    reader_stats = {
+        "entities_processed": int(reader.iterations.value),
+        "handler_errors": int(reader.handler_errors.value),
+        "prefiltered_lines": int(reader.prefiltered.value),
+        "consumer_restarts": int(reader.consumer_restarts.value),
+        "crashed_batches": int(reader.crashed_batches.value),
+    }
+    if reader.transport_stats:
+        reader_stats["transport"] = reader.transport_stats
+    if reader.progress is not None:
+        reader_stats["dump_progress"] = reader.progress.stats()
+    if reader.profile_stats is not None:
+        reader_stats["profile"] = reader.profile_stats
+    if reader.memory_report is not None:
+        reader_stats["memory"] = reader.memory_report
+    if reader.autoscale:
+        reader_stats["autoscaling"] = {
+            "min_processes": reader.min_processes,
+            "max_processes": reader.num_processes,
+            "final_processes": int(reader.active_consumers.value),
+            "peak_processes": max([reader.min_processes] + [e["consumers"] for e in reader.scaling_events]),
+            "events": reader.scaling_events,
+        }
+    if reader.heavy_processes:
+        busy_s = float(reader.heavy_busy_s.value)
+        heavy_entities = int(reader.heavy_entities.value)
+        reader_stats["heavy_lane"] = {
+            "entities": heavy_entities,
+            "bytes": int(reader.heavy_bytes.value),
+            "busy_s": round(busy_s, 3),
+            "entities_per_busy_s": round(heavy_entities / busy_s, 3) if busy_s else None,
+        }
+    return reader_stats
+
+
+def vector_languages():
+    """Returns the (lang, fallback_lang) pairs of the per-language vector stages."""
+    languages = WD_LANGS or (WD_LANG,)
+    default_fallback = WD_FALLBACK_LANG
+
+    return [
+        (lang, os.environ.get(f"FALLBACK_LANG_{lang.upper()}", default_fallback or lang))
+        for lang in languages
+    ]
+
+
 def reset_runtime_state():
-    global dump_reader, HF_PUBLISHER
+    global dump_reader, HF_PUBLISHER, LANGUAGE_STATES, FANOUT_SINKS
     global TEXT_PROPERTY_FILTER, TEXT_TOKENIZER
     global VECTOR_ITEM_FILTER, VECTOR_EMBEDDER, VECTORCACHE, ASTRADB
 
     dump_reader = None
+    LANGUAGE_STATES = {}
+    FANOUT_SINKS = ()
     HF_PUBLISHER = None
     TEXT_PROPERTY_FILTER = None
     TEXT_TOKENIZER = None
@@ -295,24 +589,33 @@ def run_labels_stage():
     reset_runtime_state()
     reader = create_dump_reader()
     counters = STATS_TRACKER.start_counters(("labels_saved",))
+    STATS_TRACKER.watch_stage(stage_name, reader)
     try:
         reader.run(
             save_labels,
             handler_receives_batch=True,
             init_consumer=init_worker,
             init_consumer_args=(False,),
+            checkpoint_path=checkpoint_path("labels"),
+            resume=RESUME,
+            lazy_entities=LAZY_ENTITIES,
+            dead_letter=DeadLetterStore(DEAD_LETTER_DIR, "labels"),
+            max_consumer_restarts=MAX_CONSUMER_RESTARTS,
+            max_batch_attempts=MAX_BATCH_ATTEMPTS,
+            profile_path=profile_path(stage_name),
+            profile_interval_s=PROFILE_INTERVAL_MS / 1000,
+            memory_stats=MEMORY_STATS or None,
+            memory_top_n=MEMORY_TOP_N,
         )
     except Exception as exc:
         STATS_TRACKER.record_error(stage_name, exc=exc)
         raise
     finally:
+        STATS_TRACKER.watch_stage(None)
         STATS_TRACKER.clear_counters()
 
     stage_stats = STATS_TRACKER.read_counters(counters)
-    stage_stats.update({
-        "entities_processed": int(reader.iterations.value),
-        "handler_errors": int(reader.handler_errors.value),
-    })
+    stage_stats.update(collect_reader_stats(reader))
     STATS_TRACKER.set_stage_stats("labels", stage_stats)
     STATS_TRACKER.record_error(stage_name, stage_stats["handler_errors"])
 
@@ -325,6 +628,7 @@ def run_wd_to_hf_stage():
     reset_runtime_state()
     reader = create_dump_reader()
     counters = STATS_TRACKER.start_counters(("wd_hf_rows",))
+    STATS_TRACKER.watch_stage(stage_name, reader)
     HF_PUBLISHER = WikidataHFDatasetPublisher(
         branch=HF_BRANCH,
         config_path=WD_HF_API_PATH,
@@ -340,11 +644,19 @@ def run_wd_to_hf_stage():
             handler_receives_batch=True,
             init_consumer=init_worker,
             init_consumer_args=(False,),
+            dead_letter=DeadLetterStore(DEAD_LETTER_DIR, "wd_to_hf"),
+            max_consumer_restarts=MAX_CONSUMER_RESTARTS,
+            max_batch_attempts=MAX_BATCH_ATTEMPTS,
+            profile_path=profile_path(stage_name),
+            profile_interval_s=PROFILE_INTERVAL_MS / 1000,
+            memory_stats=MEMORY_STATS or None,
+            memory_top_n=MEMORY_TOP_N,
         )
     except Exception as exc:
         STATS_TRACKER.record_error(stage_name, exc=exc)
         raise
     finally:
+        STATS_TRACKER.watch_stage(None)
         STATS_TRACKER.clear_counters()
         if HF_PUBLISHER is not None:
             HF_PUBLISHER.flush()
@@ -353,8 +665,7 @@ def run_wd_to_hf_stage():
     stage_stats.update({
         "branch": HF_BRANCH,
         "data_dir": f"data/{LANG}",
-        "entities_processed": int(reader.iterations.value),
-        "handler_errors": int(reader.handler_errors.value),
+        **collect_reader_stats(reader),
     })
     STATS_TRACKER.set_stage_stats("wd_to_hf", stage_stats)
     STATS_TRACKER.record_error(stage_name, stage_stats["handler_errors"])
@@ -363,15 +674,7 @@ def run_wd_to_hf_stage():
 def run_vectordb_stages():
     global LANG, FALLBACK_LANG, VECTOR_HF_BRANCH, HF_PUBLISHER, STATS_TRACKER
 
-    languages = WD_LANGS or (LANG,)
-    default_fallback = os.environ.get("FALLBACK_LANG", FALLBACK_LANG)
-
-    for lang in languages:
-        fallback = os.environ.get(
-            f"FALLBACK_LANG_{lang.upper()}",
-            default_fallback or lang,
-        )
-
+    for lang, fallback in vector_languages():
         print(f"Running vector stages for language={lang} (fallback={fallback})")
         LANG = lang
         FALLBACK_LANG = fallback
@@ -383,35 +686,41 @@ def run_vectordb_stages():
         })
 
         stage_name = f"vectordb:{lang}"
-        reader = create_dump_reader()
-        counters = STATS_TRACKER.start_counters((
-            "vector_input_items",
-            "vector_filtered_items",
-            "vector_update_items",
-            "vector_create_items",
-            "vector_candidate_docs",
-            "vector_created_docs",
-            "vector_updated_docs",
-            "vector_saved_docs",
-            "vector_cached_docs",
-        ))
+        # Handler threads share the consumer's tokenizer and clients. The single pass
+        # switches language globals per sink, so it always runs one thread.
+        reader = create_dump_reader(threads_per_consumer=CONSUMER_THREADS)
+        counters = STATS_TRACKER.start_counters(VECTORDB_COUNTERS)
+        timers = STATS_TRACKER.start_timers(VECTORDB_SPANS)
+        STATS_TRACKER.watch_stage(stage_name, reader)
         stage_exc = None
         try:
             reader.run(
-                push_to_vectorDB,
+                push_to_vectorDB_async if ASYNC_BATCHES > 1 else push_to_vectorDB,
                 handler_receives_batch=True,
                 init_consumer=init_worker,
                 init_consumer_args=(True,),
+                checkpoint_path=checkpoint_path(f"vectordb_{lang}"),
+                resume=RESUME,
+                line_prefilter=WikidataItemFilter(lang=LANG, fallback_lang=FALLBACK_LANG).prefilter,
+                lazy_entities=LAZY_ENTITIES,
+                dead_letter=DeadLetterStore(DEAD_LETTER_DIR, f"vectordb_{lang}"),
+                max_consumer_restarts=MAX_CONSUMER_RESTARTS,
+                max_batch_attempts=MAX_BATCH_ATTEMPTS,
+                max_inflight_batches=ASYNC_BATCHES,
+                init_before_fork=preload_text_state,
+                profile_path=profile_path(stage_name),
+                profile_interval_s=PROFILE_INTERVAL_MS / 1000,
+                memory_stats=MEMORY_STATS or None,
+                memory_top_n=MEMORY_TOP_N,
             )
         except Exception as exc:
             stage_exc = exc
             STATS_TRACKER.record_error(stage_name, exc=exc)
         finally:
+            STATS_TRACKER.watch_stage(None)
             vectordb_stats = STATS_TRACKER.read_counters(counters)
-            vectordb_stats.update({
-                "entities_processed": int(reader.iterations.value),
-                "handler_errors": int(reader.handler_errors.value),
-            })
+            vectordb_stats.update(collect_reader_stats(reader))
+            vectordb_stats["timings"] = STATS_TRACKER.read_timers(timers)
             lang_stats["vectordb"] = vectordb_stats
             STATS_TRACKER.record_error(stage_name, vectordb_stats["handler_errors"])
             STATS_TRACKER.clear_counters()
@@ -420,41 +729,155 @@ def run_vectordb_stages():
             raise stage_exc
 
         if DELETE_STALE_VECTORS:
-            cache = WikidataVectorCache(lang=LANG, data_dir="./data/Wikidata/")
-            stale_count = cache.count_stale(DUMP_DATE)
-            print(f"\nStale cache entries for '{lang}' (last_dump < {DUMP_DATE}): {stale_count}")
-            try:
-                confirmed = input("Delete these entries? [y/N]: ").strip().lower() == "y"
-            except EOFError:
-                confirmed = False
-            astra_deleted = 0
-            if confirmed:
-                astra = AstraDBConnect(lang=LANG, config_path=ASTRA_API_PATH)
-                for batch_ids in cache.iter_stale_batches(DUMP_DATE):
-                    astra_deleted += astra.delete_documents(batch_ids)
-                print(f"Deleted {astra_deleted} documents from AstraDB and {stale_count} entries from local cache.")
-            else:
-                print("Deletion skipped.")
-            lang_stats["stale_deletion"] = {
-                "stale_count": stale_count,
-                "confirmed": confirmed,
-                "astra_deleted": astra_deleted,
-            }
+            delete_stale_vectors(lang, lang_stats)
 
 
-def run_vectors_to_hf_stage():
+def delete_stale_vectors(lang, lang_stats):
+    cache = WikidataVectorCache(lang=lang, data_dir="./data/Wikidata/")
+    stale_count = cache.count_stale(DUMP_DATE)
+    print(f"\nStale cache entries for '{lang}' (last_dump < {DUMP_DATE}): {stale_count}")
+    try:
+        confirmed = input("Delete these entries? [y/N]: ").strip().lower() == "y"
+    except EOFError:
+        confirmed = False
+    astra_deleted = 0
+    if confirmed:
+        astra = AstraDBConnect(lang=lang, config_path=ASTRA_API_PATH)
+        for batch_ids in cache.iter_stale_batches(DUMP_DATE):
+            astra_deleted += astra.delete_documents(batch_ids)
+        print(f"Deleted {astra_deleted} documents from AstraDB and {stale_count} entries from local cache.")
+    else:
+        print("Deletion skipped.")
+    lang_stats["stale_deletion"] = {
+        "stale_count": stale_count,
+        "confirmed": confirmed,
+        "astra_deleted": astra_deleted,
+    }
 
-    global LANG, FALLBACK_LANG, VECTOR_HF_BRANCH, HF_PUBLISHER, STATS_TRACKER
 
-    languages = WD_LANGS or (LANG,)
-    default_fallback = os.environ.get("FALLBACK_LANG", FALLBACK_LANG)
+def run_single_pass_stage():
+    """
+    Runs the Wikidata -> HF pass and every per-language vector pass over a single
+    read of the dump. Labels must already be saved (run_labels_stage runs first).
+    """
+    global HF_PUBLISHER, FANOUT_SINKS, STATS_TRACKER
+
+    stage_name = "single_pass"
+    languages = vector_languages() if (SAVE_TO_VECTORDB or DELETE_STALE_VECTORS) else []
+    print(
+        "Running single pass for "
+        + ", ".join((["wd_to_hf"] if SAVE_WD_TO_HF else []) + [f"vectordb:{lang}" for lang, _ in languages])
+    )
+    reset_runtime_state()
+    reader = create_dump_reader()
+
+    sinks = []
+    if SAVE_WD_TO_HF:
+        HF_PUBLISHER = WikidataHFDatasetPublisher(
+            branch=HF_BRANCH,
+            config_path=WD_HF_API_PATH,
+            storage_chunk_size=HF_CHUNK_SIZE,
+            memory_chunk_size=HF_BATCH_SIZE,
+            queue_size=HF_QUEUE_SIZE,
+            data_dir=f"data/{LANG}",
+        )
+        sinks.append({
+            "scope": "wd_to_hf",
+            "lang": LANG,
+            "fallback_lang": FALLBACK_LANG,
+            "handler": push_to_hf,
+            "vector": False,
+            "dead_letter": DeadLetterStore(DEAD_LETTER_DIR, "wd_to_hf"),
+            "counters": ("wd_hf_rows", "handler_errors"),
+        })
+
+    for lang, fallback in languages:
+        sinks.append({
+            "scope": f"vectordb:{lang}",
+            "lang": lang,
+            "fallback_lang": fallback,
+            "handler": push_to_vectorDB,
+            "vector": True,
+            "dead_letter": DeadLetterStore(DEAD_LETTER_DIR, f"vectordb_{lang}"),
+            "counters": VECTORDB_COUNTERS + ("handler_errors",),
+        })
+
+    counters = {
+        sink["scope"]: STATS_TRACKER.start_counters(sink["counters"], scope=sink["scope"])
+        for sink in sinks
+    }
+    timers = {
+        sink["scope"]: STATS_TRACKER.start_timers(VECTORDB_SPANS, scope=sink["scope"])
+        for sink in sinks
+        if sink["vector"]
+    }
+    FANOUT_SINKS = tuple(sinks)
+    STATS_TRACKER.watch_stage(stage_name, reader)
 
-    for lang in languages:
-        fallback = os.environ.get(
-            f"FALLBACK_LANG_{lang.upper()}",
-            default_fallback or lang,
+    # The HF sink uploads asynchronously, so its offsets cannot be checkpointed.
+    pass_checkpoint = None
+    if not SAVE_WD_TO_HF:
+        pass_checkpoint = checkpoint_path(f"single_pass_{'_'.join(lang for lang, _ in languages)}")
+
+    stage_exc = None
+    try:
+        reader.run(
+            push_to_sinks,
+            handler_receives_batch=True,
+            init_consumer=init_worker,
+            init_consumer_args=(False,),
+            checkpoint_path=pass_checkpoint,
+            resume=RESUME,
+            lazy_entities=LAZY_ENTITIES,
+            # A batch that keeps crashing consumers is missing from every sink.
+            dead_letter=[sink["dead_letter"] for sink in sinks],
+            max_consumer_restarts=MAX_CONSUMER_RESTARTS,
+            max_batch_attempts=MAX_BATCH_ATTEMPTS,
+            init_before_fork=preload_text_state if languages else None,
+            profile_path=profile_path(stage_name),
+            profile_interval_s=PROFILE_INTERVAL_MS / 1000,
+            memory_stats=MEMORY_STATS or None,
+            memory_top_n=MEMORY_TOP_N,
         )
+    except Exception as exc:
+        stage_exc = exc
+        STATS_TRACKER.record_error(stage_name, exc=exc)
+    finally:
+        STATS_TRACKER.watch_stage(None)
+        if HF_PUBLISHER is not None:
+            HF_PUBLISHER.flush()
+
+        reader_stats = collect_reader_stats(reader)
+        for sink in sinks:
+            sink_stats = {**reader_stats, **STATS_TRACKER.read_counters(counters[sink["scope"]])}
+            STATS_TRACKER.record_error(sink["scope"], sink_stats["handler_errors"])
+            if sink["vector"]:
+                lang_stats = STATS_TRACKER.get_language_stats(sink["lang"], {
+                    "language": sink["lang"],
+                    "fallback_lang": sink["fallback_lang"],
+                    "vector_hf_branch": VECTOR_HF_BRANCH,
+                })
+                sink_stats["timings"] = STATS_TRACKER.read_timers(timers[sink["scope"]])
+                lang_stats["vectordb"] = sink_stats
+            else:
+                sink_stats.update({"branch": HF_BRANCH, "data_dir": f"data/{LANG}"})
+                STATS_TRACKER.set_stage_stats("wd_to_hf", sink_stats)
+        STATS_TRACKER.clear_counters()
+        FANOUT_SINKS = ()
+
+    if stage_exc is not None:
+        raise stage_exc
+
+    if DELETE_STALE_VECTORS:
+        for lang, _ in languages:
+            delete_stale_vectors(lang, STATS_TRACKER.get_language_stats(lang))
+
+
+def run_vectors_to_hf_stage():
+
+    global LANG, FALLBACK_LANG, VECTOR_HF_BRANCH, HF_PUBLISHER, STATS_TRACKER
 
+    for lang, fallback in vector_languages():
         print(f"Running vector stages for language={lang} (fallback={fallback})")
         LANG = lang
         FALLBACK_LANG = fallback
@@ -475,12 +898,14 @@ def run_vectors_to_hf_stage():
             data_dir=f"data/{LANG}",
         )
         vectors_pushed = 0
+        STATS_TRACKER.watch_stage(stage_name)
         try:
             vectors_pushed = save_vectors_to_hf()
         except Exception as exc:
             STATS_TRACKER.record_error(stage_name, exc=exc)
             raise
         finally:
+            STATS_TRACKER.watch_stage(None)
             HF_PUBLISHER.flush()
         lang_stats["vectors_to_hf"] = {
             "branch": VECTOR_HF_BRANCH,
@@ -489,16 +914,134 @@ def run_vectors_to_hf_stage():
         }
 
 
+def replay_dead_letters(stage, handler):
+    """
+    Feeds the dead-lettered entities of a stage back through its handler in the
+    current process. Entities that fail again are written to new dead-letter files
+    with their attempt count increased; the replayed files are removed afterwards.
+    """
+    store = DeadLetterStore(DEAD_LETTER_DIR, stage)
+    paths = store.paths()
+    records = list(store.iter_records(paths))
+    attempts = {record["id"]: record.get("attempts", 1) for record in records}
+    entities = [orjson.loads(record["line"]) for record in records]
+
+    def item_failed(entity, exc):
+        if STATS_TRACKER is not None:
+            STATS_TRACKER.counter_add("handler_errors", 1)
+        print(f"Replay of {entity.get('id')} failed: {exc}")
+        store.add(entity, exc, attempts=attempts.get(entity.get("id"), 1) + 1)
+
+    recovered = 0
+    for start in range(0, len(entities), READER_BATCH_SIZE):
+        batch = entities[start:start + READER_BATCH_SIZE]
+        try:
+            handler(batch)
+            recovered += len(batch)
+        except Exception as exc:
+            recovered += retry_batch(handler, batch, RETRY_STRATEGY, item_failed, exc=exc)
+
+    store.close()
+    for path in paths:
+        os.remove(path)
+    print(f"Replayed {len(entities)} dead-lettered entities of {stage}: {recovered} recovered")
+    return {"replayed": len(entities), "recovered": recovered}
+
+
+def run_dead_letter_replay_stage():
+    global HF_PUBLISHER, STATS_TRACKER
+
+    fallbacks = dict(vector_languages())
+    for stage in DeadLetterStore.stages(DEAD_LETTER_DIR):
+        reset_runtime_state()
+        # Stages are replayed in name order, so a vectordb_<lang> stage may run before
+        # the others and leave its language active.
+        activate_language(WD_LANG, WD_FALLBACK_LANG)
+        if stage == "labels":
+            handler, counter_names = save_labels, ("labels_saved",)
+            init_worker(enable_vector=False)
+        elif stage == "wd_to_hf":
+            handler, counter_names = push_to_hf, ("wd_hf_rows",)
+            init_worker(enable_vector=False)
+            HF_PUBLISHER = WikidataHFDatasetPublisher(
+                branch=HF_BRANCH,
+                config_path=WD_HF_API_PATH,
+                storage_chunk_size=HF_CHUNK_SIZE,
+                memory_chunk_size=HF_BATCH_SIZE,
+                queue_size=HF_QUEUE_SIZE,
+                data_dir=f"data/{LANG}",
+            )
+        elif stage.startswith("vectordb_"):
+            lang = stage[len("vectordb_"):]
+            handler, counter_names = push_to_vectorDB, VECTORDB_COUNTERS
+            init_worker(enable_vector=False)
+            activate_language(lang, fallbacks.get(lang, lang), enable_vector=True)
+        else:
+            print(f"Skipping dead letters of unknown stage {stage}")
+            continue
+
+        stage_name = f"replay:{stage}"
+        counters = STATS_TRACKER.start_counters(counter_names + ("handler_errors",))
+        timers = STATS_TRACKER.start_timers(VECTORDB_SPANS) if stage.startswith("vectordb_") else None
+        STATS_TRACKER.watch_stage(stage_name)
+        try:
+            replay_stats = replay_dead_letters(stage, handler)
+        except Exception as exc:
+            STATS_TRACKER.record_error(stage_name, exc=exc)
+            raise
+        finally:
+            STATS_TRACKER.watch_stage(None)
+            if HF_PUBLISHER is not None:
+                HF_PUBLISHER.flush()
+        replay_stats.update(STATS_TRACKER.read_counters(counters))
+        if timers is not None:
+            replay_stats["timings"] = STATS_TRACKER.read_timers(timers)
+        STATS_TRACKER.clear_counters()
+        STATS_TRACKER.set_stage_stats(stage_name, replay_stats)
+        STATS_TRACKER.record_error(stage_name, replay_stats["handler_errors"])
+
+
 def run_pipeline():
-    global STATS_TRACKER
+    global STATS_TRACKER, METRICS_EXPORTER
 
     create_dump_reader()
 
     stats_config = {
         "dump_path": DUMP_PATH,
         "num_processes": NUM_PROCESSES,
+        "min_processes": MIN_PROCESSES,
+        "autoscale_interval_s": AUTOSCALE_INTERVAL_S,
+        "progress_interval_s": PROGRESS_INTERVAL_S,
+        "telemetry_path": TELEMETRY_PATH,
+        "telemetry_interval_s": TELEMETRY_INTERVAL_S,
+        "telemetry_max_mb": TELEMETRY_MAX_MB,
+        "metrics_port": METRICS_PORT,
+        "metrics_textfile": METRICS_TEXTFILE,
+        "profile": PROFILE,
+        "memory_stats": MEMORY_STATS or None,
+        "num_producers": NUM_PRODUCERS,
+        "reader_transport": READER_TRANSPORT,
+        "reader_slot_size_mb": READER_SLOT_SIZE_MB,
         "reader_queue_size": READER_QUEUE_SIZE,
         "reader_batch_size": READER_BATCH_SIZE,
+        "reader_batch_kb": READER_BATCH_KB,
+        "reader_queue_mb": READER_QUEUE_MB,
+        "heavy_line_mb": HEAVY_LINE_MB,
+        "heavy_processes": HEAVY_PROCESSES,
+        "heavy_memory_mb": HEAVY_MEMORY_MB,
+        "retry_strategy": RETRY_STRATEGY,
+        "max_consumer_restarts": MAX_CONSUMER_RESTARTS,
+        "max_batch_attempts": MAX_BATCH_ATTEMPTS,
+        "reader_stall_timeout_s": READER_STALL_TIMEOUT_S,
+        "async_batches": ASYNC_BATCHES,
+        "async_prepare_threads": ASYNC_PREPARE_THREADS,
+        "consumer_threads": CONSUMER_THREADS,
+        "resume": RESUME,
+        "checkpoint_dir": CHECKPOINT_DIR,
+        "single_pass": SINGLE_PASS,
+        "lazy_entities": LAZY_ENTITIES,
+        "dead_letter_dir": DEAD_LETTER_DIR,
+        "replay_dead_letters": REPLAY_DEAD_LETTERS,
         "hf_chunk_size": HF_CHUNK_SIZE,
         "hf_batch_size": HF_BATCH_SIZE,
         "hf_queue_size": HF_QUEUE_SIZE,
@@ -514,16 +1057,37 @@ def run_pipeline():
         "vector_hf_branch": VECTOR_HF_BRANCH,
     }
     STATS_TRACKER = RunStatsTracker(RUN_STATS_PATH, stats_config)
+    if TELEMETRY_INTERVAL_S > 0:
+        STATS_TRACKER.start_telemetry(
+            TELEMETRY_PATH,
+            interval_s=TELEMETRY_INTERVAL_S,
+            max_bytes=TELEMETRY_MAX_MB * 1024 * 1024,
+        )
+    if METRICS_PORT or METRICS_TEXTFILE:
+        METRICS_EXPORTER = MetricsExporter(
+            STATS_TRACKER,
+            port=METRICS_PORT or None,
+            textfile_path=METRICS_TEXTFILE or None,
+            interval_s=METRICS_INTERVAL_S,
+        )
 
     try:
+        if REPLAY_DEAD_LETTERS:
+            run_dead_letter_replay_stage()
+            STATS_TRACKER.finalize("completed")
+            return
+
         if SAVE_LABELS:
             run_labels_stage()
 
-        if SAVE_WD_TO_HF:
-            run_wd_to_hf_stage()
+        if SINGLE_PASS and (SAVE_WD_TO_HF or SAVE_TO_VECTORDB or DELETE_STALE_VECTORS):
+            run_single_pass_stage()
+        else:
+            if SAVE_WD_TO_HF:
+                run_wd_to_hf_stage()
 
-        if SAVE_TO_VECTORDB or DELETE_STALE_VECTORS:
-            run_vectordb_stages()
+            if SAVE_TO_VECTORDB or DELETE_STALE_VECTORS:
+                run_vectordb_stages()
 
         if SAVE_VECTORS_TO_HF:
             run_vectors_to_hf_stage()
@@ -0,0 +1,43 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.WikidataDumpReader import WikidataDumpReader
+from src.wikidataParquetCache import WikidataParquetCache
+
+
+# ---- Runtime config ----
+DUMP_PATH = os.environ.get("DUMP_PATH", "data/wd_dump.gz")
+CACHE_DIR = os.environ.get("PARQUET_CACHE_DIR", "data/wd_dump_parquet")
+NUM_PROCESSES = int(os.environ.get("NUM_PROCESSES", 4))
+NUM_PRODUCERS = int(os.environ.get("NUM_PRODUCERS", 1))
+READER_QUEUE_SIZE = int(os.environ.get("READER_QUEUE_SIZE", 10))
+READER_BATCH_SIZE = int(os.environ.get("READER_BATCH_SIZE", 2000))
+ROW_GROUP_SIZE = int(os.environ.get("PARQUET_ROW_GROUP_SIZE", 10000))
+ROWS_PER_SHARD = int(os.environ.get("PARQUET_ROWS_PER_SHARD", 1000000))
+
+
+# ---- Orchestration ----
+def build_cache():
+    reader = WikidataDumpReader(
+        DUMP_PATH,
+        num_processes=NUM_PROCESSES,
+        queue_size=READER_QUEUE_SIZE,
+        batch_size=READER_BATCH_SIZE,
+        num_producers=NUM_PRODUCERS,
+    )
+    cache = WikidataParquetCache.build(
+        reader,
+        CACHE_DIR,
+        row_group_size=ROW_GROUP_SIZE,
+        rows_per_shard=ROWS_PER_SHARD,
+    )
+    print(
+        f"Wrote {cache.manifest['num_rows']} entities to {len(cache.shards)} shards in {CACHE_DIR}. "
+        f"Set DUMP_PATH={CACHE_DIR} to read from the cache."
+    )
+
+
+if __name__ == "__main__":
+    build_cache()
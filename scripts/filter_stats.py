@@ -15,6 +15,8 @@ NUM_PROCESSES = int(os.environ.get("NUM_PROCESSES", 4))
 READER_QUEUE_SIZE = int(os.environ.get("READER_QUEUE_SIZE", 10))
 READER_BATCH_SIZE = int(os.environ.get("READER_BATCH_SIZE", 2000))
 OUTPUT_PATH = os.environ.get("OUTPUT_PATH", "data/filter_stats.json")
+# Columns read when DUMP_PATH points at a Parquet dump cache (scripts/build_parquet_cache.py).
+CACHE_COLUMNS = ["labels", "descriptions", "sitelinks", "claim_pids", "p31", "p13046"]
 
 
 # ---- Process-local runtime state ----
@@ -155,10 +157,12 @@ def run_stats():
         num_processes=NUM_PROCESSES,
         queue_size=READER_QUEUE_SIZE,
         batch_size=READER_BATCH_SIZE,
+        columns=CACHE_COLUMNS,
     )
     reader.run(
         collect_stats,
         handler_receives_batch=True,
+        lazy_entities=True,
         init_consumer=init_worker,
     )
 
@@ -3,6 +3,7 @@ import requests
 import numpy as np
 import base64
 import os
+import threading
 from typing import List
 
 
@@ -14,10 +15,13 @@ class JinaAITokenizer:
             "jinaai/jina-embeddings-v3",
             trust_remote_code=True
         )
+        # Fast tokenizers raise "Already borrowed" when called from several threads.
+        self._lock = threading.Lock()
 
     def __call__(self, *args, **kwargs):
-        """Forward calls to the wrapped tokenizer."""
-        return self.tokenizer(*args, **kwargs)
+        """Forward calls to the wrapped tokenizer, one thread at a time."""
+        with self._lock:
+            return self.tokenizer(*args, **kwargs)
 
 class JinaAIEmbedder:
     def __init__(
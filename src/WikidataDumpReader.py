@@ -1,5 +1,9 @@
+import asyncio
+import gc
 import gzip
 import bz2
+import inspect
+import threading
 import os
 import orjson
 import time
@@ -7,13 +11,57 @@ from datetime import datetime, timezone
 from tqdm import tqdm
 import requests
 import traceback
+from array import array
+from collections import Counter
 from multiprocessing import cpu_count, get_context
-from queue import Full
+from queue import Empty, Full, Queue
+import shutil
+import tempfile
+from src.gzipIndex import GzipIndex, iter_range_lines
+from src.bz2Blocks import Bz2BlockIndex
+from src.sharedMemoryRing import SharedMemoryRing
+from src.lockedPipe import LockedPipe
+from src.dumpCheckpoint import DumpCheckpoint
+from src.dumpProgress import DumpProgress
+from src.wikidataParquetCache import RowGroupTask, WikidataParquetCache
+from src.lazyEntity import parse_lazy_entity
+from src.batchRetry import RETRY_STRATEGIES, retry_batch, retry_batch_async
+from src.inflightBatches import InflightBatches
+from src.samplingProfiler import SamplingProfiler
+from src.batchMemory import MODES as MEMORY_STATS_MODES, BatchMemoryTracker
+from src.runTelemetry import process_rss_bytes
+
+_STRIP_BYTES = frozenset(b"[] ,\n")
+# Exit code of a heavy consumer stopped by its heavy_memory_bytes limit.
+MEMORY_LIMIT_EXIT_CODE = 75
+
+
+def _strip_line(line):
+    """
+    Binary counterpart of line.strip("[] ,\n") that returns a memoryview slice
+    instead of copying the line.
+    """
+    view = memoryview(line)
+    start = 0
+    end = len(view)
+    while start < end and view[start] in _STRIP_BYTES:
+        start += 1
+    while end > start and view[end - 1] in _STRIP_BYTES:
+        end -= 1
+    return view[start:end]
+
 
 class WikidataDumpReader:
     def __init__(
             self, file_path, num_processes=None,
-            queue_size=100, skiplines=0, batch_size=100):
+            queue_size=100, skiplines=0, batch_size=100,
+            num_producers=1, index_spacing=128 * 1024 * 1024, binary=True,
+            transport="queue", slot_size=4 * 1024 * 1024, columns=None,
+            batch_bytes=None, queue_bytes=None,
+            heavy_line_bytes=None, heavy_processes=1, heavy_memory_bytes=None,
+            retry_strategy="bisect", threads_per_consumer=1,
+            min_processes=None, autoscale_interval_s=30, progress_interval_s=60,
+            metrics=None, stall_timeout_s=None):
         """
         Initializes the reader with the file path, number of processes, queue size, and number of lines to skip.
 
@@ -22,31 +70,166 @@ class WikidataDumpReader:
         - num_processes (int): Number of consumer processes to spawn (default=4).
         - queue_size (int): Maximum size of the queue (default=100).
         - skiplines (int): Number of lines to skip at the beginning of the file (default=0).
+        - num_producers (int): Number of producer processes decompressing disjoint ranges
+            of a .gz or .bz2 dump in parallel (default=1). Requires a gzip access-point
+            index or a bz2 block index, built once next to the dump if missing.
+        - index_spacing (int): Uncompressed bytes between gzip index access points, and
+            approximate uncompressed size of the block ranges handed to bz2 producers.
+        - binary (bool): If True (default), lines stay raw bytes from the file to orjson.
+            Each batch travels as one bytes blob plus an offset table, and consumers
+            parse memoryview slices of it without decoding UTF-8. If False, lines are
+            decoded to str and batches are lists of lines.
+        - transport (str): "queue" (default) pickles batches through a multiprocessing.Queue;
+            "shm" copies raw lines into a ring of queue_size shared-memory slots that
+            consumers parse in place. "shm" requires binary=True.
+        - slot_size (int): Size in bytes of one shared-memory slot (transport="shm").
+        - columns (list[str] or None): When file_path is a Parquet dump cache directory,
+            the cache columns to read (default: all). Consumers read row groups of
+            the cache in parallel instead of parsing dump lines, and hand each row
+            group to the handler in batches of batch_size.
+        - batch_bytes (int or None): If set, a batch is cut once its lines reach this many
+            bytes (characters with binary=False); batch_size stays the upper bound on
+            lines per batch.
+        - queue_bytes (int or None): If set, producers wait while the batches queued and
+            not yet taken by a consumer hold this many bytes (transport="queue"; the
+            shared-memory ring is bounded by its slots). A batch larger than the budget
+            is still queued once the queue is empty.
+        - heavy_line_bytes (int or None): If set, lines of at least this many bytes are
+            sent on their own to a separate pool of heavy consumers, so a few huge
+            entities do not hold up the batches behind them.
+        - heavy_processes (int): Number of heavy consumer processes (default=1).
+        - heavy_memory_bytes (int or None): Resident set size limit of heavy consumers,
+            which must exceed their RSS after init_consumer. A heavy consumer checks its
+            RSS every 0.1 s and exits with MEMORY_LIMIT_EXIT_CODE above the limit, so an
+            entity cannot take the host down and a consumer whose heap stays inflated
+            after a batch is replaced. With max_consumer_restarts the consumer is
+            restarted and its batch retried up to max_batch_attempts times, then given
+            up; otherwise the run fails.
+        - retry_strategy (str): How a failed batch is retried with handler_receives_batch:
+            "bisect" (default) splits it in halves until the failing entities are
+            isolated, "per_item" reruns the handler once per entity.
+        - threads_per_consumer (int): Handler threads per consumer process (default=1).
+            Threads share the process-local state set up by init_consumer (tokenizer,
+            DB clients), so I/O-bound handlers get more concurrency without more
+            processes. The handler must be thread-safe.
+        - min_processes (int or None): If set below num_processes, the number of consumers
+            is autoscaled between min_processes and num_processes: the run starts with
+            min_processes consumers, adds one while batches wait in the transport and
+            the consumers are busy, and retires one while the transport is empty and
+            the consumers mostly wait. The heavy lane is not scaled.
+        - autoscale_interval_s (float): Seconds between two scaling decisions.
+        - progress_interval_s (float): Seconds between two samples of the progress time
+            series (percentage of the compressed dump read, read rate, ETA) kept in
+            reader.progress.
+        - metrics (MetricsExporter or None): If set, the reporter process (started even
+            without verbose) serves or writes the live metrics of every pass through it,
+            so the export adds no work to the consumers.
+        - stall_timeout_s (float or None): If set, a pass fails once no line was read,
+            batch queued or entity handled for this many seconds, instead of waiting
+            forever on consumers stuck on a transport lock. It must exceed the longest
+            time one batch can take in the handler.
         """
         self.file_path = file_path
         self.extension = file_path.split(".")[-1]
+        self.parquet_cache = None
+        self.columns = columns
+        if WikidataParquetCache.is_cache(file_path):
+            self.extension = "parquet"
+            self.parquet_cache = WikidataParquetCache(file_path)
         self.skiplines = skiplines
         if not num_processes:
             num_processes = (cpu_count() or 2) - 1
         self.num_processes = max(1, num_processes)
         self.queue_size = queue_size
         self.batch_size = max(1, batch_size)
+        self.batch_bytes = batch_bytes
+        self.queue_bytes = queue_bytes
+        self.heavy_line_bytes = heavy_line_bytes
+        # Parquet row groups are read in the consumers, so there are no lines to divert.
+        self.heavy_processes = max(1, heavy_processes) if heavy_line_bytes and self.parquet_cache is None else 0
+        self.heavy_memory_bytes = heavy_memory_bytes
+        self.heavy_queue = None
+        self.num_producers = max(1, num_producers)
+        self.index_spacing = index_spacing
+        self.binary = binary
+        self.transport = transport
+        self.slot_size = slot_size
+        self.ring = None
+        self.transport_stats = {}
+        self.checkpoint = None
+        self.done_queue = None
+        self._resume_offsets = {}
+        self._completed_segments = set()
+        self.lazy_entities = False
+        self.dead_letters = ()
+
+        if retry_strategy not in RETRY_STRATEGIES:
+            raise ValueError(f"Unknown retry strategy '{retry_strategy}'")
+        self.retry_strategy = retry_strategy
+        self.threads_per_consumer = max(1, threads_per_consumer)
+        self.min_processes = self.num_processes
+        if min_processes:
+            self.min_processes = max(1, min(min_processes, self.num_processes))
+        self.autoscale = self.min_processes < self.num_processes
+        self.autoscale_interval_s = autoscale_interval_s
+        self.scaling_events = []
+        self.progress_interval_s = progress_interval_s
+        self.progress = None
+        self._raw_file = None
+        self._consumer_ps = []
+        self.metrics = metrics
+        self.profile_path = None
+        self.profile_interval_s = 0.01
+        self.profile_stats = None
+        self.memory_stats = None
+        self.memory_top_n = 20
+        self.memory_report = None
+        self.memory_tracker = None
+        self._memory_dir = None
+        self.stall_timeout_s = stall_timeout_s
+        self._progress_signature = None
+        self._last_progress_time = None
+        # Held by a supervised consumer while it receives a batch and records it as in
+        # flight, and by a handler thread that brings the consumer down.
+        self._receive_lock = threading.Lock()
+
+        if transport not in ("queue", "shm"):
+            raise ValueError(f"Unknown transport '{transport}'")
+        if transport == "shm" and not binary:
+            raise ValueError("The shared-memory transport requires binary=True")
+        self.gzip_index = None
+        self.bz2_index = None
+
+        if self.num_producers > 1 and self.extension not in ['gz', 'bz2', 'parquet']:
+            raise ValueError("Parallel producers are only supported for .gz and .bz2 dumps")
+        if self.parquet_cache is not None and (transport != "queue" or skiplines):
+            raise ValueError("Parquet dump caches are read with transport='queue' and no skiplines")
+        if self.num_producers > 1 and self.skiplines:
+            raise ValueError("skiplines cannot be combined with parallel producers")
 
     def line_to_entity(self, line):
         """
         Converts a single line of text into a Wikidata entity (a dictionary).
 
         Parameters:
-        - line (str): A single line representing a Wikidata entity in JSON format.
+        - line (str, bytes or memoryview): A single line representing a Wikidata entity in JSON format.
 
         Returns:
         - dict or None: The parsed entity if valid JSON, or None if empty or malformed.
+            With lazy_entities, a LazyEntity whose claims are parsed on access.
         """
-        line = line.strip("[] ,\n")
+        if isinstance(line, str):
+            line = line.strip("[] ,\n")
+        else:
+            line = _strip_line(line)
         if not line:
             return None
 
         try:
+            if self.lazy_entities:
+                if isinstance(line, str):
+                    line = line.encode("utf-8")
+                return parse_lazy_entity(line)
             entity = orjson.loads(line)
             return entity
         except ValueError as e:
@@ -57,7 +240,13 @@ class WikidataDumpReader:
     def run(self, handler_func, handler_receives_batch=False,
             max_iterations=None, verbose=True,
             init_consumer=None, init_consumer_args=None,
-            consumer_join_timeout_s=3600):
+            consumer_join_timeout_s=3600,
+            checkpoint_path=None, resume=False, checkpoint_interval_s=30,
+            line_prefilter=None, lazy_entities=False, dead_letter=None,
+            max_consumer_restarts=0, max_batch_attempts=2, max_inflight_batches=4,
+            init_before_fork=None, init_before_fork_args=None,
+            profile_path=None, profile_interval_s=0.01,
+            memory_stats=None, memory_top_n=20):
         """
         Starts processing using a producer-consumer model with multiprocessing.
 
@@ -70,48 +259,216 @@ class WikidataDumpReader:
         - handler_func (callable): A function that takes a batch of parsed entity (list[dict]) as input.
         - handler_receives_batch (bool): If True, the handler function receives a batch of entities.
         - max_iterations (int or None): Stop after this many lines (if not None).
-        - verbose (bool): If True, spawns a reporter process to print stats.
+        - verbose (bool): If True, spawns a reporter process to print stats (the reporter
+            also runs without verbose when the reader has a metrics exporter).
         - init_consumer (callable or None): Optional per-consumer initializer.
         - init_consumer_args (tuple or list or None): Optional args for initializer.
+        - checkpoint_path (str or None): If set, the uncompressed byte offset up to which
+            every batch has been handled is saved there, per index range for a .gz or
+            .bz2 dump (the gzip access-point index or bz2 block index is built next to
+            the dump if missing, even with one producer). Requires binary=True.
+        - resume (bool): If True and checkpoint_path exists for the same dump, restart
+            from the saved offsets instead of the beginning of the dump. Batches that
+            were in flight when the previous run stopped are processed again.
+        - checkpoint_interval_s (float): Seconds between checkpoint writes.
+        - line_prefilter (callable or None): Optional predicate called by consumers on
+            each raw line (str, bytes or memoryview) before JSON parsing. Lines for which
+            it returns False are dropped without being parsed; it must never reject a
+            line the handler would keep.
+        - lazy_entities (bool): If True, entities are LazyEntity dicts: top-level keys
+            are parsed eagerly and claims only when accessed (single properties through
+            claims.get(pid) are parsed on their own). Handlers that serialize entities
+            or need claims as a dict must call materialize_entity() first.
+        - dead_letter (DeadLetterStore, list or None): If set, entities the handler still
+            fails on after retrying are appended to this store (or to each of the stores).
+        - max_consumer_restarts (int): If > 0, consumers are supervised: each consumer
+            records the batch it is handling, and a consumer that dies (OOM kill, native
+            crash) is restarted, reruns init_consumer and handles its batch again. The run
+            fails once this many restarts have been used.
+        - max_batch_attempts (int): How often a supervised batch may crash a consumer.
+            After that its entities are counted as handler errors and sent to dead_letter.
+        - max_inflight_batches (int): Batches one consumer handles concurrently when
+            handler_func is a coroutine function (async def). The consumer runs an event
+            loop and awaits the handler for up to this many batches at once, which
+            overlaps network waits without more processes. Ignored for plain functions.
+        - init_before_fork (callable or None): Optional initializer run once in the parent
+            before any process is forked. Read-only state it builds (tokenizers, lookup
+            tables) is inherited by every consumer and shared copy-on-write instead of
+            being rebuilt by each init_consumer. The objects allocated by then are moved
+            out of the cyclic GC's reach (gc.freeze) for the pass, so collections in the
+            consumers do not copy their pages.
+        - init_before_fork_args (tuple or list or None): Optional args for init_before_fork.
+        - profile_path (str or None): If set, every consumer runs a sampling profiler from
+            the end of init_consumer until it exits, and the stacks of all consumers are
+            merged into this collapsed-stack file (flamegraph.pl, speedscope) when the
+            pass ends. Consumers that crash are missing from it.
+        - profile_interval_s (float): Seconds between two profiler samples.
+        - memory_stats (str or None): If set, consumers measure every batch: "rss"
+            records the resident set size after it and its growth, "tracemalloc" also
+            the peak of Python allocations during it (slower). The highest RSS and the
+            memory_top_n batches by memory and by time, with the ID and size of their
+            largest entity, are merged into reader.memory_report.
+        - memory_top_n (int): Batches kept in each ranking.
         """
 
         ctx = get_context("fork")
         init_consumer_args = tuple(init_consumer_args or ())
+        self.lazy_entities = lazy_entities
+        if isinstance(dead_letter, (list, tuple)):
+            self.dead_letters = tuple(dead_letter)
+        else:
+            self.dead_letters = (dead_letter,) if dead_letter is not None else ()
+        self.max_consumer_restarts = max_consumer_restarts
+        self.max_batch_attempts = max(1, max_batch_attempts)
+        self.max_inflight_batches = 1
+        if inspect.iscoroutinefunction(handler_func):
+            if self.threads_per_consumer > 1:
+                raise ValueError("Async handlers cannot be combined with threads_per_consumer > 1")
+            self.max_inflight_batches = max(1, max_inflight_batches)
+
+        # A checkpointed pass reads a compressed dump by index ranges even with one
+        # producer, so that resuming restarts at an access point instead of
+        # decompressing everything before the saved offset.
+        indexed = self.num_producers > 1 or (checkpoint_path and self.binary and not self.skiplines)
+        if indexed and self.extension == 'gz':
+            self.gzip_index = GzipIndex.load_or_build(
+                self.file_path, spacing=self.index_spacing, show_progress=verbose
+            )
+        elif indexed and self.extension == 'bz2':
+            self.bz2_index = Bz2BlockIndex.load_or_build(self.file_path, show_progress=verbose)
+
+        self.checkpoint = None
+        self.done_queue = None
+        self._resume_offsets = {}
+        self._completed_segments = set()
+        if checkpoint_path:
+            self._init_checkpoint(ctx, checkpoint_path, resume)
+
+        sizes = self._segment_sizes()
+        read_bytes = {segment_id: sizes[segment_id] for segment_id in self._completed_segments}
+        for segment_id, offset in self._resume_offsets.items():
+            position = self._compressed_position(segment_id, offset, sizes[segment_id])
+            if position is not None:
+                read_bytes[segment_id] = position
+        self.progress = DumpProgress(ctx, sizes, read_bytes)
 
         self.queue = ctx.Queue(maxsize=self.queue_size) # This queue is shared across all processes
+        # Supervised consumers take batches only under these locks (see _get_nowait).
+        self.queue_lock = ctx.Lock()
+        self.heavy_queue_lock = ctx.Lock()
+        self.queued_bytes = ctx.Value('q', 0) # Bytes of queued batches not yet taken by a consumer
+        self.queued_bytes_changed = ctx.Condition(self.queued_bytes.get_lock())
+        if self.transport == "shm":
+            self.ring = SharedMemoryRing(ctx, self.queue_size, self.slot_size)
         self.iterations = ctx.Value('i', 0) # A counter for how many entities have been processed
         self.consumers_done = ctx.Value('i', 0) # How many consumers have received sentinel and exited
         self.handler_errors = ctx.Value('i', 0) # How many errors occurred in the handler function
+        self.batches_produced = ctx.Value('i', 0) # How many batches all producers have queued
+        self.prefiltered = ctx.Value('i', 0) # How many lines line_prefilter dropped before parsing
+        if self.heavy_processes:
+            self.heavy_queue = ctx.Queue(maxsize=self.heavy_processes + 1)
+        self.heavy_entities = ctx.Value('i', 0) # Entities handled by the heavy lane
+        self.heavy_bytes = ctx.Value('q', 0) # Line bytes handled by the heavy lane
+        self.heavy_busy_s = ctx.Value('d', 0.0) # Time heavy consumers spent parsing and handling
+        self.consumer_restarts = ctx.Value('i', 0) # Consumers restarted by the supervisor
+        self.crashed_batches = ctx.Value('i', 0) # Batches given up after crashing max_batch_attempts consumers
+        self.consumer_busy_s = ctx.Value('d', 0.0) # Time normal-lane consumers spent parsing and handling
+        initial_processes = self.min_processes if self.autoscale else self.num_processes
+        self.active_consumers = ctx.Value('i', initial_processes) # Normal-lane consumers not asked to retire
+        # Consumers that will exit on a sentinel; a restarted consumer replaces one that never does.
+        self.consumers_started = ctx.Value('i', initial_processes + self.heavy_processes)
+        self.scaling_events = []
+        self._pending_retirements = 0
+        self._run_start = self._last_scale_check = self._last_progress_time = time.time()
+        self._progress_signature = None
+        self._last_busy_s = 0.0
+        self.inflight = None
+        self.profile_path = profile_path
+        self.profile_interval_s = profile_interval_s
+        self.profile_stats = None
+        if profile_path:
+            shutil.rmtree(self._profile_parts_dir(), ignore_errors=True)
+            os.makedirs(self._profile_parts_dir())
+        if memory_stats is not None and memory_stats not in MEMORY_STATS_MODES:
+            raise ValueError(f"Unknown memory stats mode '{memory_stats}'")
+        self.memory_stats = memory_stats
+        self.memory_top_n = memory_top_n
+        self.memory_report = None
+        self._memory_dir = tempfile.mkdtemp(prefix="wd_memory_") if memory_stats else None
+        if max_consumer_restarts:
+            self.inflight = InflightBatches(
+                ctx, self.num_processes + self.heavy_processes,
+                per_slot=self.max_inflight_batches * self.threads_per_consumer,
+            )
 
-        producer_p = ctx.Process(target=self._producer, args=(max_iterations,))
-        consumer_ps = [
-            ctx.Process(
+        producer_ps = [
+            ctx.Process(target=self._producer, args=(max_iterations, producer_id))
+            for producer_id in range(self.num_producers)
+        ]
+
+        def new_consumer(slot, retries=()):
+            # Slots past num_processes belong to the heavy lane.
+            return ctx.Process(
                 target=self._consumer,
                 args=(
                     handler_func,
                     handler_receives_batch,
                     init_consumer,
                     init_consumer_args,
+                    line_prefilter,
+                    slot >= self.num_processes,
+                    slot,
+                    retries,
                 )
             )
-            for _ in range(self.num_processes)
-        ]
-        reporter_p = ctx.Process(target=self._reporter) if verbose else None
 
+        # Slots of consumers that are not running hold processes that were never started.
+        consumer_ps = [new_consumer(slot) for slot in range(self.num_processes + self.heavy_processes)]
+        self._consumer_ps = consumer_ps
+        reporter_p = None
+        if verbose or self.metrics is not None:
+            reporter_p = ctx.Process(target=self._reporter, kwargs={"show_progress": verbose})
+
+        gc_frozen = False
         try:
+            if init_before_fork is not None:
+                init_before_fork(*tuple(init_before_fork_args or ()))
+                # Keep the cyclic GC away from everything allocated so far: a collection in
+                # a child would otherwise write to the headers of the preloaded objects and
+                # copy their pages. Restarted consumers are forked from this state too.
+                gc.freeze()
+                gc_frozen = True
+
             # Start all processes
-            producer_p.start()
-            for cp in consumer_ps:
-                cp.start()
+            for pp in producer_ps:
+                pp.start()
+            for slot, cp in enumerate(consumer_ps):
+                if slot < initial_processes or slot >= self.num_processes:
+                    cp.start()
             if reporter_p:
                 reporter_p.start()
 
-            while producer_p.is_alive():
-                producer_p.join(timeout=0.2)
+            while any(pp.is_alive() for pp in producer_ps):
+                self._drain_done_queue(checkpoint_interval_s)
+                self._check_stalled()
+                self.progress.record(self.progress_interval_s)
+                for pp in producer_ps:
+                    pp.join(timeout=0.2 / len(producer_ps))
+                    if pp.exitcode not in (None, 0):
+                        raise RuntimeError(f"Producer failed with exit code {pp.exitcode}")
+                if self.autoscale:
+                    self._autoscale(consumer_ps, new_consumer)
+                # A retired consumer exits cleanly; _autoscale frees its slot on the next check.
+                if self.inflight is not None:
+                    self._restart_failed_consumers(
+                        consumer_ps, new_consumer, clean_exit_ok=self._pending_retirements > 0
+                    )
+                    continue
                 failed_consumers = [
                     cp
                     for cp in consumer_ps
                     if cp.exitcode is not None
+                    and not (cp.exitcode == 0 and self._pending_retirements)
                 ]
                 if failed_consumers:
                     details = ", ".join(
@@ -122,22 +479,22 @@ class WikidataDumpReader:
                         f"Consumer exited before producer completed ({details})"
                     )
 
-            if producer_p.exitcode != 0:
-                raise RuntimeError(f"Producer failed with exit code {producer_p.exitcode}")
+            for pp in producer_ps:
+                if pp.exitcode != 0:
+                    raise RuntimeError(f"Producer failed with exit code {pp.exitcode}")
 
             # Only running consumers need a shutdown sentinel.
-            remaining = sum(1 for cp in consumer_ps if cp.is_alive())
-            while remaining:
-                try:
-                    self.queue.put(None, timeout=1)
-                    remaining -= 1
-                except Full:
-                    if not any(cp.is_alive() for cp in consumer_ps):
-                        raise RuntimeError("All consumers died before shutdown sentinels could be queued")
+            self._send_sentinels(consumer_ps[:self.num_processes], checkpoint_interval_s)
+            self._send_sentinels(consumer_ps[self.num_processes:], checkpoint_interval_s, heavy=True)
+
+            if self.inflight is not None:
+                self._join_supervised(consumer_ps, new_consumer, consumer_join_timeout_s, checkpoint_interval_s)
 
             force_terminated = set()
             for cp in consumer_ps:
-                cp.join(timeout=consumer_join_timeout_s)
+                if cp.pid is None:
+                    continue
+                self._join_draining(cp, consumer_join_timeout_s, checkpoint_interval_s)
                 if cp.is_alive():
                     # Avoid deadlocking the parent forever on a stuck consumer.
                     force_terminated.add(cp.pid)
@@ -154,10 +511,11 @@ class WikidataDumpReader:
 
         finally:
             # Ensure all processes are terminated
-            if producer_p and producer_p.pid is not None:
-                if producer_p.is_alive():
-                    producer_p.terminate()
-                producer_p.join(timeout=5)
+            for pp in producer_ps:
+                if pp and pp.pid is not None:
+                    if pp.is_alive():
+                        pp.terminate()
+                    pp.join(timeout=5)
 
             for cp in consumer_ps:
                 if cp and cp.pid is not None:
@@ -170,81 +528,812 @@ class WikidataDumpReader:
                     reporter_p.terminate()
                 reporter_p.join(timeout=5)
 
-    def _reporter(self, print_per_s=3):
+            if self.checkpoint is not None:
+                self._drain_done_queue()
+                self.checkpoint.save()
+
+            self.progress.record(self.progress_interval_s, force=True)
+
+            if self.ring is not None:
+                self.transport_stats = self.ring.stats()
+                self.ring.close()
+                self.ring = None
+
+            if self.inflight is not None:
+                self.inflight.close()
+                self.inflight = None
+
+            for store in self.dead_letters:
+                store.close()
+
+            if self.profile_path:
+                self._merge_profiles()
+
+            if self._memory_dir is not None:
+                self._merge_memory_reports()
+
+            self._consumer_ps = []
+            if gc_frozen:
+                gc.unfreeze()
+
+    def _profile_parts_dir(self):
+        return f"{self.profile_path}.parts"
+
+    def _merge_profiles(self):
+        parts_dir = self._profile_parts_dir()
+        paths = [os.path.join(parts_dir, name) for name in sorted(os.listdir(parts_dir))]
+        samples = SamplingProfiler.merge(paths, self.profile_path)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        self.profile_stats = {
+            "path": self.profile_path,
+            "consumers": len(paths),
+            "samples": samples,
+            "interval_s": self.profile_interval_s,
+        }
+
+    def _merge_memory_reports(self):
+        reports = []
+        for name in sorted(os.listdir(self._memory_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self._memory_dir, name), "rb") as f_in:
+                    reports.append(orjson.loads(f_in.read()))
+        shutil.rmtree(self._memory_dir, ignore_errors=True)
+        self._memory_dir = None
+        self.memory_report = BatchMemoryTracker.merge(reports, self.memory_stats, self.memory_top_n)
+
+    def live_stats(self):
+        """
+        Returns the figures of the running pass for telemetry, or {} outside run().
+        Safe to call from another thread of the parent process.
+        """
+        consumer_ps = list(self._consumer_ps)
+        if not consumer_ps:
+            return {}
+        stats = self.shared_stats()
+        stats["consumers_alive"] = sum(1 for cp in consumer_ps if cp.is_alive())
+        stats["consumer_pids"] = [cp.pid for cp in consumer_ps if cp.pid is not None and cp.exitcode is None]
+        return stats
+
+    def shared_stats(self):
+        """
+        Returns the figures of the running pass kept in shared memory. Unlike
+        live_stats(), it can be called from any process of the pass (the reporter).
+        """
+        stats = {
+            "entities_processed": int(self.iterations.value),
+            "handler_errors": int(self.handler_errors.value),
+            "prefiltered_lines": int(self.prefiltered.value),
+            "batches_produced": int(self.batches_produced.value),
+            "queue_fill": round(self._transport_fill(), 3),
+            "active_consumers": int(self.active_consumers.value),
+            "consumer_restarts": int(self.consumer_restarts.value),
+            "crashed_batches": int(self.crashed_batches.value),
+            "heavy_entities": int(self.heavy_entities.value),
+        }
+        if self.ring is not None:
+            stats["queue_depth"] = int(self.ring.depth.value)
+        else:
+            stats["queue_depth"] = self.queue.qsize()
+            stats["queued_bytes"] = int(self.queued_bytes.value)
+        if self.progress is not None:
+            stats["dump_progress"] = self.progress.sample()
+        return stats
+
+    def _send_sentinels(self, consumers, checkpoint_interval_s, heavy=False):
+        """
+        Queues one shutdown sentinel per running consumer of a lane.
+        """
+        remaining = sum(1 for cp in consumers if cp.is_alive())
+        while remaining:
+            self._drain_done_queue(checkpoint_interval_s)
+            self._check_stalled()
+            try:
+                if heavy:
+                    self.heavy_queue.put(None, timeout=1)
+                elif self.ring is not None:
+                    self.ring.put_sentinel()
+                else:
+                    self.queue.put(None, timeout=1)
+                remaining -= 1
+            except Full:
+                if not any(cp.is_alive() for cp in consumers):
+                    raise RuntimeError("All consumers died before shutdown sentinels could be queued")
+
+    def _autoscale(self, consumer_ps, new_consumer, high_fill=0.5, low_fill=0.05,
+                   busy_up=0.8, busy_down=0.5):
+        """
+        Frees the slots of retired consumers, and every autoscale_interval_s starts or
+        retires one normal-lane consumer. A consumer is started when the transport is
+        at least high_fill full and the consumers were busy (parsing or in the handler)
+        for at least busy_up of their capacity; one is retired when the transport is at
+        most low_fill full and they were busy for less than busy_down. Retiring queues
+        a shutdown sentinel, so whichever consumer reads it exits after its batch.
+        """
+        for slot in range(self.num_processes):
+            if self._pending_retirements and consumer_ps[slot].exitcode == 0:
+                consumer_ps[slot] = new_consumer(slot)
+                self._pending_retirements -= 1
+
+        now = time.time()
+        elapsed = now - self._last_scale_check
+        if elapsed < self.autoscale_interval_s:
+            return
+        busy_s = self.consumer_busy_s.value
+        active = self.active_consumers.value
+        capacity = elapsed * active * self.threads_per_consumer * self.max_inflight_batches
+        busy = (busy_s - self._last_busy_s) / capacity
+        fill = self._transport_fill()
+        self._last_scale_check = now
+        self._last_busy_s = busy_s
+
+        if fill >= high_fill and busy >= busy_up and active < self.num_processes:
+            slot = next((slot for slot in range(self.num_processes) if consumer_ps[slot].pid is None), None)
+            if slot is None:
+                # Every free slot still runs a consumer that has not read its retirement sentinel.
+                return
+            consumer_ps[slot] = new_consumer(slot)
+            consumer_ps[slot].start()
+            with self.consumers_started.get_lock():
+                self.consumers_started.value += 1
+            action = "start"
+            active += 1
+        elif fill <= low_fill and busy < busy_down and active > self.min_processes:
+            try:
+                if self.ring is not None:
+                    self.ring.put_sentinel()
+                else:
+                    self.queue.put(None, timeout=1)
+            except Full:
+                return
+            self._pending_retirements += 1
+            action = "retire"
+            active -= 1
+        else:
+            return
+
+        self.active_consumers.value = active
+        self.scaling_events.append({
+            "elapsed_s": round(now - self._run_start, 1),
+            "action": action,
+            "consumers": active,
+            "transport_fill": round(fill, 3),
+            "consumer_busy": round(busy, 3),
+        })
+        print(
+            f"Autoscaling: {action} a consumer, now {active} "
+            f"(transport {fill:.0%} full, consumers {busy:.0%} busy)"
+        )
+
+    def _transport_fill(self):
+        """Returns the fraction of the normal-lane transport holding queued batches."""
+        if self.ring is not None:
+            return self.ring.depth.value / self.ring.num_slots
+        fill = self.queue.qsize() / max(1, self.queue_size)
+        if self.queue_bytes:
+            fill = max(fill, self.queued_bytes.value / self.queue_bytes)
+        return fill
+
+    def _segment_layout(self, block_size=900_000):
+        """
+        Describes how the dump is split into checkpoint segments: the whole file for a
+        single producer, or one segment per index range with parallel producers.
+        """
+        if self.gzip_index is not None:
+            return {
+                "mode": "gzip_index",
+                "segments": len(self.gzip_index.ranges()),
+                "spacing": self.gzip_index.spacing,
+            }
+        if self.bz2_index is not None:
+            blocks_per_range = max(1, self.index_spacing // block_size)
+            return {
+                "mode": "bz2_blocks",
+                "segments": len(self.bz2_index.ranges(blocks_per_range)),
+                "blocks_per_range": blocks_per_range,
+            }
+        if self.parquet_cache is not None:
+            return {"mode": "parquet_row_groups", "segments": len(self.parquet_cache.row_groups())}
+        return {"mode": "sequential", "segments": 1}
+
+    def _segment_sizes(self, block_size=900_000):
+        """
+        Returns the compressed size of every checkpoint segment (see _segment_layout).
+        A Parquet row group counts as an equal share of its shard file.
+        """
+        if self.parquet_cache is not None:
+            tasks = self.parquet_cache.row_groups()
+            row_groups_per_shard = Counter(task.path for task in tasks)
+            return [os.path.getsize(task.path) // row_groups_per_shard[task.path] for task in tasks]
+
+        file_size = os.path.getsize(self.file_path)
+        if self.gzip_index is not None:
+            points = self.gzip_index.points
+            ends = [p.compressed_offset for p in points[1:]] + [file_size]
+            return [end - point.compressed_offset for point, end in zip(points, ends)]
+        if self.bz2_index is not None:
+            blocks = self.bz2_index.blocks
+            return [
+                (blocks[end][0] // 8 if end < len(blocks) else file_size) - blocks[first][0] // 8
+                for first, end in self.bz2_index.ranges(max(1, self.index_spacing // block_size))
+            ]
+        return [file_size]
+
+    def _compressed_position(self, segment_id, offset, segment_size, block_size=900_000):
+        """
+        Estimates how many compressed bytes of a segment have been read once its first
+        `offset` uncompressed bytes were queued.
+
+        Returns:
+        - int or None: The estimate, or None for a .gz/.bz2 dump read sequentially
+            outside a producer (the position is only known to the open file).
+            Sequential .gz/.bz2 reads are never resumed, so this only happens for
+            segment 0 of a fresh pass.
+        """
+        if self._raw_file is not None:
+            return self._raw_file.tell()
+        if self.gzip_index is not None:
+            point = self.gzip_index.points[segment_id]
+            return self.gzip_index.compressed_offset_at(point.uncompressed_offset + offset) \
+                - point.compressed_offset
+        if self.bz2_index is not None:
+            # Blocks hold about block_size uncompressed bytes each.
+            blocks_per_range = max(1, self.index_spacing // block_size)
+            num_blocks = min(blocks_per_range, len(self.bz2_index.blocks) - segment_id * blocks_per_range)
+            return offset * segment_size // (num_blocks * block_size)
+        if self.extension == 'json':
+            return offset
+        return None
+
+    def _init_checkpoint(self, ctx, checkpoint_path, resume):
+        """
+        Loads (resume=True) or creates the checkpoint of this pass and the queue on
+        which consumers report handled batches.
+        """
+        if not self.binary:
+            raise ValueError("Checkpoints require binary=True")
+        if self.skiplines:
+            raise ValueError("skiplines cannot be combined with checkpoints")
+
+        layout = self._segment_layout()
+        checkpoint = None
+        if resume:
+            checkpoint = DumpCheckpoint.load(checkpoint_path, self.file_path, layout)
+        if checkpoint is not None:
+            self._resume_offsets = checkpoint.resume_offsets()
+            self._completed_segments = checkpoint.completed_segments()
+            print(
+                f"Resuming from {checkpoint_path}: "
+                f"{len(self._completed_segments)}/{layout['segments']} segments complete, "
+                f"{len(self._resume_offsets)} partially processed"
+            )
+        else:
+            checkpoint = DumpCheckpoint(checkpoint_path, self.file_path, layout)
+
+        self.checkpoint = checkpoint
+        self.done_queue = LockedPipe(ctx)
+        self._last_checkpoint_save = time.time()
+
+    def _drain_done_queue(self, checkpoint_interval_s=None):
+        """
+        Applies the batch completions reported by consumers to the checkpoint, and
+        saves it if checkpoint_interval_s seconds have passed since the last save.
+        """
+        if self.done_queue is None:
+            return
+
+        while not self.done_queue.empty():
+            kind, segment_id, *values = self.done_queue.get()
+            if kind == "batch":
+                self.checkpoint.record_batch(segment_id, *values)
+            else:
+                self.checkpoint.record_segment_end(segment_id, *values)
+
+        if checkpoint_interval_s is not None \
+                and time.time() - self._last_checkpoint_save >= checkpoint_interval_s:
+            self.checkpoint.save()
+            self._last_checkpoint_save = time.time()
+
+    def _join_draining(self, process, timeout, checkpoint_interval_s):
+        """
+        Joins a consumer while still reading the completion queue, so that consumers
+        never block on a full pipe during shutdown.
+        """
+        deadline = time.time() + timeout
+        while process.is_alive() and time.time() < deadline:
+            self._drain_done_queue(checkpoint_interval_s)
+            self._check_stalled()
+            process.join(timeout=0.2)
+
+    def _check_stalled(self):
+        """
+        Raises if the pass made no progress for stall_timeout_s seconds: no compressed
+        byte read, batch queued, entity handled, prefiltered or failed, and no consumer
+        exited or restarted.
+        """
+        if not self.stall_timeout_s:
+            return
+        signature = (
+            self.progress.bytes_read(),
+            self.batches_produced.value,
+            self.iterations.value,
+            self.handler_errors.value,
+            self.prefiltered.value,
+            self.heavy_entities.value,
+            self.consumers_done.value,
+            self.consumer_restarts.value,
+            self.crashed_batches.value,
+        )
+        now = time.time()
+        if signature != self._progress_signature:
+            self._progress_signature = signature
+            self._last_progress_time = now
+        elif now - self._last_progress_time >= self.stall_timeout_s:
+            raise RuntimeError(
+                f"No progress for {now - self._last_progress_time:.0f}s: a handler is stuck, or a "
+                "consumer killed while holding a transport lock stalls the others. Rerun with "
+                "resume=True to continue from the checkpoint"
+            )
+
+    def _transport_locks(self):
+        """
+        Returns the (name, lock) pairs of the cross-process locks a consumer takes to
+        read a batch or to hand back a slot or a completion. A consumer killed while
+        holding one leaves it locked and the pipe possibly cut mid-message.
+        """
+        locks = []
+        if self.ring is not None:
+            locks.append(("shared-memory ring", self.ring.ready_slots.read_lock))
+            locks.append(("free-slot queue", self.ring.free_slots.write_lock))
+        else:
+            locks.append(("batch queue", self.queue_lock))
+        if self.heavy_queue is not None:
+            locks.append(("heavy queue", self.heavy_queue_lock))
+        if self.done_queue is not None:
+            locks.append(("completion queue", self.done_queue.write_lock))
+        return locks
+
+    def _check_transport(self, timeout_s=30):
+        """
+        Raises if a transport lock stays held for timeout_s seconds after a consumer
+        crashed. Live consumers hold these locks only while a ready message is read
+        or written, so a lock that is not released belonged to the dead consumer and
+        no restart can make progress.
+        """
+        for name, lock in self._transport_locks():
+            if not lock.acquire(timeout=timeout_s):
+                raise RuntimeError(
+                    f"A crashed consumer left the {name} locked, so the other consumers "
+                    "cannot take batches. Rerun with resume=True to continue from the checkpoint"
+                )
+            lock.release()
+
+    def _restart_failed_consumers(self, consumer_ps, new_consumer, clean_exit_ok=False):
+        """
+        Replaces every consumer that exited by a new process on the same slot, handing
+        it the batches the old one was handling. A batch that already crashed
+        max_batch_attempts consumers is given up instead (see _give_up_batch).
+
+        Returns:
+        - int: Number of consumers restarted.
+
+        Raises:
+        - RuntimeError: If the restart budget is exhausted, or the crashed consumer left
+            a transport lock held (see _check_transport).
+        """
+        restarted = 0
+        transport_checked = False
+        for slot, cp in enumerate(consumer_ps):
+            if cp.exitcode is None or (clean_exit_ok and cp.exitcode == 0):
+                continue
+            if self.consumer_restarts.value >= self.max_consumer_restarts:
+                raise RuntimeError(
+                    f"Consumer pid={cp.pid} exited with exit code {cp.exitcode} and the "
+                    f"restart budget ({self.max_consumer_restarts}) is exhausted"
+                )
+            if not transport_checked:
+                self._check_transport()
+                transport_checked = True
+
+            retries = []
+            for meta, payload, attempts in self.inflight.take(slot):
+                if attempts >= self.max_batch_attempts:
+                    self._give_up_batch(payload, meta, attempts, cp.exitcode)
+                else:
+                    retries.append((meta, payload, attempts + 1))
+
+            print(
+                f"Consumer pid={cp.pid} exited with exit code {cp.exitcode}, restarting it"
+                + (f" with {len(retries)} in-flight batches" if retries else "")
+            )
+            consumer_ps[slot] = new_consumer(slot, retries)
+            consumer_ps[slot].start()
+            with self.consumer_restarts.get_lock():
+                self.consumer_restarts.value += 1
+            restarted += 1
+        return restarted
+
+    def _give_up_batch(self, payload, meta, attempts, exitcode):
+        """
+        Counts the entities of a batch that keeps crashing consumers as handler errors,
+        sends them to the dead-letter store and marks the batch as handled.
+        """
+        lines = payload if isinstance(payload, RowGroupTask) else self._iter_batch_lines(payload)
+        entities = self._batch_entities(lines)
+        exc = RuntimeError(f"Consumer crashed with exit code {exitcode} on this batch {attempts} times")
+        print(f"Giving up a batch of {len(entities)} entities: {exc}")
+        with self.crashed_batches.get_lock():
+            self.crashed_batches.value += 1
+        with self.handler_errors.get_lock():
+            self.handler_errors.value += len(entities)
+        for store in self.dead_letters:
+            for entity in entities:
+                store.add(entity, exc, attempts=attempts)
+        self._report_done(meta)
+
+    def _join_supervised(self, consumer_ps, new_consumer, timeout, checkpoint_interval_s):
+        """
+        Waits for consumers to finish after the shutdown sentinels were queued, still
+        restarting the ones that crash. A restarted consumer takes over the sentinel
+        the crashed one did not read.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self._drain_done_queue(checkpoint_interval_s)
+            self._check_stalled()
+            alive = any(cp.is_alive() for cp in consumer_ps)
+            if not self._restart_failed_consumers(consumer_ps, new_consumer, clean_exit_ok=True) and not alive:
+                break
+            time.sleep(0.2)
+
+    def _reporter(self, print_per_s=3, show_progress=True):
         """
         Reports overall progress every few seconds until all consumers have exited.
 
         Parameters:
         - print_per_s: Number of seconds between each print.
+        - show_progress (bool): If False, only the metrics exporter runs.
         """
 
         start_time = time.time()
+        if self.metrics is not None:
+            self.metrics.open(self)
 
-        with tqdm(desc="Processing items") as pbar:
+        with tqdm(desc="Processing items", disable=not show_progress) as pbar:
             while True:
                 time.sleep(print_per_s)
+                if self.metrics is not None:
+                    self.metrics.update()
 
                 with self.iterations.get_lock():
                     items_processed = self.iterations.value
 
                 # Stop once every consumer has received a sentinel and exited.
-                if self.consumers_done.value == self.num_processes:
+                if self.consumers_done.value >= self.consumers_started.value:
                     break
 
                 elapsed = time.time() - start_time
                 rate = items_processed / elapsed if elapsed > 0 else 0.0
 
                 # Update progress bar
-                pbar.set_postfix_str(
+                postfix = (
                     f"Items Processed: {items_processed} "
                     f"| Processing Rate: {rate:.0f} items/sec"
                 )
+                if self.ring is not None:
+                    postfix += (
+                        f" | Slots: {self.ring.depth.value}/{self.ring.num_slots} "
+                        f"| Stall P/C: {self.ring.producer_stall_s.value:.0f}s"
+                        f"/{self.ring.consumer_stall_s.value:.0f}s"
+                    )
+                elif self.queue_bytes:
+                    postfix += (
+                        f" | Queued: {self.queued_bytes.value / 2**20:.0f}"
+                        f"/{self.queue_bytes / 2**20:.0f} MB"
+                    )
+                if self.heavy_processes:
+                    postfix += f" | Heavy: {self.heavy_entities.value}"
+                if self.autoscale:
+                    postfix += f" | Consumers: {self.active_consumers.value}/{self.num_processes}"
+                progress = self.progress.sample()
+                postfix += (
+                    f" | Dump: {progress['percent']:.1f}% "
+                    f"at {progress['bytes_per_s'] / 2**20:.1f} MB/s, "
+                    f"ETA {DumpProgress.format_eta(progress['eta_s'])}"
+                )
+                pbar.set_postfix_str(postfix)
                 pbar.update(items_processed - pbar.n)
 
             # Final update to ensure progress bar is complete
             pbar.update(items_processed - pbar.n)
 
-    def _producer(self, max_iterations):
+        if self.metrics is not None:
+            self.metrics.close()
+
+    def _producer(self, max_iterations, producer_id=0):
         """
         Reads lines from the file (plain or compressed) and puts them into the queue.
 
         Parameters:
-        - max_iterations (int or None): If not None, stop reading after this many batches.
+        - max_iterations (int or None): If not None, stop reading after this many batches
+            (counted across all producers).
+        - producer_id (int): Index of this producer when several producers read
+            disjoint ranges of an indexed gzip or bz2 dump.
         """
-        iters = 0
-        if self.extension == 'json':
-            lines_gen = self._read_jsonfile()
-        elif self.extension in ['gz', 'bz2']:
-            lines_gen = self._read_zipfile()
+        if self.parquet_cache is not None:
+            self._produce_row_groups(max_iterations, producer_id)
+            return
+
+        for segment_id, start_offset, lines_gen in self._iter_segments(producer_id):
+            offset = start_offset
+            seq = 0
+            batch = []
+            batch_nbytes = 0
+            for line in lines_gen:
+                if self.heavy_processes and len(line) >= self.heavy_line_bytes:
+                    # Keep file order: the pending batch goes first, then the heavy line alone.
+                    if batch:
+                        seq = self._put_batch(batch, max_iterations, segment_id, seq, offset)
+                        if seq is None:
+                            return
+                        offset += batch_nbytes
+                        batch = []
+                        batch_nbytes = 0
+                    seq = self._put_batch([line], max_iterations, segment_id, seq, offset, heavy=True)
+                    if seq is None:
+                        return
+                    offset += len(line)
+                    continue
+
+                batch.append(line)
+                batch_nbytes += len(line)
+
+                if len(batch) >= self.batch_size \
+                        or (self.batch_bytes and batch_nbytes >= self.batch_bytes):
+                    seq = self._put_batch(batch, max_iterations, segment_id, seq, offset)
+                    if seq is None:
+                        return
+                    offset += batch_nbytes
+                    batch = []
+                    batch_nbytes = 0
+
+            if batch:
+                seq = self._put_batch(batch, max_iterations, segment_id, seq, offset)
+                if seq is None:
+                    return
+
+            self.progress.finish(segment_id)
+            if self.done_queue is not None:
+                self.done_queue.put(("end", segment_id, seq))
+
+    def _produce_row_groups(self, max_iterations, producer_id=0):
+        """
+        Queues the row groups of a Parquet dump cache as batches; consumers read them.
+        Each row group is its own checkpoint segment.
+        """
+        row_groups = self.parquet_cache.row_groups()
+        for segment_id in range(producer_id, len(row_groups), self.num_producers):
+            if segment_id in self._completed_segments:
+                continue
+            with self.batches_produced.get_lock():
+                if max_iterations and self.batches_produced.value >= max_iterations:
+                    return
+                self.batches_produced.value += 1
+
+            meta = (segment_id, 0, 1) if self.done_queue is not None else None
+            self.queue.put((meta, row_groups[segment_id]))
+            self.progress.finish(segment_id)
+            if self.done_queue is not None:
+                self.done_queue.put(("end", segment_id, 1))
+
+    def _iter_segments(self, producer_id):
+        """
+        Yields the checkpoint segments read by one producer, skipping segments a
+        resumed checkpoint marks as complete.
+
+        Parameters:
+        - producer_id (int): Index of the producer in [0, num_producers).
+
+        Returns:
+        - Iterator[tuple]: (segment_id, start_offset, lines) where start_offset is the
+            offset of the first line relative to the start of the segment.
+        """
+        if self.gzip_index is not None:
+            ranges = self.gzip_index.ranges()
+            read_range = self._read_gzip_range
+        elif self.bz2_index is not None:
+            ranges = self.bz2_index.ranges(self._segment_layout()["blocks_per_range"])
+            read_range = self._read_bz2_range
         else:
-            raise ValueError(f"File extension '{self.extension}' is not supported")
+            if 0 in self._completed_segments:
+                return
+            start_offset = self._resume_offsets.get(0, 0)
+            if self.extension == 'json':
+                yield 0, start_offset, self._read_jsonfile(start_offset)
+            elif self.extension in ['gz', 'bz2']:
+                # Checkpointed .gz/.bz2 passes are read by index ranges, so this starts at 0.
+                yield 0, start_offset, self._read_zipfile()
+            else:
+                raise ValueError(f"File extension '{self.extension}' is not supported")
+            return
 
-        batch = []
-        for line in lines_gen:
-            batch.append(line)
+        # Ranges are dealt round-robin so every producer moves through the dump at a similar pace.
+        for segment_id in range(producer_id, len(ranges), self.num_producers):
+            if segment_id in self._completed_segments:
+                continue
+            start_offset = self._resume_offsets.get(segment_id, 0)
+            lines = read_range(*ranges[segment_id])
+            yield segment_id, start_offset, self._skip_bytes(lines, start_offset)
 
-            if len(batch) >= self.batch_size:
-                iters += 1
-                self.queue.put(batch)
-                batch = []
+    @staticmethod
+    def _skip_bytes(lines, num_bytes):
+        """
+        Drops whole lines until num_bytes bytes of lines have been skipped.
+        """
+        for line in lines:
+            if num_bytes > 0:
+                num_bytes -= len(line)
+                continue
+            yield line
 
-                if max_iterations and iters >= max_iterations:
-                    break
+    def _put_batch(self, batch, max_iterations, segment_id=0, seq=0, start_offset=0, heavy=False):
+        """
+        Queues a batch unless max_iterations batches were already queued by any producer.
+        In binary mode the lines are packed into one blob with an offset table.
+        When checkpointing, every queued part carries (segment_id, seq, end_offset) so
+        consumers can report it once handled. Heavy batches go to the heavy lane queue.
+
+        Returns:
+        - int or None: The sequence number of the next batch of the segment, or None
+            once the batch limit has been reached.
+        """
+        with self.batches_produced.get_lock():
+            if max_iterations and self.batches_produced.value >= max_iterations:
+                return None
+            self.batches_produced.value += 1
+
+        parts = self.ring.split_lines(batch) if self.ring is not None and not heavy else [batch]
+        end_offset = start_offset
+        for part in parts:
+            meta = None
+            if self.done_queue is not None:
+                end_offset += sum(len(line) for line in part)
+                meta = (segment_id, seq, end_offset)
+            seq += 1
+
+            if heavy:
+                self.heavy_queue.put((meta, self._pack_batch(part) if self.binary else part))
+                continue
+            if self.ring is not None:
+                self.ring.put_lines(part, meta)
+                continue
+
+            self._reserve_queue_bytes(sum(len(line) for line in part))
+            if self.binary:
+                self.queue.put((meta, self._pack_batch(part)))
+            else:
+                self.queue.put((meta, part))
+
+        position = self._compressed_position(
+            segment_id, start_offset + sum(len(line) for line in batch), self.progress.sizes[segment_id]
+        )
+        if position is not None:
+            self.progress.set(segment_id, position)
+        return seq
+
+    def _reserve_queue_bytes(self, nbytes):
+        """
+        Blocks until a batch of nbytes fits into the queue_bytes budget, then
+        accounts for it. Consumers give the bytes back in _next_batch.
+        """
+        with self.queued_bytes_changed:
+            if self.queue_bytes:
+                while self.queued_bytes.value and self.queued_bytes.value + nbytes > self.queue_bytes:
+                    self.queued_bytes_changed.wait(timeout=1)
+            self.queued_bytes.value += nbytes
+
+    def _release_queue_bytes(self, nbytes):
+        with self.queued_bytes_changed:
+            self.queued_bytes.value -= nbytes
+            self.queued_bytes_changed.notify_all()
+
+    @staticmethod
+    def _pack_batch(lines):
+        """
+        Packs binary lines into (blob, ends) where ends[i] is the end offset of line i.
+        """
+        ends = array('q')
+        end = 0
+        for line in lines:
+            end += len(line)
+            ends.append(end)
+        return b"".join(lines), ends
+
+    @staticmethod
+    def _iter_batch_lines(batch):
+        """
+        Yields the lines of a queued batch: memoryview slices of the blob for packed
+        binary batches, or the lines themselves for text batches.
+        """
+        if isinstance(batch, tuple):
+            blob, ends = batch
+            view = memoryview(blob)
+            start = 0
+            for end in ends:
+                yield view[start:end]
+                start = end
+        else:
+            yield from batch
+
+    def _next_batch(self, heavy=False, block=True):
+        """
+        Takes the next batch from the active transport, or from the heavy lane queue.
+
+        Returns:
+        - tuple or None: (token, lines, meta), or None for a shutdown sentinel. The lines
+            may point into shared memory and are only valid until _release_batch(token).
+
+        Raises:
+        - queue.Empty: With block=False, if no batch is ready.
+        """
+        if heavy:
+            message = self.heavy_queue.get() if block else self._get_nowait(self.heavy_queue, self.heavy_queue_lock)
+            if message is None:
+                return None
+            meta, batch = message
+            return None, self._iter_batch_lines(batch), meta
+
+        if self.ring is not None:
+            return self.ring.get(block=block)
+
+        message = self.queue.get() if block else self._get_nowait(self.queue, self.queue_lock)
+        if message is None:
+            return None
+        meta, batch = message
+        if isinstance(batch, RowGroupTask):
+            return None, batch, meta
+        if isinstance(batch, tuple):
+            self._release_queue_bytes(len(batch[0]))
+        else:
+            self._release_queue_bytes(sum(len(line) for line in batch))
+        return None, self._iter_batch_lines(batch), meta
+
+    @staticmethod
+    def _get_nowait(queue, lock):
+        """
+        queue.get(block=False) under lock. A consumer dying inside get() leaves the
+        queue's internal read lock held; as every non-blocking get goes through lock,
+        it is left held too, where _check_transport can see it.
+        """
+        if not lock.acquire(False):
+            raise Empty
+        try:
+            return queue.get(block=False)
+        finally:
+            lock.release()
 
-        if batch:
-            self.queue.put(batch)
+    def _release_batch(self, token):
+        if self.ring is not None:
+            self.ring.release(token)
 
     def _consumer(self, handler_func, handler_receives_batch=False,
-                  init_consumer=None, init_consumer_args=()):
+                  init_consumer=None, init_consumer_args=(), line_prefilter=None,
+                  heavy=False, slot=0, retries=()):
         """
         Consumes lines from the queue, parses JSON, then invokes handler_func with the
-        entity. Exits when receiving a sentinel (None).
+        entity. Exits when receiving a sentinel (None). Coroutine handlers run on an
+        event loop with up to max_inflight_batches batches at once, plain handlers on
+        threads_per_consumer threads.
 
         Parameters:
         - handler_func (callable): A function that takes a parsed entity (dict) as input.
         - handler_receives_batch (bool): If True, handler_func receives a batch of entities.
         - init_consumer (callable or None): Optional consumer initializer.
         - init_consumer_args (tuple): Args for the consumer initializer.
+        - line_prefilter (callable or None): Predicate dropping raw lines before parsing.
+        - heavy (bool): If True, consume the heavy lane (one oversized line per batch).
+        - slot (int): Index of this consumer, used to record its in-flight batches.
+        - retries (list): (meta, payload, attempts) of the batches left over by the
+            crashed consumer this one replaces; they are handled first.
         """
         if init_consumer is not None:
             try:
@@ -254,72 +1343,403 @@ class WikidataDumpReader:
                 traceback.print_exc()
                 raise
 
+        if heavy and self.heavy_memory_bytes:
+            threading.Thread(target=self._watch_memory, daemon=True).start()
+
+        profiler = None
+        if self.profile_path:
+            profiler = SamplingProfiler(self.profile_interval_s, root="heavy_consumer" if heavy else "consumer")
+            profiler.start()
+        if self.memory_stats:
+            self.memory_tracker = BatchMemoryTracker(
+                self.memory_stats,
+                top_n=self.memory_top_n,
+                report_path=os.path.join(self._memory_dir, f"{os.getpid()}.json"),
+            )
+            self.memory_tracker.start()
+
+        try:
+            self._consume(handler_func, handler_receives_batch, line_prefilter, heavy, slot, retries)
+        finally:
+            if self.memory_tracker is not None:
+                self.memory_tracker.stop()
+            if profiler is not None:
+                profiler.stop()
+                profiler.write(os.path.join(self._profile_parts_dir(), f"{os.getpid()}.collapsed"))
+
+        with self.consumers_done.get_lock():
+            self.consumers_done.value += 1
+
+    def _watch_memory(self, interval_s=0.1):
+        """
+        Exits the heavy consumer once its resident set size exceeds heavy_memory_bytes,
+        never while it receives a batch (see _consume_threaded).
+        """
+        pid = os.getpid()
         while True:
-            lines = self.queue.get()
-            if lines is None:
-                with self.consumers_done.get_lock():
-                    self.consumers_done.value += 1
+            time.sleep(interval_s)
+            rss = process_rss_bytes(pid)
+            if rss is not None and rss > self.heavy_memory_bytes:
+                print(
+                    f"Heavy consumer pid={pid} uses {rss / 2**20:.0f} MB, above its limit of "
+                    f"{self.heavy_memory_bytes / 2**20:.0f} MB; exiting"
+                )
+                self._receive_lock.acquire()
+                os._exit(MEMORY_LIMIT_EXIT_CODE)
+
+    def _consume(self, handler_func, handler_receives_batch, line_prefilter, heavy, slot, retries):
+        if inspect.iscoroutinefunction(handler_func):
+            asyncio.run(self._consume_async(
+                handler_func, handler_receives_batch, line_prefilter, heavy, slot, retries
+            ))
+        elif self.threads_per_consumer > 1:
+            self._consume_threaded(handler_func, handler_receives_batch, line_prefilter, heavy, slot, retries)
+        else:
+            retries = list(retries)
+            while True:
+                batch = self._take_batch(heavy, slot, retries)
+                if batch is None:
+                    break
+                meta, entities, start_time = self._parse_batch(batch, line_prefilter, heavy)
+                processed = self._handle_entities(handler_func, handler_receives_batch, entities)
+                self._finish_batch(meta, processed, heavy, start_time, slot)
+
+    async def _consume_async(self, handler_func, handler_receives_batch, line_prefilter,
+                             heavy, slot, retries):
+        """
+        Event loop body of a consumer with a coroutine handler. Batches are taken from
+        the transport in a worker thread, parsed on the loop, and handled as tasks.
+        """
+        loop = asyncio.get_running_loop()
+        retries = list(retries)
+        free_indexes = list(range(self.max_inflight_batches))
+        index_released = asyncio.Condition()
+        tasks = set()
+
+        def task_done(task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                # Fail the whole consumer like the single-threaded loop would, but never
+                # while the executor thread receives a batch (see _consume_threaded).
+                traceback.print_exception(task.exception())
+                self._receive_lock.acquire()
+                os._exit(1)
+
+        async def handle(batch, index):
+            try:
+                meta, entities, start_time = self._parse_batch(batch, line_prefilter, heavy, index)
+                processed = await self._handle_entities_async(
+                    handler_func, handler_receives_batch, entities
+                )
+                self._finish_batch(meta, processed, heavy, start_time, slot, index)
+            finally:
+                async with index_released:
+                    free_indexes.append(index)
+                    index_released.notify()
+
+        while True:
+            async with index_released:
+                await index_released.wait_for(lambda: free_indexes)
+                index = free_indexes.pop()
+            if retries:
+                batch = self._take_batch(heavy, slot, retries, index)
+            else:
+                batch = await loop.run_in_executor(None, self._take_batch, heavy, slot, retries, index)
+            if batch is None:
                 break
+            task = asyncio.create_task(handle(batch, index))
+            tasks.add(task)
+            task.add_done_callback(task_done)
+
+        if tasks:
+            await asyncio.gather(*tasks)
 
+    def _consume_threaded(self, handler_func, handler_receives_batch, line_prefilter,
+                          heavy, slot, retries):
+        """
+        Consumer body with threads_per_consumer handler threads. This thread takes
+        batches from the transport (so one sentinel still stops the process) and
+        hands them to the handler threads, at most one waiting batch per thread.
+        """
+        retries = list(retries)
+        free_indexes = Queue()
+        for index in range(self.threads_per_consumer):
+            free_indexes.put(index)
+        work = Queue()
+
+        def handle():
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                batch, index = item
+                try:
+                    meta, entities, start_time = self._parse_batch(batch, line_prefilter, heavy, index)
+                    processed = self._handle_entities(handler_func, handler_receives_batch, entities)
+                    self._finish_batch(meta, processed, heavy, start_time, slot, index)
+                except BaseException:
+                    # Fail the whole consumer like the single-threaded loop would, but
+                    # never while the taking thread receives a batch: that would leave
+                    # the transport's read lock held for good.
+                    traceback.print_exc()
+                    self._receive_lock.acquire()
+                    os._exit(1)
+                free_indexes.put(index)
+
+        threads = [threading.Thread(target=handle, daemon=True) for _ in range(self.threads_per_consumer)]
+        for thread in threads:
+            thread.start()
+
+        while True:
+            index = free_indexes.get()
+            batch = self._take_batch(heavy, slot, retries, index)
+            if batch is None:
+                break
+            work.put((batch, index))
+
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _take_batch(self, heavy, slot, retries, index=0):
+        """
+        Takes the next batch (a left-over retry first) and records it as in flight
+        when consumers are supervised.
+
+        Returns:
+        - tuple or None: (token, lines, meta), or None for a shutdown sentinel.
+        """
+        if retries:
+            meta, payload, attempts = retries.pop(0)
+            lines = payload if isinstance(payload, RowGroupTask) else self._iter_batch_lines(payload)
+            if self.inflight is not None:
+                lines = self._record_inflight(slot, None, lines, meta, attempts, index)
+            return None, lines, meta
+        if self.inflight is not None:
+            return self._poll_next_batch(heavy, slot, index)
+        return self._next_batch(heavy)
+
+    def _poll_next_batch(self, heavy, slot, index=0, interval_s=0.005):
+        """
+        _next_batch for supervised consumers, recording the batch as in flight.
+
+        A blocking get waits for a batch while holding the transport's cross-process
+        read lock, so a consumer dying while idle would leave it held. Polling tries
+        the lock without waiting and holds it only while a ready batch is read. The
+        read and the in-flight record happen under _receive_lock, which a crashing
+        handler thread takes before exiting the process, so the consumer never dies
+        between the two on its own. A consumer killed from outside (OOM killer) while
+        it reads a batch still leaves the lock held: the supervisor checks the locks
+        before restarting it (_check_transport), and stall_timeout_s bounds the rest.
+        """
+        while True:
+            with self._receive_lock:
+                try:
+                    batch = self._next_batch(heavy, block=False)
+                except Empty:
+                    pass
+                else:
+                    if batch is None:
+                        return None
+                    token, lines, meta = batch
+                    return None, self._record_inflight(slot, token, lines, meta, 1, index), meta
+            time.sleep(interval_s)
+
+    def _parse_batch(self, batch, line_prefilter, heavy, index=0):
+        """
+        Parses a taken batch and frees its transport slot.
+
+        Returns:
+        - tuple: (meta, entities, start_time).
+        """
+        token, lines, meta = batch
+        start_time = time.perf_counter()
+        sizes = None
+        if self.memory_tracker is not None:
+            self.memory_tracker.begin(index)
+            sizes = []
+        if heavy:
+            lines = list(lines)
+            with self.heavy_bytes.get_lock():
+                self.heavy_bytes.value += sum(len(line) for line in lines)
+        entities = self._batch_entities(lines, line_prefilter, sizes)
+        self._release_batch(token)
+        if self.memory_tracker is not None:
+            self.memory_tracker.describe(index, entities, sizes)
+        return meta, entities, start_time
+
+    def _handle_entities(self, handler_func, handler_receives_batch, entities):
+        """
+        Runs the handler on the entities of one batch, retrying failed batches with
+        retry_strategy.
+
+        Returns:
+        - int: Number of entities handled successfully.
+        """
+        if handler_receives_batch:
             processed = 0
-            if handler_receives_batch:
-                entities = [e for line in lines \
-                            if (e := self.line_to_entity(line)) is not None]
-                if not entities:
-                    continue
+            for part in self._handler_batches(entities):
+                try:
+                    handler_func(part)
+                    processed += len(part)
+                except Exception as e:
+                    self._batch_failed(e)
+                    processed += retry_batch(handler_func, part, self.retry_strategy, self._item_failed, exc=e)
+            return processed
+
+        processed = 0
+        for entity in entities:
+            try:
+                handler_func(entity)
+                processed += 1
+            except Exception as e:
+                self._entity_failed(entity, e)
+        return processed
 
+    async def _handle_entities_async(self, handler_func, handler_receives_batch, entities):
+        """Coroutine counterpart of _handle_entities."""
+        if handler_receives_batch:
+            processed = 0
+            for part in self._handler_batches(entities):
                 try:
-                    handler_func(entities)
-                    processed = len(entities)
+                    await handler_func(part)
+                    processed += len(part)
                 except Exception as e:
-                    # batch failed: fallback to item-granular processing
-                    with self.handler_errors.get_lock():
-                        self.handler_errors.value += 1
-                    print(f"Batch handler failed, falling back per-item: {e}")
-                    traceback.print_exc()
+                    self._batch_failed(e)
+                    processed += await retry_batch_async(
+                        handler_func, part, self.retry_strategy, self._item_failed, exc=e
+                    )
+            return processed
 
-                    processed = 0
-                    for entity in entities:
-                        try:
-                            handler_func([entity])
-                            processed += 1
-                        except Exception as item_e:
-                            with self.handler_errors.get_lock():
-                                self.handler_errors.value += 1
-                            print(f"Item handler failed: {item_e}")
-                            traceback.print_exc()
-            else:
-                processed = 0
-                for line in lines:
-                    e = self.line_to_entity(line)
-                    if e is None:
-                        continue
+        processed = 0
+        for entity in entities:
+            try:
+                await handler_func(entity)
+                processed += 1
+            except Exception as e:
+                self._entity_failed(entity, e)
+        return processed
 
-                    try:
-                        handler_func(e)
-                        processed += 1
-                    except Exception as e:
-                        with self.handler_errors.get_lock():
-                            self.handler_errors.value += 1
-                        print(f"Handler failed: {e}")
-                        traceback.print_exc()
-                        continue
+    def _handler_batches(self, entities):
+        """
+        Splits the entities of a taken batch into handler batches of at most
+        batch_size. Only a Parquet cache row group, which travels as one batch, is
+        ever split.
+        """
+        return [entities[start:start + self.batch_size] for start in range(0, len(entities), self.batch_size)]
 
-            if processed > 0:
-                with self.iterations.get_lock():
-                    self.iterations.value += processed
+    def _finish_batch(self, meta, processed, heavy, start_time, slot, index=0):
+        if processed > 0:
+            with self.iterations.get_lock():
+                self.iterations.value += processed
+        if heavy:
+            with self.heavy_busy_s.get_lock():
+                self.heavy_busy_s.value += time.perf_counter() - start_time
+            with self.heavy_entities.get_lock():
+                self.heavy_entities.value += processed
+        elif self.autoscale:
+            with self.consumer_busy_s.get_lock():
+                self.consumer_busy_s.value += time.perf_counter() - start_time
+        if self.memory_tracker is not None:
+            self.memory_tracker.end(index, heavy)
+        self._report_done(meta)
+        if self.inflight is not None:
+            self.inflight.clear(slot, index)
+
+    def _batch_failed(self, exc):
+        # batch failed: retry smaller parts to isolate the failing entities
+        with self.handler_errors.get_lock():
+            self.handler_errors.value += 1
+        print(f"Batch handler failed, retrying ({self.retry_strategy}): {exc}")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+    def _entity_failed(self, entity, exc):
+        with self.handler_errors.get_lock():
+            self.handler_errors.value += 1
+        print(f"Handler failed: {exc}")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+        for store in self.dead_letters:
+            store.add(entity, exc)
+
+    def _record_inflight(self, slot, token, lines, meta, attempts, index=0):
+        """
+        Copies a batch out of the transport into in-flight entry `index` of this slot
+        and frees its transport slot.
+
+        Returns:
+        - Iterable or RowGroupTask: The lines of the batch, read from the copy.
+        """
+        if isinstance(lines, RowGroupTask):
+            payload = lines
+        else:
+            lines = list(lines)
+            payload = self._pack_batch(lines) if self.binary else lines
+        self.inflight.record(slot, (meta, payload, attempts), index)
+        self._release_batch(token)
+        return payload if isinstance(payload, RowGroupTask) else self._iter_batch_lines(payload)
+
+    def _item_failed(self, entity, exc):
+        with self.handler_errors.get_lock():
+            self.handler_errors.value += 1
+        print(f"Item handler failed for {entity.get('id')}: {exc}")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+        # Attempted once in the failed batch and once on its own.
+        for store in self.dead_letters:
+            store.add(entity, exc, attempts=2)
+
+    def _batch_entities(self, lines, line_prefilter=None, sizes=None):
+        """
+        Parses the lines of a batch into entities, dropping the lines rejected by
+        line_prefilter first. A Parquet cache row group is read instead of parsed.
+        If sizes is a list, the line length of every entity is appended to it.
+        """
+        if isinstance(lines, RowGroupTask):
+            return self.parquet_cache.read_entities(lines, columns=self.columns)
+
+        if line_prefilter is not None:
+            lines = list(lines)
+            kept = [line for line in lines if line_prefilter(line)]
+            if len(kept) < len(lines):
+                with self.prefiltered.get_lock():
+                    self.prefiltered.value += len(lines) - len(kept)
+            lines = kept
+
+        if sizes is not None:
+            entities = []
+            for line in lines:
+                entity = self.line_to_entity(line)
+                if entity is not None:
+                    entities.append(entity)
+                    sizes.append(len(line))
+            return entities
+
+        return [e for line in lines \
+                if (e := self.line_to_entity(line)) is not None]
+
+    def _report_done(self, meta):
+        """Tells the parent that a checkpointed batch has been handled."""
+        if meta is not None:
+            self.done_queue.put(("batch", *meta))
 
-    def _read_jsonfile(self):
+    def _read_jsonfile(self, start_offset=0):
         """
         Yields lines from a .json file, skipping self.skiplines lines
             at the start.
 
+        Parameters:
+        - start_offset (int): Byte offset of a line start to resume reading from.
+
         Returns:
-        - Iterator[str]: An iterator over lines from the JSON file.
+        - Iterator[str or bytes]: An iterator over lines from the JSON file.
         """
         file = None
         try:
-            file = open(self.file_path, mode="r", encoding="utf-8")
+            if self.binary:
+                file = open(self.file_path, mode="rb")
+            else:
+                file = open(self.file_path, mode="r", encoding="utf-8")
+            file.seek(start_offset)
             # Skip lines if requested
             for _ in tqdm(range(self.skiplines), desc="Skipping lines"):
                 file.readline()
@@ -332,21 +1752,58 @@ class WikidataDumpReader:
             if file:
                 file.close()
 
+    def _read_gzip_range(self, point, end_offset):
+        """
+        Yields the lines that start between an index access point and end_offset.
+
+        Parameters:
+        - point (GzipIndexPoint): Access point where the range begins.
+        - end_offset (int or None): Uncompressed offset where the next range begins.
+
+        Returns:
+        - Iterator[str or bytes]: An iterator over lines from the range.
+        """
+        chunks = self.gzip_index.iter_chunks(point)
+        try:
+            for line in iter_range_lines(
+                    chunks, point.uncompressed_offset, end_offset, point.line_start):
+                yield line if self.binary else line.decode("utf-8")
+        finally:
+            chunks.close()
+
+    def _read_bz2_range(self, first_block, end_block):
+        """
+        Yields the lines that start inside bz2 blocks [first_block, end_block).
+
+        Returns:
+        - Iterator[str or bytes]: An iterator over lines from the range.
+        """
+        for line in self.bz2_index.iter_range_lines(first_block, end_block):
+            yield line if self.binary else line.decode("utf-8")
+
     def _read_zipfile(self):
         """
         Yields lines from a .gz or .bz2 file, skipping self.skiplines lines at the start.
 
         Returns:
-        - Iterator[str]: An iterator over lines from the compressed file.
+        - Iterator[str or bytes]: An iterator over lines from the compressed file.
         """
         file = None
+        raw_file = None
         try:
-            if self.extension == 'gz':
-                file = gzip.open(self.file_path, mode="rt", encoding="utf-8")
+            # Decompress from our own handle: its position is the progress through the dump.
+            raw_file = open(self.file_path, mode="rb")
+            if self.extension == 'gz' and self.binary:
+                file = gzip.open(raw_file, mode="rb")
+            elif self.extension == 'gz':
+                file = gzip.open(raw_file, mode="rt", encoding="utf-8")
+            elif self.extension == 'bz2' and self.binary:
+                file = bz2.open(raw_file, mode="rb")
             elif self.extension == 'bz2':
-                file = bz2.open(self.file_path, mode="rt", encoding="utf-8")
+                file = bz2.open(raw_file, mode="rt", encoding="utf-8")
             else:
                 raise ValueError(f"Unsupported extension '{self.extension}'")
+            self._raw_file = raw_file
 
             for _ in tqdm(range(self.skiplines), desc="Skipping lines"):
                 file.readline()
@@ -358,6 +1815,9 @@ class WikidataDumpReader:
         finally:
             if file:
                 file.close()
+            if raw_file:
+                raw_file.close()
+            self._raw_file = None
 
     def download(self, show_progress=True, chunk_size=1024 * 1024):
         """
@@ -403,7 +1863,10 @@ class WikidataDumpReader:
         Returns the dump date as a 'YYYY-MM-DD' string.
         Reads from the sidecar .date file written during download, or falls back
         to the file's modification time if the sidecar is absent.
+        A Parquet dump cache reports the date of the dump it was built from.
         """
+        if self.parquet_cache is not None and self.parquet_cache.dump_date:
+            return self.parquet_cache.dump_date
         date_file = self.file_path + ".date"
         if os.path.exists(date_file):
             with open(date_file) as f:
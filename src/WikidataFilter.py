@@ -2,6 +2,7 @@ import requests
 from bs4 import BeautifulSoup
 import os
 import json
+import re
 
 class WikidataPropertyFilter:
     """Class to fetch and store the sorted properties."""
@@ -138,9 +139,40 @@ class WikidataPropertyFilter:
 
 class WikidataItemFilter:
 
+    _property_id_pattern = re.compile(rb'"id"\s*:\s*"P')
+
     def __init__(self, lang, fallback_lang=None):
         self.lang = lang
         self.fallback_lang = fallback_lang or lang
+        self._label_keys = tuple(
+            f'"{key}"'.encode("utf-8")
+            for key in dict.fromkeys((self.lang, self.fallback_lang, 'mul'))
+        )
+
+    def prefilter(self, line):
+        """
+        Cheap byte scan of a raw dump line, run before JSON parsing.
+        Returns False only for lines that filter() would reject: no label key in
+        lang, fallback_lang or mul anywhere in the line, or (for non-properties)
+        no sitelink key ending in 'wiki'. Dump keys are plain ASCII and never
+        escaped, so an accepted entity always contains these byte sequences.
+
+        Parameters:
+        - line (str, bytes or memoryview): A raw line of the dump.
+
+        Returns:
+        - bool: False if the entity can be dropped without parsing it.
+        """
+        if isinstance(line, memoryview):
+            line = line.tobytes()
+        elif isinstance(line, str):
+            line = line.encode("utf-8")
+
+        if not any(key in line for key in self._label_keys):
+            return False
+        if b'wiki"' not in line and not self._property_id_pattern.search(line):
+            return False
+        return True
 
     def has_label(self, item):
         has_lang = self.lang in item.get('labels', {})
@@ -0,0 +1,171 @@
+"""
+Memory and time accounting of the batches handled by a consumer.
+
+For every batch the consumer records the wall-clock time from parsing to the end
+of the handler, its resident set size after the batch and how much it grew, and,
+in "tracemalloc" mode, the peak of Python allocations during the batch above what
+was allocated before it. The batch is described by its largest entity (ID and
+line size), which for the heavy lane and for per-entity handlers is the only one.
+Each consumer keeps its top-N batches by memory and by time and rewrites them to a
+report file every report_interval_s seconds and when it exits, so the report of a
+consumer killed by the OOM killer survives up to its last write. The parent
+merges the reports into run stats.
+
+RSS and tracemalloc figures are per process: with several handler threads or
+async batches in a consumer, overlapping batches are counted in each other.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+
+import orjson
+
+from src.runTelemetry import process_rss_bytes
+
+MODES = ("rss", "tracemalloc")
+_MB = 2**20
+
+
+class BatchMemoryTracker:
+    def __init__(self, mode="rss", top_n=20, report_path=None, report_interval_s=30):
+        """
+        Parameters:
+        - mode (str): "rss" samples the resident set size around each batch;
+            "tracemalloc" also traces Python allocations to get the peak of each
+            batch (several times slower).
+        - top_n (int): Batches kept by memory and by time.
+        - report_path (str or None): File the report of this consumer is written to.
+        - report_interval_s (float): Seconds between two writes of the report.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown memory stats mode '{mode}'")
+        self.mode = mode
+        self.top_n = top_n
+        self.report_path = report_path
+        self.report_interval_s = report_interval_s
+        self.batches = 0
+        self.max_rss = 0
+        self.max_peak = 0
+        self._by_memory = []
+        self._by_time = []
+        self._order = itertools.count()
+        self._open = {}
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def start(self):
+        """Starts tracing allocations in tracemalloc mode (after init_consumer)."""
+        if self.mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        self.write()
+        if self.mode == "tracemalloc":
+            tracemalloc.stop()
+
+    def begin(self, index):
+        """Opens the measurement of the batch handled under in-flight index `index`."""
+        traced = 0
+        if self.mode == "tracemalloc":
+            traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._open[index] = {
+            "start": time.perf_counter(),
+            "rss": process_rss_bytes(os.getpid()) or 0,
+            "traced": traced,
+        }
+
+    def describe(self, index, entities, sizes):
+        """
+        Records the entities of the open batch.
+
+        Parameters:
+        - entities (list[dict]): The parsed entities.
+        - sizes (list[int]): Line bytes of each entity (empty when unknown).
+        """
+        largest = max(range(len(sizes)), key=sizes.__getitem__) if sizes else 0
+        batch = self._open[index]
+        batch["entity_id"] = entities[largest].get("id") if entities else None
+        batch["entity_bytes"] = sizes[largest] if sizes else None
+        batch["batch_entities"] = len(entities)
+        batch["batch_bytes"] = sum(sizes) if sizes else None
+
+    def end(self, index, heavy=False):
+        """Closes the measurement of a batch and ranks it."""
+        batch = self._open.pop(index, None)
+        if batch is None:
+            return
+        seconds = time.perf_counter() - batch.pop("start")
+        rss_before = batch.pop("rss")
+        traced_before = batch.pop("traced")
+        rss = process_rss_bytes(os.getpid()) or 0
+        record = {
+            **batch,
+            "heavy": heavy,
+            "seconds": round(seconds, 4),
+            "rss_mb": round(rss / _MB, 1),
+            "rss_growth_mb": round((rss - rss_before) / _MB, 1),
+        }
+        memory = max(0, rss - rss_before)
+        if self.mode == "tracemalloc":
+            memory = max(0, tracemalloc.get_traced_memory()[1] - traced_before)
+            record["peak_mb"] = round(memory / _MB, 1)
+
+        with self._lock:
+            self.batches += 1
+            self.max_rss = max(self.max_rss, rss)
+            self.max_peak = max(self.max_peak, memory)
+            order = next(self._order)
+            for heap, key in ((self._by_memory, memory), (self._by_time, seconds)):
+                if len(heap) < self.top_n:
+                    heapq.heappush(heap, (key, order, record))
+                elif key > heap[0][0]:
+                    heapq.heapreplace(heap, (key, order, record))
+            due = time.monotonic() - self._last_report >= self.report_interval_s
+        if due:
+            self.write()
+
+    def report(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "batches": self.batches,
+                "max_rss_mb": round(self.max_rss / _MB, 1),
+                "max_batch_memory_mb": round(self.max_peak / _MB, 1),
+                "top_by_memory": [record for _, _, record in self._by_memory],
+                "top_by_time": [record for _, _, record in self._by_time],
+            }
+
+    def write(self):
+        if not self.report_path:
+            return
+        self._last_report = time.monotonic()
+        tmp_path = f"{self.report_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f_out:
+            f_out.write(orjson.dumps(self.report()))
+        os.replace(tmp_path, self.report_path)
+
+    @staticmethod
+    def merge(reports, mode, top_n=20):
+        """
+        Combines the reports of every consumer of a pass.
+
+        Returns:
+        - dict: Totals, the highest consumer RSS and the top_n batches by memory
+            (tracemalloc peak, or RSS growth) and by time across consumers.
+        """
+        memory_key = "peak_mb" if mode == "tracemalloc" else "rss_growth_mb"
+        by_memory = [record for report in reports for record in report["top_by_memory"]]
+        by_time = [record for report in reports for record in report["top_by_time"]]
+        return {
+            "mode": mode,
+            "consumers": len(reports),
+            "batches": sum(report["batches"] for report in reports),
+            "max_consumer_rss_mb": max((report["max_rss_mb"] for report in reports), default=0.0),
+            "max_batch_memory_mb": max((report["max_batch_memory_mb"] for report in reports), default=0.0),
+            "top_by_memory": sorted(by_memory, key=lambda r: r[memory_key], reverse=True)[:top_n],
+            "top_by_time": sorted(by_time, key=lambda r: r["seconds"], reverse=True)[:top_n],
+        }
@@ -0,0 +1,108 @@
+"""
+Retry strategies for a batch whose handler raised.
+
+"per_item" reruns the handler once per item. "bisect" splits the failed batch in
+halves and recurses into the halves that fail again, so a single bad item costs
+about 2 * log2(n) extra handler calls instead of n, and the good items are still
+handled in large batches. A failed batch of a single item is reported as failed
+without calling the handler again.
+"""
+
+RETRY_STRATEGIES = ("bisect", "per_item")
+
+
+def _retry_plan(items, strategy):
+    """
+    Yields the parts of a failed batch to hand to the handler again, and receives
+    the exception each one raised (None if it succeeded). "bisect" splits a failed
+    part in halves, left half first; "per_item" yields every item alone.
+    """
+    if strategy == "per_item":
+        for item in items:
+            yield [item]
+        return
+
+    # The whole batch is known to fail, so start from its halves.
+    middle = len(items) // 2
+    pending = [items[middle:], items[:middle]]
+    while pending:
+        part = pending.pop()
+        if not part:
+            continue
+        part_exc = yield part
+        if part_exc is not None and len(part) > 1:
+            middle = len(part) // 2
+            pending.extend((part[middle:], part[:middle]))
+
+
+def _send(plan, exc):
+    try:
+        return plan.send(exc)
+    except StopIteration:
+        return None
+
+
+def retry_batch(handler_func, items, strategy="bisect", on_error=None, exc=None):
+    """
+    Reprocesses the items of a failed batch.
+
+    Parameters:
+    - handler_func (callable): Batch handler, called with a list of items.
+    - items (list): The items of the batch that failed.
+    - strategy (str): "bisect" or "per_item".
+    - on_error (callable or None): Called as on_error(item, exception) for every item
+        that still fails on its own.
+    - exc (Exception or None): The exception the batch failed with. A failed batch of
+        one item is then reported with it instead of being handled again.
+
+    Returns:
+    - int: Number of items that were handled successfully.
+    """
+    if strategy not in RETRY_STRATEGIES:
+        raise ValueError(f"Unknown retry strategy '{strategy}'")
+    if len(items) == 1 and exc is not None:
+        if on_error is not None:
+            on_error(items[0], exc)
+        return 0
+
+    processed = 0
+    plan = _retry_plan(items, strategy)
+    part = next(plan, None)
+    while part is not None:
+        try:
+            handler_func(part)
+            processed += len(part)
+            part_exc = None
+        except Exception as e:
+            part_exc = e
+            if len(part) == 1 and on_error is not None:
+                on_error(part[0], e)
+        part = _send(plan, part_exc)
+    return processed
+
+
+async def retry_batch_async(handler_func, items, strategy="bisect", on_error=None, exc=None):
+    """
+    Coroutine counterpart of retry_batch for async batch handlers.
+    """
+    if strategy not in RETRY_STRATEGIES:
+        raise ValueError(f"Unknown retry strategy '{strategy}'")
+    if len(items) == 1 and exc is not None:
+        if on_error is not None:
+            on_error(items[0], exc)
+        return 0
+
+    processed = 0
+    plan = _retry_plan(items, strategy)
+    part = next(plan, None)
+    while part is not None:
+        try:
+            await handler_func(part)
+            processed += len(part)
+            part_exc = None
+        except Exception as e:
+            part_exc = e
+            if len(part) == 1 and on_error is not None:
+                on_error(part[0], e)
+        part = _send(plan, part_exc)
+    return processed
@@ -0,0 +1,254 @@
+"""
+Block index for bz2 dumps.
+
+A bz2 file is a sequence of streams, each holding compressed blocks that start
+with a 48-bit magic number at an arbitrary bit offset. Blocks are independent:
+any single block can be decompressed by wrapping its bits into a fresh
+one-block stream (header, block, end-of-stream marker and a stream CRC equal to
+the block CRC). This lets several processes decompress disjoint block ranges
+of the same file, whether it is multistream or a single stream of many blocks.
+"""
+import bz2
+import os
+import struct
+from collections import namedtuple
+from tqdm import tqdm
+
+BLOCK_MAGIC = 0x314159265359
+EOS_MAGIC = 0x177245385090
+SCAN_CHUNK_SIZE = 64 * 1024 * 1024
+
+INDEX_MAGIC = b"WDBZIDX1"
+_HEADER = struct.Struct("<8sQdQ")
+_BLOCK = struct.Struct("<QQ")
+
+Bz2Block = namedtuple("Bz2Block", ["start_bit", "end_bit"])
+
+
+def _magic_patterns(magic):
+    """
+    Returns, for every bit shift, the fully determined middle bytes of the magic
+    plus the masks and values of the partially covered first and last bytes.
+    """
+    patterns = []
+    for shift in range(8):
+        if shift == 0:
+            patterns.append((shift, magic.to_bytes(6, "big"), 0, 0, 0, 0))
+            continue
+        shifted = (magic << (8 - shift)).to_bytes(7, "big")
+        first_mask = 0xFF >> shift
+        last_mask = (0xFF << (8 - shift)) & 0xFF
+        patterns.append((
+            shift, shifted[1:6],
+            first_mask, shifted[0] & first_mask,
+            last_mask, shifted[6] & last_mask,
+        ))
+    return patterns
+
+
+def _find_magic_bits(data, patterns, base_offset, limit):
+    """
+    Finds bit offsets of a magic number inside `data` for matches starting before
+    byte `limit`. Offsets are absolute (base_offset is the file offset of data[0]).
+    """
+    found = []
+    for shift, middle, first_mask, first_value, last_mask, last_value in patterns:
+        start = 0 if shift == 0 else 1
+        pos = data.find(middle, start)
+        while pos != -1:
+            first = pos - start
+            if first >= limit:
+                break
+            if shift == 0:
+                found.append((base_offset + first) * 8)
+            elif first + 6 < len(data) \
+                    and data[first] & first_mask == first_value \
+                    and data[first + 6] & last_mask == last_value:
+                found.append((base_offset + first) * 8 + shift)
+            pos = data.find(middle, pos + 1)
+    return found
+
+
+class Bz2BlockIndex:
+    """
+    Bit offsets of every compressed block in a bz2 file.
+    """
+
+    def __init__(self, file_path, blocks, file_size=None, file_mtime=None):
+        self.file_path = file_path
+        self.blocks = blocks
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+
+    @staticmethod
+    def default_path(file_path):
+        return file_path + ".bz2index"
+
+    @classmethod
+    def build(cls, file_path, show_progress=True):
+        """
+        Scans the compressed file for block and end-of-stream magic numbers at every
+        bit offset. Each block runs from its magic to the next magic of either kind.
+
+        Parameters:
+        - file_path (str): Path to the bz2 file.
+        - show_progress (bool): If True, displays a progress bar over the compressed file.
+
+        Returns:
+        - Bz2BlockIndex: The built index.
+        """
+        file_size = os.path.getsize(file_path)
+        block_patterns = _magic_patterns(BLOCK_MAGIC)
+        eos_patterns = _magic_patterns(EOS_MAGIC)
+        block_bits = []
+        eos_bits = []
+
+        with open(file_path, "rb") as f, tqdm(
+            total=file_size,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=f"Indexing {file_path}",
+            disable=not show_progress,
+        ) as pbar:
+            offset = 0
+            tail = b""
+            while True:
+                chunk = f.read(SCAN_CHUNK_SIZE)
+                data = tail + chunk
+                base = offset - len(tail)
+                # Matches starting in the overlap are reported with the next chunk.
+                limit = len(data) if not chunk else len(data) - 6
+                block_bits.extend(_find_magic_bits(data, block_patterns, base, limit))
+                eos_bits.extend(_find_magic_bits(data, eos_patterns, base, limit))
+                if not chunk:
+                    break
+                tail = data[limit:]
+                offset += len(chunk)
+                pbar.update(len(chunk))
+
+        block_bits = sorted(set(block_bits))
+        markers = sorted(set(block_bits) | set(eos_bits))
+        next_marker = {start: end for start, end in zip(markers, markers[1:])}
+        blocks = [
+            Bz2Block(start, next_marker[start])
+            for start in block_bits
+            if start in next_marker
+        ]
+        return cls(file_path, blocks, file_size=file_size, file_mtime=os.path.getmtime(file_path))
+
+    def save(self, index_path=None):
+        index_path = index_path or self.default_path(self.file_path)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, self.file_size or 0, self.file_mtime or 0.0, len(self.blocks)))
+            for block in self.blocks:
+                f.write(_BLOCK.pack(block.start_bit, block.end_bit))
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, file_path, index_path=None):
+        """
+        Loads the block index for `file_path`.
+
+        Returns:
+        - Bz2BlockIndex or None: The index, or None if it is missing or stale.
+        """
+        index_path = index_path or cls.default_path(file_path)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "rb") as f:
+            magic, file_size, file_mtime, num_blocks = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != INDEX_MAGIC:
+                return None
+            if file_size != os.path.getsize(file_path) or file_mtime != os.path.getmtime(file_path):
+                return None
+            blocks = [Bz2Block(*_BLOCK.unpack(f.read(_BLOCK.size))) for _ in range(num_blocks)]
+
+        return cls(file_path, blocks, file_size=file_size, file_mtime=file_mtime)
+
+    @classmethod
+    def load_or_build(cls, file_path, show_progress=True):
+        index = cls.load(file_path)
+        if index is None:
+            index = cls.build(file_path, show_progress=show_progress)
+            index.save()
+        return index
+
+    def ranges(self, blocks_per_range):
+        """
+        Splits the blocks into consecutive (first_block, end_block) ranges.
+        """
+        blocks_per_range = max(1, int(blocks_per_range))
+        return [
+            (start, min(start + blocks_per_range, len(self.blocks)))
+            for start in range(0, len(self.blocks), blocks_per_range)
+        ]
+
+    def read_block(self, f, block_id):
+        """
+        Decompresses a single block by wrapping it into a one-block stream.
+
+        Parameters:
+        - f (file): The bz2 file opened in binary mode.
+        - block_id (int): Index of the block.
+
+        Returns:
+        - bytes: The decompressed block.
+        """
+        start_bit, end_bit = self.blocks[block_id]
+        first_byte = start_bit // 8
+        last_byte = (end_bit + 7) // 8
+        f.seek(first_byte)
+        raw = f.read(last_byte - first_byte)
+
+        num_bits = end_bit - start_bit
+        value = int.from_bytes(raw, "big")
+        value >>= len(raw) * 8 - (end_bit - first_byte * 8)
+        value &= (1 << num_bits) - 1
+
+        block_crc = (value >> (num_bits - 80)) & 0xFFFFFFFF
+        value = (value << 80) | (EOS_MAGIC << 32) | block_crc
+        num_bits += 80
+        padding = -num_bits % 8
+        stream = b"BZh9" + (value << padding).to_bytes((num_bits + padding) // 8, "big")
+        return bz2.decompress(stream)
+
+    def iter_range_lines(self, first_block, end_block):
+        """
+        Yields the lines that start inside blocks [first_block, end_block).
+        A line that continues past end_block is completed from the following blocks;
+        a partial first line belongs to the previous range and is dropped.
+
+        Returns:
+        - Iterator[bytes]: Complete lines including their trailing newline.
+        """
+        with open(self.file_path, "rb") as f:
+            line_start = first_block == 0 or self.read_block(f, first_block - 1).endswith(b"\n")
+            skip_partial = not line_start
+            pending = b""
+
+            for block_id in range(first_block, end_block):
+                data = pending + self.read_block(f, block_id)
+                lines = data.split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if skip_partial:
+                        skip_partial = False
+                        continue
+                    yield line + b"\n"
+
+            if skip_partial or not pending:
+                return
+
+            for block_id in range(end_block, len(self.blocks)):
+                data = self.read_block(f, block_id)
+                newline = data.find(b"\n")
+                if newline == -1:
+                    pending += data
+                    continue
+                yield pending + data[:newline + 1]
+                return
+
+            yield pending
@@ -0,0 +1,100 @@
+"""
+On-disk dead-letter store for entities whose handler kept failing.
+
+Each stage writes to its own directory (for example data/dead_letter/vectordb_en),
+and every process appends to its own gzip-compressed JSONL file, so consumers never
+share a file handle. A record holds the entity as a JSON line together with the
+stage, the exception and how many times the entity was attempted. Records are
+flushed one by one, so they survive a crashed run; a file cut off by a crash is
+read up to its last complete record.
+"""
+from datetime import datetime, timezone
+import glob
+import gzip
+import os
+import threading
+import uuid
+from multiprocessing import util
+
+import orjson
+
+from src.lazyEntity import materialize_entity
+
+
+class DeadLetterStore:
+    def __init__(self, root_dir, stage):
+        """
+        Parameters:
+        - root_dir (str): Root directory of the dead-letter files.
+        - stage (str): Stage name; records are written to root_dir/stage.
+        """
+        self.root_dir = root_dir
+        self.stage = stage
+        self.stage_dir = os.path.join(root_dir, stage)
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # The store is inherited by forked consumers, each of which opens its own file.
+        if self._pid != os.getpid():
+            self._file = None
+            self._pid = os.getpid()
+        if self._file is None:
+            os.makedirs(self.stage_dir, exist_ok=True)
+            path = os.path.join(self.stage_dir, f"part-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+            self._file = gzip.open(path, "ab")
+            util.Finalize(self, self.close, exitpriority=10)
+        return self._file
+
+    def add(self, entity, exc, attempts=1):
+        """
+        Appends a failed entity.
+
+        Parameters:
+        - entity (dict): The entity the handler failed on.
+        - exc (Exception): The exception raised by the handler.
+        - attempts (int): How many times the entity was handed to the handler.
+        """
+        record = {
+            "id": entity.get("id"),
+            "stage": self.stage,
+            "error_type": type(exc).__name__,
+            "error": str(exc),
+            "attempts": attempts,
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+            "line": orjson.dumps(materialize_entity(entity)).decode("utf-8"),
+        }
+        with self._lock:
+            f_out = self._open()
+            f_out.write(orjson.dumps(record) + b"\n")
+            f_out.flush()
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._file = None
+
+    def paths(self):
+        return sorted(glob.glob(os.path.join(self.stage_dir, "part-*.jsonl.gz")))
+
+    def iter_records(self, paths=None):
+        """
+        Yields the records of the stage (or of the given files) in file order.
+        """
+        for path in self.paths() if paths is None else paths:
+            with gzip.open(path, "rb") as f_in:
+                try:
+                    for line in f_in:
+                        if line.strip():
+                            yield orjson.loads(line)
+                except (EOFError, orjson.JSONDecodeError):
+                    print(f"Dead-letter file {path} is truncated, skipping the rest of it.")
+
+    @staticmethod
+    def stages(root_dir):
+        """Returns the stages that have dead-letter files under root_dir."""
+        return sorted(
+            stage for stage in os.listdir(root_dir)
+            if glob.glob(os.path.join(root_dir, stage, "part-*.jsonl.gz"))
+        ) if os.path.isdir(root_dir) else []
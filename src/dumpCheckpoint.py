@@ -0,0 +1,138 @@
+"""
+Durable progress checkpoints for WikidataDumpReader passes.
+
+The dump is read as one or more segments (the whole file for a single producer,
+or one index range per segment with parallel producers). Producers number the
+batches of every segment and record the uncompressed byte offset right after
+each batch. Consumers report finished batches, and the checkpoint keeps, per
+segment, the offset below which every batch has been fully processed. A resumed
+pass restarts each segment at that offset, so at most the batches that were in
+flight at the time of a crash are processed twice.
+"""
+from datetime import datetime, timezone
+import json
+import os
+
+
+class DumpCheckpoint:
+    def __init__(self, path, file_path, layout):
+        """
+        Parameters:
+        - path (str): Where the checkpoint JSON is written.
+        - file_path (str): The dump being read.
+        - layout (dict): Description of how the dump is split into segments. A
+            checkpoint can only be resumed with the same layout.
+        """
+        self.path = path
+        self.file_path = file_path
+        self.layout = layout
+        self.segments = {}
+        self._pending = {}
+        self._num_batches = {}
+
+    def _dump_identity(self):
+        return {
+            "path": self.file_path,
+            "size": os.path.getsize(self.file_path),
+            "mtime": os.path.getmtime(self.file_path),
+        }
+
+    @classmethod
+    def load(cls, path, file_path, layout):
+        """
+        Loads a checkpoint written for the same dump file.
+
+        Returns:
+        - DumpCheckpoint or None: The checkpoint, or None if it is missing or was
+            written for a different dump.
+
+        Raises:
+        - ValueError: If the checkpoint was written with a different segment layout.
+        """
+        checkpoint = cls(path, file_path, layout)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as f_in:
+            data = json.load(f_in)
+
+        if data.get("dump") != checkpoint._dump_identity():
+            print(f"Checkpoint {path} belongs to a different dump, starting from scratch.")
+            return None
+        if data.get("layout") != layout:
+            raise ValueError(
+                f"Checkpoint {path} was written with layout {data.get('layout')}, "
+                f"current layout is {layout}. Rerun with the same reader settings or remove the checkpoint."
+            )
+
+        for segment_id, segment in data.get("segments", {}).items():
+            checkpoint.segments[int(segment_id)] = {
+                "offset": int(segment["offset"]),
+                "complete": bool(segment["complete"]),
+                "next_seq": 0,
+            }
+        return checkpoint
+
+    def resume_offsets(self):
+        """Returns {segment_id: offset} for segments that were started but not finished."""
+        return {
+            segment_id: segment["offset"]
+            for segment_id, segment in self.segments.items()
+            if not segment["complete"] and segment["offset"] > 0
+        }
+
+    def completed_segments(self):
+        return {
+            segment_id
+            for segment_id, segment in self.segments.items()
+            if segment["complete"]
+        }
+
+    def _segment(self, segment_id):
+        return self.segments.setdefault(segment_id, {"offset": 0, "complete": False, "next_seq": 0})
+
+    def record_batch(self, segment_id, seq, end_offset):
+        """Marks batch `seq` of a segment as processed and advances the watermark."""
+        segment = self._segment(segment_id)
+        pending = self._pending.setdefault(segment_id, {})
+        pending[seq] = end_offset
+        while segment["next_seq"] in pending:
+            segment["offset"] = pending.pop(segment["next_seq"])
+            segment["next_seq"] += 1
+        self._check_complete(segment_id)
+
+    def record_segment_end(self, segment_id, num_batches):
+        """Records how many batches a segment produced once its producer reached the end."""
+        self._segment(segment_id)
+        self._num_batches[segment_id] = num_batches
+        self._check_complete(segment_id)
+
+    def _check_complete(self, segment_id):
+        segment = self.segments[segment_id]
+        if self._num_batches.get(segment_id) == segment["next_seq"]:
+            segment["complete"] = True
+
+    def save(self):
+        """Atomically writes the checkpoint file."""
+        data = {
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "dump": self._dump_identity(),
+            "layout": self.layout,
+            "segments": {
+                str(segment_id): {
+                    "offset": segment["offset"],
+                    "complete": segment["complete"],
+                }
+                for segment_id, segment in sorted(self.segments.items())
+            },
+        }
+
+        checkpoint_dir = os.path.dirname(self.path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f_out:
+            json.dump(data, f_out, indent=2)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,82 @@
+"""
+Progress of a WikidataDumpReader pass in compressed bytes of the dump.
+
+The dump is split into the same segments as the checkpoint (the whole file, or one
+index range per segment), and every segment gets its compressed size. Producers
+publish how many compressed bytes of their current segment they have read into a
+shared array, one entry per segment with a single writer, so the reporter and the
+parent can compute the percentage done, the read rate and the remaining time
+without locks. The parent also keeps these figures as a time series for run stats.
+"""
+import time
+
+
+class DumpProgress:
+    def __init__(self, ctx, segment_sizes, read_bytes=None):
+        """
+        Parameters:
+        - ctx: The multiprocessing context used to create the shared array.
+        - segment_sizes (list[int]): Compressed bytes of every segment.
+        - read_bytes (dict or None): Compressed bytes per segment that a resumed pass
+            skips; they count as read from the start and not towards the read rate.
+        """
+        self.sizes = list(segment_sizes)
+        self.total_bytes = sum(self.sizes)
+        self.read = ctx.Array('q', len(self.sizes), lock=False)
+        for segment_id, nbytes in (read_bytes or {}).items():
+            self.set(segment_id, nbytes)
+        self.start_bytes = self.bytes_read()
+        self.start_time = time.time()
+        self.series = []
+        self._last_record = None
+
+    def set(self, segment_id, nbytes):
+        """Records that nbytes compressed bytes of a segment have been read."""
+        self.read[segment_id] = max(0, min(int(nbytes), self.sizes[segment_id]))
+
+    def finish(self, segment_id):
+        self.read[segment_id] = self.sizes[segment_id]
+
+    def bytes_read(self):
+        return sum(self.read)
+
+    def sample(self):
+        """
+        Returns:
+        - dict: Elapsed seconds, compressed bytes read, percentage of the dump, read
+            rate of this run in bytes per second and estimated seconds left (None
+            until something has been read).
+        """
+        elapsed = time.time() - self.start_time
+        bytes_read = self.bytes_read()
+        rate = (bytes_read - self.start_bytes) / elapsed if elapsed > 0 else 0.0
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "bytes_read": bytes_read,
+            "percent": round(100 * bytes_read / self.total_bytes, 2) if self.total_bytes else 100.0,
+            "bytes_per_s": round(rate),
+            "eta_s": round((self.total_bytes - bytes_read) / rate) if rate > 0 else None,
+        }
+
+    def record(self, interval_s, force=False):
+        """Appends a sample to the time series if interval_s seconds have passed."""
+        now = time.time()
+        if force or self._last_record is None or now - self._last_record >= interval_s:
+            self.series.append(self.sample())
+            self._last_record = now
+
+    def stats(self):
+        """Returns the last recorded sample with the total size and the time series."""
+        return {
+            "total_bytes": self.total_bytes,
+            **(self.series[-1] if self.series else self.sample()),
+            "series": self.series,
+        }
+
+    @staticmethod
+    def format_eta(seconds):
+        if seconds is None:
+            return "?"
+        hours, rest = divmod(int(seconds), 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
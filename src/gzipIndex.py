@@ -0,0 +1,449 @@
+"""
+zran-style random-access index for gzip dumps.
+
+The index stores access points at deflate block boundaries roughly every
+`spacing` uncompressed bytes. Each point keeps the compressed offset, the
+number of unused bits in the preceding byte and a snapshot of the 32 KiB
+inflate window, which is enough to restart decompression at that point
+without reading the file from the beginning.
+
+Python's zlib module does not expose Z_BLOCK, inflatePrime or
+inflateGetDictionary, so inflate is driven through ctypes on the system libz.
+"""
+from bisect import bisect_right
+import ctypes
+import ctypes.util
+import os
+import struct
+import zlib
+from collections import namedtuple
+from tqdm import tqdm
+
+Z_OK = 0
+Z_STREAM_END = 1
+Z_NEED_DICT = 2
+Z_BUF_ERROR = -5
+Z_NO_FLUSH = 0
+Z_BLOCK = 5
+
+WINDOW_SIZE = 32768
+READ_CHUNK_SIZE = 1024 * 1024
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+INDEX_MAGIC = b"WDGZIDX1"
+_HEADER = struct.Struct("<8sQdQQ")
+_POINT = struct.Struct("<QQBBBI")
+
+GzipIndexPoint = namedtuple(
+    "GzipIndexPoint",
+    ["uncompressed_offset", "compressed_offset", "bits", "member_start", "line_start", "window"],
+)
+
+
+class _ZStream(ctypes.Structure):
+    _fields_ = [
+        ("next_in", ctypes.c_void_p),
+        ("avail_in", ctypes.c_uint),
+        ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p),
+        ("avail_out", ctypes.c_uint),
+        ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p),
+        ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p),
+        ("zfree", ctypes.c_void_p),
+        ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int),
+        ("adler", ctypes.c_ulong),
+        ("reserved", ctypes.c_ulong),
+    ]
+
+
+def _load_libz():
+    path = ctypes.util.find_library("z")
+    if not path:
+        raise RuntimeError("libz shared library not found; gzip indexing is unavailable.")
+    lib = ctypes.CDLL(path)
+    stream_p = ctypes.POINTER(_ZStream)
+    lib.zlibVersion.restype = ctypes.c_char_p
+    lib.inflateInit2_.argtypes = [stream_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+    lib.inflate.argtypes = [stream_p, ctypes.c_int]
+    lib.inflateEnd.argtypes = [stream_p]
+    lib.inflateReset2.argtypes = [stream_p, ctypes.c_int]
+    lib.inflatePrime.argtypes = [stream_p, ctypes.c_int, ctypes.c_int]
+    lib.inflateSetDictionary.argtypes = [stream_p, ctypes.c_char_p, ctypes.c_uint]
+    lib.inflateGetDictionary.argtypes = [stream_p, ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint)]
+    return lib
+
+
+_LIBZ = None
+
+
+def _libz():
+    global _LIBZ
+    if _LIBZ is None:
+        _LIBZ = _load_libz()
+    return _LIBZ
+
+
+class _Inflater:
+    """
+    Minimal ctypes wrapper around a zlib inflate stream.
+    """
+
+    def __init__(self, window_bits):
+        self.lib = _libz()
+        self.strm = _ZStream()
+        ret = self.lib.inflateInit2_(
+            ctypes.byref(self.strm), window_bits,
+            self.lib.zlibVersion(), ctypes.sizeof(_ZStream)
+        )
+        if ret != Z_OK:
+            raise RuntimeError(f"inflateInit2 failed with code {ret}")
+        self.in_buf = None
+        self.out_buf = ctypes.create_string_buffer(OUTPUT_CHUNK_SIZE)
+
+    def close(self):
+        if self.strm is not None:
+            self.lib.inflateEnd(ctypes.byref(self.strm))
+            self.strm = None
+
+    def reset(self, window_bits):
+        ret = self.lib.inflateReset2(ctypes.byref(self.strm), window_bits)
+        if ret != Z_OK:
+            raise RuntimeError(f"inflateReset2 failed with code {ret}")
+
+    def prime(self, bits, value):
+        ret = self.lib.inflatePrime(ctypes.byref(self.strm), bits, value)
+        if ret != Z_OK:
+            raise RuntimeError(f"inflatePrime failed with code {ret}")
+
+    def set_dictionary(self, window):
+        ret = self.lib.inflateSetDictionary(ctypes.byref(self.strm), window, len(window))
+        if ret != Z_OK:
+            raise RuntimeError(f"inflateSetDictionary failed with code {ret}")
+
+    def get_dictionary(self):
+        buf = ctypes.create_string_buffer(WINDOW_SIZE)
+        length = ctypes.c_uint(0)
+        ret = self.lib.inflateGetDictionary(ctypes.byref(self.strm), buf, ctypes.byref(length))
+        if ret != Z_OK:
+            raise RuntimeError(f"inflateGetDictionary failed with code {ret}")
+        return buf.raw[:length.value]
+
+    @property
+    def avail_in(self):
+        return self.strm.avail_in
+
+    @property
+    def data_type(self):
+        return self.strm.data_type
+
+    def feed(self, data):
+        # Keep a reference so the memory stays valid while zlib reads from it.
+        self.in_buf = ctypes.create_string_buffer(data, len(data))
+        self.strm.next_in = ctypes.cast(self.in_buf, ctypes.c_void_p)
+        self.strm.avail_in = len(data)
+
+    def unused_input(self):
+        """Returns the input bytes that zlib has not consumed yet."""
+        if not self.strm.avail_in:
+            return b""
+        start = self.strm.next_in - ctypes.addressof(self.in_buf)
+        return self.in_buf.raw[start:start + self.strm.avail_in]
+
+    def inflate(self, flush=Z_NO_FLUSH):
+        """
+        Runs one inflate call into the output buffer.
+
+        Returns:
+        - tuple[int, int, bytes]: (zlib return code, consumed input bytes, output bytes).
+        """
+        before_in = self.strm.avail_in
+        self.strm.next_out = ctypes.cast(self.out_buf, ctypes.c_void_p)
+        self.strm.avail_out = OUTPUT_CHUNK_SIZE
+        ret = self.lib.inflate(ctypes.byref(self.strm), flush)
+        if ret not in (Z_OK, Z_STREAM_END, Z_BUF_ERROR):
+            msg = self.strm.msg.decode() if self.strm.msg else ""
+            raise zlib.error(f"inflate failed with code {ret} {msg}".strip())
+        produced = OUTPUT_CHUNK_SIZE - self.strm.avail_out
+        consumed = before_in - self.strm.avail_in
+        # string_at copies only the produced bytes (.raw would copy the whole buffer).
+        return ret, consumed, ctypes.string_at(self.out_buf, produced)
+
+
+class GzipIndex:
+    """
+    Access points into a (possibly multi-member) gzip file.
+    """
+
+    def __init__(self, file_path, points, spacing, file_size=None, file_mtime=None):
+        self.file_path = file_path
+        self.points = points
+        self._uncompressed_offsets = [p.uncompressed_offset for p in points]
+        self.spacing = spacing
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+
+    @staticmethod
+    def default_path(file_path):
+        return file_path + ".gzindex"
+
+    @classmethod
+    def build(cls, file_path, spacing=128 * 1024 * 1024, show_progress=True):
+        """
+        Decompresses the whole file once and records an access point at the first
+        deflate block boundary after every `spacing` uncompressed bytes.
+
+        Parameters:
+        - file_path (str): Path to the gzip file.
+        - spacing (int): Minimum number of uncompressed bytes between access points.
+        - show_progress (bool): If True, displays a progress bar over the compressed file.
+
+        Returns:
+        - GzipIndex: The built index.
+        """
+        file_size = os.path.getsize(file_path)
+        points = []
+        total_in = 0
+        total_out = 0
+        last_point_out = 0
+        last_byte = b"\n"
+        at_member_start = True
+
+        inflater = _Inflater(31)
+        try:
+            with open(file_path, "rb") as f, tqdm(
+                total=file_size,
+                unit="B",
+                unit_scale=True,
+                unit_divisor=1024,
+                desc=f"Indexing {file_path}",
+                disable=not show_progress,
+            ) as pbar:
+                while True:
+                    if at_member_start and (not points or total_out - last_point_out >= spacing):
+                        points.append(GzipIndexPoint(
+                            total_out, total_in, 0, True, last_byte == b"\n", b""
+                        ))
+                        last_point_out = total_out
+                    at_member_start = False
+
+                    if inflater.avail_in == 0:
+                        data = f.read(READ_CHUNK_SIZE)
+                        if not data:
+                            raise EOFError(f"Unexpected end of gzip data in {file_path}")
+                        inflater.feed(data)
+
+                    ret, consumed, output = inflater.inflate(Z_BLOCK)
+                    total_in += consumed
+                    total_out += len(output)
+                    pbar.update(consumed)
+                    if output:
+                        last_byte = output[-1:]
+
+                    if ret == Z_STREAM_END:
+                        # End of a gzip member: continue with the next one if any.
+                        pending = inflater.unused_input()
+                        if not pending:
+                            pending = f.read(READ_CHUNK_SIZE)
+                        if not pending.strip(b"\x00"):
+                            break
+                        inflater.reset(31)
+                        inflater.feed(pending)
+                        at_member_start = True
+                        continue
+
+                    data_type = inflater.data_type
+                    end_of_block = data_type & 128 and not data_type & 64
+                    if end_of_block and total_out - last_point_out >= spacing:
+                        points.append(GzipIndexPoint(
+                            total_out, total_in, data_type & 7, False,
+                            last_byte == b"\n", inflater.get_dictionary()
+                        ))
+                        last_point_out = total_out
+        finally:
+            inflater.close()
+
+        return cls(
+            file_path, points, spacing,
+            file_size=file_size, file_mtime=os.path.getmtime(file_path)
+        )
+
+    def save(self, index_path=None):
+        """
+        Writes the index next to the dump (or to `index_path`).
+        Windows are stored zlib-compressed.
+        """
+        index_path = index_path or self.default_path(self.file_path)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(
+                INDEX_MAGIC, self.file_size or 0, self.file_mtime or 0.0,
+                self.spacing, len(self.points)
+            ))
+            for p in self.points:
+                window = zlib.compress(p.window) if p.window else b""
+                f.write(_POINT.pack(
+                    p.uncompressed_offset, p.compressed_offset, p.bits,
+                    int(p.member_start), int(p.line_start), len(window)
+                ))
+                f.write(window)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, file_path, index_path=None):
+        """
+        Loads the index for `file_path`.
+
+        Returns:
+        - GzipIndex or None: The index, or None if it is missing or stale.
+        """
+        index_path = index_path or cls.default_path(file_path)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "rb") as f:
+            magic, file_size, file_mtime, spacing, num_points = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != INDEX_MAGIC:
+                return None
+            if file_size != os.path.getsize(file_path) or file_mtime != os.path.getmtime(file_path):
+                return None
+
+            points = []
+            for _ in range(num_points):
+                uoff, coff, bits, member_start, line_start, wlen = _POINT.unpack(f.read(_POINT.size))
+                window = zlib.decompress(f.read(wlen)) if wlen else b""
+                points.append(GzipIndexPoint(
+                    uoff, coff, bits, bool(member_start), bool(line_start), window
+                ))
+
+        return cls(file_path, points, spacing, file_size=file_size, file_mtime=file_mtime)
+
+    @classmethod
+    def load_or_build(cls, file_path, spacing=128 * 1024 * 1024, show_progress=True):
+        """Loads the index next to the dump, rebuilding it if missing, stale or built with another spacing."""
+        index = cls.load(file_path)
+        if index is None or index.spacing != spacing:
+            index = cls.build(file_path, spacing=spacing, show_progress=show_progress)
+            index.save()
+        return index
+
+    def ranges(self):
+        """
+        Returns the (start_point, end_uncompressed_offset) spans between access points.
+        The last span has no end offset and runs until the end of the file.
+        """
+        spans = []
+        for i, point in enumerate(self.points):
+            end = self.points[i + 1].uncompressed_offset if i + 1 < len(self.points) else None
+            spans.append((point, end))
+        return spans
+
+    def compressed_offset_at(self, uncompressed_offset):
+        """
+        Estimates the compressed offset decompression has reached at uncompressed_offset,
+        interpolating between the surrounding access points. Past the last point the
+        average compression ratio of the file so far is used.
+        """
+        i = max(0, bisect_right(self._uncompressed_offsets, uncompressed_offset) - 1)
+        point = self.points[i]
+        if i + 1 < len(self.points):
+            end = self.points[i + 1]
+        elif i > 0:
+            end = point
+            point = self.points[0]
+        else:
+            return point.compressed_offset
+        ratio = (end.compressed_offset - point.compressed_offset) \
+            / max(1, end.uncompressed_offset - point.uncompressed_offset)
+        return int(point.compressed_offset + ratio * (uncompressed_offset - point.uncompressed_offset))
+
+    def iter_chunks(self, point):
+        """
+        Yields decompressed chunks starting at an access point, up to the end of the file.
+
+        Parameters:
+        - point (GzipIndexPoint): Where to start decompressing.
+
+        Returns:
+        - Iterator[bytes]: Decompressed data starting at point.uncompressed_offset.
+        """
+        inflater = _Inflater(31 if point.member_start else -15)
+        raw_mode = not point.member_start
+        try:
+            with open(self.file_path, "rb") as f:
+                f.seek(point.compressed_offset - (1 if point.bits else 0))
+                if point.bits:
+                    byte = f.read(1)[0]
+                    inflater.prime(point.bits, byte >> (8 - point.bits))
+                if point.window:
+                    inflater.set_dictionary(point.window)
+
+                while True:
+                    if inflater.avail_in == 0:
+                        data = f.read(READ_CHUNK_SIZE)
+                        if not data:
+                            return
+                        inflater.feed(data)
+
+                    ret, _, output = inflater.inflate()
+                    if output:
+                        yield output
+
+                    if ret == Z_STREAM_END:
+                        pending = inflater.unused_input()
+                        if raw_mode:
+                            # A raw stream stops before the 8-byte gzip trailer.
+                            while len(pending) < 8:
+                                data = f.read(READ_CHUNK_SIZE)
+                                if not data:
+                                    break
+                                pending += data
+                            pending = pending[8:]
+                            raw_mode = False
+                        if not pending:
+                            pending = f.read(READ_CHUNK_SIZE)
+                        if not pending.strip(b"\x00"):
+                            return
+                        inflater.reset(31)
+                        inflater.feed(pending)
+        finally:
+            inflater.close()
+
+
+def iter_range_lines(chunks, start_offset, end_offset, line_start):
+    """
+    Splits decompressed chunks into lines and yields the lines whose first byte
+    lies in [start_offset, end_offset). A partial first line (when the range does
+    not begin on a line boundary) belongs to the previous range and is dropped.
+
+    Parameters:
+    - chunks (Iterator[bytes]): Decompressed data starting at start_offset.
+    - start_offset (int): Uncompressed offset of the first byte of chunks.
+    - end_offset (int or None): Uncompressed offset where the next range begins.
+    - line_start (bool): True if start_offset is at the beginning of a line.
+
+    Returns:
+    - Iterator[bytes]: Complete lines including their trailing newline.
+    """
+    pos = start_offset
+    pending = b""
+    skip_partial = not line_start
+
+    for chunk in chunks:
+        data = pending + chunk if pending else chunk
+        lines = data.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line_offset = pos
+            pos += len(line) + 1
+            if skip_partial:
+                skip_partial = False
+                continue
+            if end_offset is not None and line_offset >= end_offset:
+                return
+            yield line + b"\n"
+
+    if pending and not skip_partial and (end_offset is None or pos < end_offset):
+        yield pending
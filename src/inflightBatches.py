@@ -0,0 +1,68 @@
+"""
+Per-consumer record of the batch being handled, for supervised readers.
+
+Every consumer slot owns a few entries (one per batch it may handle at once),
+each a file in a private directory (on /dev/shm when available, so writes stay in
+memory) and a flag in a shared array. A consumer writes its batch to the file,
+then sets the flag, and clears the flag once the batch is done. When a consumer
+dies, the parent takes the batches of its slot and hands them to the replacement
+process. A consumer that dies while writing leaves the flag cleared, so a
+half-written file is never read.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+
+
+class InflightBatches:
+    def __init__(self, ctx, num_slots, per_slot=1, base_dir=None):
+        """
+        Parameters:
+        - ctx: The multiprocessing context used to create the shared flags.
+        - num_slots (int): Number of consumer slots.
+        - per_slot (int): Batches a consumer may have in flight at once.
+        - base_dir (str or None): Parent of the private directory (default: /dev/shm
+            if present, else the system temp directory).
+        """
+        if base_dir is None and os.path.isdir("/dev/shm"):
+            base_dir = "/dev/shm"
+        self.dir = tempfile.mkdtemp(prefix="wd_inflight_", dir=base_dir)
+        self.per_slot = max(1, per_slot)
+        # Each flag has a single writer (the consumer of its slot) while it is alive.
+        self.flags = ctx.Array('b', num_slots * self.per_slot, lock=False)
+
+    def _path(self, slot, index):
+        return os.path.join(self.dir, f"slot-{slot}-{index}.pkl")
+
+    def record(self, slot, entry, index=0):
+        """Stores the picklable entry as in-flight batch `index` of a slot."""
+        with open(self._path(slot, index), "wb") as f_out:
+            pickle.dump(entry, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+        self.flags[slot * self.per_slot + index] = 1
+
+    def clear(self, slot, index=0):
+        self.flags[slot * self.per_slot + index] = 0
+
+    def take(self, slot):
+        """
+        Returns and clears the in-flight entries of a slot whose consumer exited.
+
+        Returns:
+        - list: The entries, empty if the consumer had no batch in flight.
+        """
+        entries = []
+        for index in range(self.per_slot):
+            flag = slot * self.per_slot + index
+            if not self.flags[flag]:
+                continue
+            self.flags[flag] = 0
+            try:
+                with open(self._path(slot, index), "rb") as f_in:
+                    entries.append(pickle.load(f_in))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        return entries
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,169 @@
+"""
+Lazy entity view for filter-heavy passes.
+
+Most of a dump line is the claims object, while filters only look at labels,
+descriptions, sitelinks and a couple of properties. parse_lazy_entity cuts the
+top-level claims out of the line, parses the rest eagerly and keeps the claims
+as raw bytes. Single properties (claims.get("P31")) are sliced out and parsed on
+their own; anything else parses the full claims object once.
+
+Lines that do not have the compact dump layout are parsed fully.
+"""
+from collections.abc import Mapping
+import re
+
+import orjson
+
+_CLAIMS_KEY = re.compile(rb'"claims":')
+# Top-level keys that follow "claims" in dump entities. None of them occurs as a
+# key inside statements, and quotes inside strings are escaped, so the first
+# match after "claims" marks the end of the claims object.
+_AFTER_CLAIMS_KEY = re.compile(rb',"(?:sitelinks|lastrevid|modified|pageid|ns|title|forms|senses)":')
+# Top-level statement lists start with "mainsnak"; qualifier and reference snak
+# lists have the same "Pxx":[ prefix but never contain a mainsnak.
+_STATEMENTS_KEY = re.compile(rb'"P\d+":\[\{"mainsnak"')
+# Keys are the only place "mainsnak": can occur unescaped, so the claims have the
+# compact layout when every statement starts with its mainsnak.
+_MAINSNAK_KEY = b'"mainsnak":'
+_LEADING_MAINSNAK_KEY = b'{"mainsnak":'
+
+
+class LazyClaims(Mapping):
+    """
+    Read-only mapping over the raw bytes of a claims object.
+    """
+
+    __slots__ = ("_blob", "_claims", "_statements", "_num_properties", "_compact")
+
+    def __init__(self, blob):
+        self._blob = blob
+        self._claims = None
+        self._statements = {}
+        self._num_properties = None
+        self._compact = None
+
+    def materialize(self):
+        """Parses and returns the full claims dict."""
+        if self._claims is None:
+            self._claims = orjson.loads(self._blob)
+            self._statements = {}
+        return self._claims
+
+    def _is_compact(self):
+        """True if every statement starts with its mainsnak, as in the dumps."""
+        if self._compact is None:
+            self._compact = self._blob.count(_MAINSNAK_KEY) == self._blob.count(_LEADING_MAINSNAK_KEY)
+        return self._compact
+
+    def _extract(self, pid):
+        """
+        Returns the statements of one property, or None if it has none.
+        Falls back to parsing the full claims if the slice does not parse or
+        the statements do not have the compact layout.
+        """
+        pid_key = b'"' + pid.encode("utf-8") + b'":['
+        key = pid_key + b'{"mainsnak"'
+        start = self._blob.find(key)
+        if start == -1:
+            if pid_key not in self._blob or self._is_compact():
+                return None
+            return self.materialize().get(pid)
+        start += len(key) - len(b'[{"mainsnak"')
+
+        next_key = _STATEMENTS_KEY.search(self._blob, start)
+        end = next_key.start() - 1 if next_key else self._blob.rindex(b"}")
+        try:
+            return orjson.loads(self._blob[start:end])
+        except orjson.JSONDecodeError:
+            return self.materialize().get(pid)
+
+    def get(self, pid, default=None):
+        if self._claims is not None:
+            return self._claims.get(pid, default)
+        if pid not in self._statements:
+            self._statements[pid] = self._extract(pid)
+        statements = self._statements[pid]
+        return default if statements is None else statements
+
+    def __getitem__(self, pid):
+        statements = self.get(pid)
+        if statements is None:
+            raise KeyError(pid)
+        return statements
+
+    def __contains__(self, pid):
+        return self.get(pid) is not None
+
+    def __len__(self):
+        if self._claims is not None:
+            return len(self._claims)
+        if not self._is_compact():
+            return len(self.materialize())
+        if self._num_properties is None:
+            self._num_properties = sum(1 for _ in _STATEMENTS_KEY.finditer(self._blob))
+        return self._num_properties
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+
+class LazyEntity(dict):
+    """
+    Entity dict whose "claims" value is a LazyClaims. Call materialize() before
+    handing it to code that serializes it or expects claims to be a dict.
+    """
+
+    def materialize(self):
+        entity = dict(self)
+        if isinstance(entity.get("claims"), LazyClaims):
+            entity["claims"] = entity["claims"].materialize()
+        return entity
+
+
+def materialize_entity(entity):
+    """Returns a plain dict for a LazyEntity, or the entity itself otherwise."""
+    if isinstance(entity, LazyEntity):
+        return entity.materialize()
+    return entity
+
+
+def parse_lazy_entity(line):
+    """
+    Parses a stripped dump line into a LazyEntity.
+
+    Parameters:
+    - line (bytes or memoryview): One entity as compact JSON.
+
+    Returns:
+    - LazyEntity or dict: The entity; a plain dict if the line has no compact
+        top-level claims object.
+
+    Raises:
+    - orjson.JSONDecodeError: If the line outside the claims is not valid JSON. A
+        malformed claims object is only detected when the claims are accessed.
+    """
+    claims_key = _CLAIMS_KEY.search(line)
+    if claims_key is None:
+        return orjson.loads(line)
+
+    view = memoryview(line)
+    claims_start = claims_key.end()
+    next_key = _AFTER_CLAIMS_KEY.search(line, claims_start)
+    if next_key is not None:
+        claims_end = next_key.start()
+        head = bytes(view[:claims_key.start()]) + bytes(view[claims_end + 1:])
+    else:
+        # Claims is the last key: drop the comma before it.
+        claims_end = len(view) - 1
+        prefix = bytes(view[:claims_key.start()]).rstrip()
+        head = (prefix[:-1] if prefix.endswith(b",") else prefix) + b"}"
+
+    try:
+        entity = LazyEntity(orjson.loads(head))
+    except orjson.JSONDecodeError:
+        return orjson.loads(line)
+    if "claims" in entity:
+        return orjson.loads(line)
+
+    entity["claims"] = LazyClaims(bytes(view[claims_start:claims_end]))
+    return entity
@@ -0,0 +1,49 @@
+"""
+Multi-producer, multi-consumer pipe between the processes of WikidataDumpReader.
+
+It works like multiprocessing.SimpleQueue, but is built from public primitives
+only (a one-way Pipe and two Locks), so the supervisor can check its locks: a
+process killed while it sends or receives a message leaves the corresponding
+lock held, and the pipe possibly cut mid-message.
+"""
+from queue import Empty
+
+
+class LockedPipe:
+    def __init__(self, ctx):
+        """
+        Parameters:
+        - ctx: The multiprocessing context used to create the pipe and the locks.
+        """
+        self._reader, self._writer = ctx.Pipe(duplex=False)
+        self.read_lock = ctx.Lock() # Held while a message is received
+        self.write_lock = ctx.Lock() # Held while a message is sent
+
+    def put(self, obj):
+        with self.write_lock:
+            self._writer.send(obj)
+
+    def get(self, block=True):
+        """
+        Receives the next message. With block=False the read lock is only tried and
+        the pipe is polled under it, so the lock is never held while waiting.
+
+        Raises:
+        - queue.Empty: With block=False, if no message is ready or another process
+            is receiving one.
+        """
+        if block:
+            with self.read_lock:
+                return self._reader.recv()
+
+        if not self.read_lock.acquire(False):
+            raise Empty
+        try:
+            if not self._reader.poll():
+                raise Empty
+            return self._reader.recv()
+        finally:
+            self.read_lock.release()
+
+    def empty(self):
+        return not self._reader.poll()
@@ -0,0 +1,184 @@
+"""
+Live metrics of a run in the Prometheus text exposition format.
+
+The exporter runs in the reporter process of each WikidataDumpReader pass, which
+is forked from the main process after the stage has created its counters and
+timers. It reads only shared memory (the sharded counters of RunStatsTracker, the
+merged span histograms and the reader's shared values), so scraping adds no work
+to the consumers. Metrics are served over HTTP on /metrics, written to a file for
+the node_exporter textfile collector, or both. Between two passes nothing serves
+them; the textfile keeps the figures of the last pass.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+import traceback
+
+from src.spanTimers import BUCKETS_PER_OCTAVE, MIN_SECONDS, NUM_BUCKETS
+
+PREFIX = "wikidata"
+# Histogram bounds exported for spans: every power of two from 1 us to about 18 min.
+SPAN_OCTAVES = 31
+
+READER_COUNTERS = (
+    ("entities_processed", "Entities handled by the consumers."),
+    ("handler_errors", "Entities the handler failed on."),
+    ("prefiltered_lines", "Dump lines dropped by the line prefilter before parsing."),
+    ("batches_produced", "Batches queued by the producers."),
+    ("consumer_restarts", "Consumers restarted by the supervisor."),
+    ("crashed_batches", "Batches given up after crashing consumers."),
+    ("heavy_entities", "Entities handled by the heavy lane."),
+)
+READER_GAUGES = (
+    ("queue_fill", "Fraction of the batch transport in use."),
+    ("queue_depth", "Batches waiting in the transport."),
+    ("queued_bytes", "Bytes of the batches waiting in the queue."),
+    ("active_consumers", "Normal-lane consumers running."),
+)
+PROGRESS_GAUGES = (
+    ("bytes_read", "dump_read_bytes", "Compressed bytes of the dump read."),
+    ("bytes_per_s", "dump_read_bytes_per_second", "Read rate of the pass in compressed bytes per second."),
+    ("eta_s", "dump_eta_seconds", "Estimated seconds until the dump is read."),
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class MetricsExporter:
+    def __init__(self, tracker, port=None, textfile_path=None, interval_s=15):
+        """
+        Parameters:
+        - tracker (RunStatsTracker): Source of the stage name, counters and timers.
+        - port (int or None): If set, /metrics is served on this port.
+        - textfile_path (str or None): If set, the metrics are written to this file
+            (replaced atomically) for the node_exporter textfile collector.
+        - interval_s (float): Seconds between two writes of the textfile.
+        """
+        self.tracker = tracker
+        self.port = port
+        self.textfile_path = textfile_path
+        self.interval_s = interval_s
+        self.reader = None
+        self._server = None
+        self._last_write = 0.0
+
+    def open(self, reader):
+        """Starts serving the metrics of reader's pass (called in the reporter)."""
+        self.reader = reader
+        if self.textfile_path:
+            directory = os.path.dirname(self.textfile_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        if self.port:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = exporter.render().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer(("", self.port), Handler)
+            except OSError:
+                # The previous pass's reporter may still hold the port for a moment.
+                traceback.print_exc()
+            else:
+                threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.update(force=True)
+
+    def update(self, force=False):
+        """Rewrites the textfile if interval_s seconds have passed."""
+        if not self.textfile_path:
+            return
+        now = time.time()
+        if not force and now - self._last_write < self.interval_s:
+            return
+        self._last_write = now
+        try:
+            tmp_path = f"{self.textfile_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f_out:
+                f_out.write(self.render())
+            os.replace(tmp_path, self.textfile_path)
+        except OSError:
+            traceback.print_exc()
+
+    def close(self):
+        self.update(force=True)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def render(self):
+        """Returns every metric of the running pass in the Prometheus text format."""
+        stage = self.tracker.live_stage or "unknown"
+        lines = []
+
+        lines.append(f"# HELP {PREFIX}_stage_counter_total Counters of the running stage, per sink scope.")
+        lines.append(f"# TYPE {PREFIX}_stage_counter_total counter")
+        for scope, counters in list(self.tracker.counter_scopes().items()):
+            for name, value in counters.read().items():
+                labels = _labels(stage=stage, scope=scope or "stage", counter=name)
+                lines.append(f"{PREFIX}_stage_counter_total{labels} {_number(value)}")
+
+        lines.append(f"# HELP {PREFIX}_span_seconds Latency of the timed steps of the running stage.")
+        lines.append(f"# TYPE {PREFIX}_span_seconds histogram")
+        for scope, timers in list(self.tracker.timer_scopes().items()):
+            for name in timers.names:
+                counts, total = timers.bucket_counts(name)
+                base = {"stage": stage, "scope": scope or "stage", "span": name}
+                for octave in range(SPAN_OCTAVES):
+                    upper = min(octave * BUCKETS_PER_OCTAVE, NUM_BUCKETS)
+                    labels = _labels(**base, le=_number(MIN_SECONDS * 2 ** octave))
+                    lines.append(f"{PREFIX}_span_seconds_bucket{labels} {sum(counts[:upper])}")
+                labels = _labels(**base, le="+Inf")
+                lines.append(f"{PREFIX}_span_seconds_bucket{labels} {sum(counts)}")
+                lines.append(f"{PREFIX}_span_seconds_sum{_labels(**base)} {_number(float(total))}")
+                lines.append(f"{PREFIX}_span_seconds_count{_labels(**base)} {sum(counts)}")
+
+        stats = self.reader.shared_stats() if self.reader is not None else {}
+        labels = _labels(stage=stage)
+        for key, help_text in READER_COUNTERS:
+            if key in stats:
+                lines.append(f"# HELP {PREFIX}_reader_{key}_total {help_text}")
+                lines.append(f"# TYPE {PREFIX}_reader_{key}_total counter")
+                lines.append(f"{PREFIX}_reader_{key}_total{labels} {_number(stats[key])}")
+        for key, help_text in READER_GAUGES:
+            if key in stats:
+                lines.append(f"# HELP {PREFIX}_reader_{key} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_reader_{key} gauge")
+                lines.append(f"{PREFIX}_reader_{key}{labels} {_number(stats[key])}")
+        progress = stats.get("dump_progress")
+        if progress is not None:
+            lines.append(f"# HELP {PREFIX}_dump_size_bytes Compressed size of the dump.")
+            lines.append(f"# TYPE {PREFIX}_dump_size_bytes gauge")
+            lines.append(f"{PREFIX}_dump_size_bytes{labels} {_number(self.reader.progress.total_bytes)}")
+            for key, name, help_text in PROGRESS_GAUGES:
+                if progress[key] is not None:
+                    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+                    lines.append(f"# TYPE {PREFIX}_{name} gauge")
+                    lines.append(f"{PREFIX}_{name}{labels} {_number(progress[key])}")
+        return "\n".join(lines) + "\n"
@@ -1,7 +1,100 @@
+from contextlib import nullcontext
 from datetime import datetime, timezone
 import json
 import os
-from multiprocessing import get_context
+import threading
+import time
+from multiprocessing import get_context, util
+
+from src.runTelemetry import RunTelemetry
+from src.spanTimers import SpanHistograms
+
+
+class ShardedCounters:
+    """
+    Shared counters without a lock per increment. Every process adds to local
+    totals and stores the changed total into its own row of a shared array, so
+    the counts of a consumer killed mid-run are kept up to its last add; reading
+    sums the rows. Processes beyond num_slots share an overflow row updated under
+    a lock every flush_interval_s and when they exit, so a crash loses up to one
+    interval of their counts.
+
+    Counts are approximate across crashes either way: a batch that a supervised
+    consumer handled in part before dying is handled again and counted twice.
+    """
+
+    def __init__(self, ctx, names, num_slots=512, flush_interval_s=1.0):
+        self.names = tuple(names)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.num_slots = num_slots
+        self.flush_interval_s = flush_interval_s
+        # One row per process slot, plus the overflow row.
+        self.values = ctx.Array('q', (num_slots + 1) * len(self.names), lock=False)
+        self.next_slot = ctx.Value('i', 0)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._slot = None
+        self._local = None
+        self._flushed = None
+        self._last_flush = 0.0
+        # The telemetry thread may hold the lock while the main thread forks a consumer.
+        util.register_after_fork(self, ShardedCounters._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def add(self, name, value):
+        i = self._index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._attach()
+            self._local[i] += int(value)
+            if self._slot < self.num_slots:
+                # A single aligned 8-byte store; readers never see a torn value.
+                self.values[self._slot * len(self.names) + i] = self._local[i]
+            elif time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self._flush()
+
+    def _attach(self):
+        # First increment in this process (counters are inherited by forked consumers).
+        self._pid = os.getpid()
+        with self.next_slot.get_lock():
+            self._slot = self.next_slot.value
+            self.next_slot.value += 1
+        self._local = [0] * len(self.names)
+        self._flushed = [0] * len(self.names)
+        self._last_flush = time.monotonic()
+        util.Finalize(self, self.flush, exitpriority=10)
+
+    def _flush(self):
+        if self._slot < self.num_slots:
+            base = self._slot * len(self.names)
+            for i, value in enumerate(self._local):
+                self.values[base + i] = value
+        else:
+            base = self.num_slots * len(self.names)
+            with self.next_slot.get_lock():
+                for i, value in enumerate(self._local):
+                    self.values[base + i] += value - self._flushed[i]
+            self._flushed = list(self._local)
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._flush()
+
+    def read(self):
+        """Returns the totals of every counter, including this process's unflushed counts."""
+        self.flush()
+        width = len(self.names)
+        values = self.values[:]
+        return {
+            name: sum(values[row * width + i] for row in range(self.num_slots + 1))
+            for i, name in enumerate(self.names)
+        }
 
 
 class RunStatsTracker:
@@ -25,38 +118,94 @@ class RunStatsTracker:
             },
         }
         self._active_counters = None
+        self._counter_scopes = {}
+        self._active_timers = None
+        self._timer_scopes = {}
+        self.live_stage = None
+        self.live_reader = None
+        self._telemetry = None
 
     @staticmethod
     def _utc_now_iso():
         return datetime.now(timezone.utc).isoformat()
 
     def _create_counters(self, counter_names):
-        return {name: self.ctx.Value("i", 0) for name in counter_names}
+        return ShardedCounters(self.ctx, counter_names)
 
     def _read_counters(self, counters):
-        return {name: int(counter.value) for name, counter in counters.items()}
+        return counters.read()
 
-    def start_counters(self, counter_names):
-        self._active_counters = self._create_counters(counter_names)
-        return self._active_counters
+    def start_counters(self, counter_names, scope=None):
+        """
+        Creates shared counters for a stage. Unscoped counters become active at once;
+        scoped ones (one set per sink of a single-pass run) are activated with
+        use_counter_scope().
+        """
+        counters = self._create_counters(counter_names)
+        self._counter_scopes[scope] = counters
+        if scope is None:
+            self._active_counters = counters
+        return counters
+
+    def start_timers(self, span_names, scope=None):
+        """
+        Creates shared latency histograms for the spans of a stage, activated like
+        the counters of the same scope.
+        """
+        timers = SpanHistograms(self.ctx, span_names)
+        self._timer_scopes[scope] = timers
+        if scope is None:
+            self._active_timers = timers
+        return timers
+
+    def use_counter_scope(self, scope):
+        self._active_counters = self._counter_scopes.get(scope)
+        self._active_timers = self._timer_scopes.get(scope)
 
     def clear_counters(self):
         self._active_counters = None
+        self._counter_scopes = {}
+        self._active_timers = None
+        self._timer_scopes = {}
 
-    def counter_add(self, name, value):
-        if not self._active_counters:
-            return
+    def span(self, name):
+        """Times a block as span `name` of the active stage (no-op without timers)."""
+        if self._active_timers is None:
+            return nullcontext()
+        return self._active_timers.span(name)
 
-        counter = self._active_counters.get(name)
-        if counter is None:
-            return
+    def read_timers(self, timers):
+        return timers.summary()
 
-        with counter.get_lock():
-            counter.value += int(value)
+    def counter_add(self, name, value):
+        if self._active_counters is None:
+            return
+        self._active_counters.add(name, value)
 
     def read_counters(self, counters):
         return self._read_counters(counters)
 
+    def counter_scopes(self):
+        return self._counter_scopes
+
+    def timer_scopes(self):
+        return self._timer_scopes
+
+    def watch_stage(self, stage_name, reader=None):
+        """Names the running stage (and its dump reader) in telemetry records."""
+        self.live_stage = stage_name
+        self.live_reader = reader
+
+    def start_telemetry(self, path, interval_s=10, max_bytes=100 * 1024 * 1024, backups=2):
+        """Starts appending periodic JSONL records of the running stage to path."""
+        self._telemetry = RunTelemetry(self, path, interval_s, max_bytes, backups)
+        self._telemetry.start()
+
+    def stop_telemetry(self):
+        if self._telemetry is not None:
+            self._telemetry.stop()
+            self._telemetry = None
+
     def record_error(self, stage_name, count=1, exc=None):
         count = int(count)
         if count <= 0:
@@ -120,6 +269,8 @@ class RunStatsTracker:
             json.dump(self.stats, f_out, ensure_ascii=False, indent=2)
 
     def finalize(self, status):
+        self.watch_stage(None)
+        self.stop_telemetry()
         self.stats["status"] = status
         self.add_summary()
         self.write()
@@ -0,0 +1,140 @@
+"""
+Periodic telemetry of a run, appended as JSON lines next to the run stats.
+
+A daemon thread of the main process samples the stage that is running every
+interval_s seconds: the counters of RunStatsTracker, the reader's live figures
+(entities processed, handler errors, queue fill, dump progress) turned into rates
+over the last interval, and the resident memory of every consumer. The file is
+rotated once it reaches max_bytes, keeping `backups` older files, so a multi-day
+run stays within (backups + 1) * max_bytes.
+"""
+from datetime import datetime, timezone
+import os
+import threading
+import time
+import traceback
+
+import orjson
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss_bytes(pid):
+    """Returns the resident set size of a process, or None if it is gone (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f_in:
+            return int(f_in.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class RunTelemetry:
+    def __init__(self, tracker, path, interval_s=10, max_bytes=100 * 1024 * 1024, backups=2):
+        """
+        Parameters:
+        - tracker (RunStatsTracker): Source of the stage name, reader and counters.
+        - path (str): JSONL file to append to.
+        - interval_s (float): Seconds between two records.
+        - max_bytes (int): Size at which the file is rotated to path.1, path.2, ...
+        - backups (int): Rotated files kept.
+        """
+        self.tracker = tracker
+        self.path = path
+        self.interval_s = interval_s
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._previous = None
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._run, name="run-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the sampler after writing a last record."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._write(self.sample())
+        self._file.close()
+        self._file = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self._write(self.sample())
+            except Exception:
+                # Telemetry must never take the run down.
+                traceback.print_exc()
+
+    def sample(self):
+        """Returns one telemetry record of the running stage."""
+        now = time.time()
+        stage, reader = self.tracker.live_stage, self.tracker.live_reader
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "stage": stage,
+            "counters": {
+                scope or "stage": counters.read()
+                for scope, counters in list(self.tracker.counter_scopes().items())
+            },
+        }
+        live = reader.live_stats() if reader is not None else {}
+        pids = live.pop("consumer_pids", [])
+        record.update(live)
+        rss = [value for value in (process_rss_bytes(pid) for pid in pids) if value is not None]
+        record["consumer_rss_mb"] = [round(value / 2**20, 1) for value in rss]
+        record["consumer_rss_mb_total"] = round(sum(rss) / 2**20, 1)
+        record["main_rss_mb"] = round((process_rss_bytes(os.getpid()) or 0) / 2**20, 1)
+
+        # Rates over the interval, restarted whenever a new stage begins.
+        previous = self._previous
+        if previous is not None and previous["stage"] == stage and now > previous["time"]:
+            elapsed = now - previous["time"]
+            record["interval_s"] = round(elapsed, 3)
+            if "entities_processed" in live:
+                entities = live["entities_processed"] - previous.get("entities_processed", 0)
+                errors = live["handler_errors"] - previous.get("handler_errors", 0)
+                record["entities_per_s"] = round(entities / elapsed, 2)
+                record["handler_errors_per_s"] = round(errors / elapsed, 3)
+                record["handler_error_ratio"] = round(errors / (entities + errors), 5) if entities + errors else 0.0
+            record["counter_rates"] = {
+                scope: {
+                    name: round((value - previous["counters"].get(scope, {}).get(name, 0)) / elapsed, 2)
+                    for name, value in counters.items()
+                }
+                for scope, counters in record["counters"].items()
+            }
+        self._previous = {
+            "stage": stage,
+            "time": now,
+            "counters": record["counters"],
+            "entities_processed": live.get("entities_processed", 0),
+            "handler_errors": live.get("handler_errors", 0),
+        }
+        return record
+
+    def _write(self, record):
+        line = orjson.dumps(record) + b"\n"
+        if self._file.tell() and self._file.tell() + len(line) > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups, 0, -1):
+            source = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i}")
+        if not self.backups:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
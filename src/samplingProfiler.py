@@ -0,0 +1,103 @@
+"""
+Sampling profiler for the forked consumers of WikidataDumpReader.
+
+A daemon thread wakes every interval_s seconds of wall-clock time, takes the stack
+of every other thread (sys._current_frames()) and counts each one, root first, as
+one line of the collapsed-stack format read by flamegraph.pl, speedscope and
+similar tools ("frame;frame;frame count"). A thread inside a native call
+(tokenizer, orjson.loads, hashlib) shows the Python frame that made the call, so
+the native time is charged to that frame. Native calls that hold the GIL also
+hold the sampler back until they return; each sample is therefore weighted by
+the intervals that passed since the previous one, so such calls are not counted
+as a single sample. The profiled code is never traced, so the cost is one stack
+walk per thread and interval. Every consumer writes its stacks when it finishes,
+and the parent merges them into one file per stage.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    def __init__(self, interval_s=0.01, root=None, max_depth=128):
+        """
+        Parameters:
+        - interval_s (float): Seconds between two samples.
+        - root (str or None): Frame prepended to every stack (e.g. the consumer lane).
+        - max_depth (int): Frames kept from the top of deep stacks.
+        """
+        self.interval_s = interval_s
+        self.root = root
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            weight = max(1, round((now - last) / self.interval_s))
+            last = now
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    self.stacks[self._collapse(frame)] += weight
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if self.root:
+            labels.append(self.root)
+        return ";".join(reversed(labels))
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f_out:
+            for stack, count in self.stacks.items():
+                f_out.write(f"{stack} {count}\n")
+
+    @staticmethod
+    def merge(paths, output_path):
+        """
+        Sums the collapsed stacks of several files into output_path, heaviest first.
+
+        Returns:
+        - int: Total number of samples.
+        """
+        stacks = Counter()
+        for path in paths:
+            with open(path, encoding="utf-8") as f_in:
+                for line in f_in:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack and count.isdigit():
+                        stacks[stack] += int(count)
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f_out:
+            for stack, count in stacks.most_common():
+                f_out.write(f"{stack} {count}\n")
+        return sum(stacks.values())
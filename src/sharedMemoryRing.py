@@ -0,0 +1,186 @@
+"""
+Shared-memory batch transport for WikidataDumpReader.
+
+A fixed number of fixed-size slots live in one `multiprocessing.shared_memory`
+block. Producers copy raw line bytes plus an offset table into a free slot and
+publish the slot index; consumers parse memoryview slices of the slot in place
+and hand the index back once the lines are parsed. Only slot indices travel
+through pipes, so batches are never pickled.
+
+Slot layout: a 16-byte header (line count, blob length), the line blob padded
+to 8 bytes, then one int64 end offset per line.
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+
+from src.lockedPipe import LockedPipe
+
+_SLOT_HEADER = struct.Struct("<QQ")
+
+
+class SharedMemoryRing:
+    def __init__(self, ctx, num_slots, slot_size):
+        """
+        Parameters:
+        - ctx: The multiprocessing context used to create the synchronization primitives.
+        - num_slots (int): Number of slots (maximum batches in flight).
+        - slot_size (int): Size of one slot in bytes.
+        """
+        self.num_slots = max(1, int(num_slots))
+        self.slot_size = max(_SLOT_HEADER.size + 64, int(slot_size))
+        self.shm = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_size)
+        self.free_slots = LockedPipe(ctx)
+        self.ready_slots = LockedPipe(ctx)
+        for slot in range(self.num_slots):
+            self.free_slots.put(slot)
+
+        self.depth = ctx.Value('i', 0) # Published batches not yet taken by a consumer
+        self.max_depth = ctx.Value('i', 0)
+        self.producer_stall_s = ctx.Value('d', 0.0) # Time producers waited for a free slot
+        self.consumer_stall_s = ctx.Value('d', 0.0) # Time consumers waited for a batch
+        self.oversized_batches = ctx.Value('i', 0) # Batches sent through the pipe because they did not fit a slot
+
+    def capacity(self, num_lines):
+        """Returns the blob bytes available in a slot holding num_lines lines."""
+        return self.slot_size - _SLOT_HEADER.size - 8 * num_lines - 8
+
+    def split_lines(self, lines):
+        """
+        Splits a batch of binary lines into groups that each fit into one slot.
+        A single line larger than a slot forms a group of its own.
+
+        Returns:
+        - list[list]: The groups, in order.
+        """
+        groups = []
+        start = 0
+        while start < len(lines):
+            end = start
+            size = 0
+            while end < len(lines) and size + len(lines[end]) <= self.capacity(end - start + 1):
+                size += len(lines[end])
+                end += 1
+            end = max(end, start + 1)
+            groups.append(lines[start:end])
+            start = end
+        return groups
+
+    def put_lines(self, lines, meta=None):
+        """
+        Publishes a batch of binary lines. The batch is split across several slots if
+        needed; a single line larger than a slot is sent through the pipe instead.
+
+        Parameters:
+        - lines (list): The lines to publish.
+        - meta (object): Picklable value handed to the consumer with every group of
+            the batch. Use split_lines() first when each group needs its own meta.
+        """
+        for group in self.split_lines(lines):
+            size = sum(len(line) for line in group)
+            if size > self.capacity(len(group)):
+                line = bytes(group[0])
+                with self.oversized_batches.get_lock():
+                    self.oversized_batches.value += 1
+                self._publish(((line, [len(line)]), meta))
+                continue
+
+            self._write_slot(group, size, meta)
+
+    def put_sentinel(self):
+        self.ready_slots.put(None)
+
+    def _write_slot(self, lines, size, meta=None):
+        wait_start = time.perf_counter()
+        slot = self.free_slots.get()
+        waited = time.perf_counter() - wait_start
+        with self.producer_stall_s.get_lock():
+            self.producer_stall_s.value += waited
+
+        base = slot * self.slot_size
+        buf = self.shm.buf
+        blob_start = base + _SLOT_HEADER.size
+        pos = blob_start
+        ends = []
+        for line in lines:
+            buf[pos:pos + len(line)] = line
+            pos += len(line)
+            ends.append(pos - blob_start)
+
+        table_start = blob_start + size + (-size % 8)
+        struct.pack_into(f"<{len(ends)}q", buf, table_start, *ends)
+        _SLOT_HEADER.pack_into(buf, base, len(lines), size)
+        self._publish((slot, meta))
+
+    def _publish(self, message):
+        with self.depth.get_lock():
+            self.depth.value += 1
+            if self.depth.value > self.max_depth.value:
+                self.max_depth.value = self.depth.value
+        self.ready_slots.put(message)
+
+    def get(self, block=True):
+        """
+        Takes the next published batch.
+
+        Returns:
+        - tuple or None: (token, lines, meta) where lines are memoryview slices valid
+            until release(token) is called, or None for a shutdown sentinel.
+
+        Raises:
+        - queue.Empty: With block=False, if nothing is published or another
+            consumer is taking a batch.
+        """
+        wait_start = time.perf_counter()
+        message = self.ready_slots.get(block=block)
+        waited = time.perf_counter() - wait_start
+        with self.consumer_stall_s.get_lock():
+            self.consumer_stall_s.value += waited
+
+        if message is None:
+            return None
+
+        with self.depth.get_lock():
+            self.depth.value -= 1
+
+        payload, meta = message
+        if isinstance(payload, tuple):
+            line, _ = payload
+            return None, [memoryview(line)], meta
+
+        slot = payload
+        base = slot * self.slot_size
+        buf = self.shm.buf
+        num_lines, size = _SLOT_HEADER.unpack_from(buf, base)
+        blob_start = base + _SLOT_HEADER.size
+        table_start = blob_start + size + (-size % 8)
+        ends = buf[table_start:table_start + 8 * num_lines].cast('q')
+
+        lines = []
+        start = 0
+        for end in ends:
+            lines.append(buf[blob_start + start:blob_start + end])
+            start = end
+        ends.release()
+        return slot, lines, meta
+
+    def release(self, token):
+        """Returns a slot to the producers once its lines have been parsed."""
+        if token is not None:
+            self.free_slots.put(token)
+
+    def stats(self):
+        return {
+            "num_slots": self.num_slots,
+            "slot_size": self.slot_size,
+            "depth": int(self.depth.value),
+            "max_depth": int(self.max_depth.value),
+            "producer_stall_s": round(float(self.producer_stall_s.value), 3),
+            "consumer_stall_s": round(float(self.consumer_stall_s.value), 3),
+            "oversized_batches": int(self.oversized_batches.value),
+        }
+
+    def close(self):
+        """Frees the shared memory block (call from the creating process only)."""
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,149 @@
+"""
+Latency histograms for named spans of a batch handler.
+
+Spans are timed with time.perf_counter() and counted in log-scale buckets (four
+per power of two, starting at 1 microsecond), so quantiles are accurate to about
+9% whatever the latency. Each process records into a local buffer and merges it
+into the shared arrays every flush_interval_s seconds, when it exits (through
+multiprocessing.util.Finalize) and when the histograms are read, so timing a span
+takes a lock shared between processes at most once per interval.
+"""
+import math
+import os
+import threading
+import time
+from multiprocessing import util
+
+BUCKETS_PER_OCTAVE = 4
+NUM_BUCKETS = 40 * BUCKETS_PER_OCTAVE
+MIN_SECONDS = 1e-6
+QUANTILES = (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99))
+
+
+def _bucket(seconds):
+    if seconds <= MIN_SECONDS:
+        return 0
+    return min(NUM_BUCKETS - 1, int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_OCTAVE))
+
+
+def _bucket_seconds(bucket):
+    """Geometric middle of a bucket."""
+    return MIN_SECONDS * 2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+class _Span:
+    __slots__ = ("histograms", "name", "start")
+
+    def __init__(self, histograms, name):
+        self.histograms = histograms
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histograms.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class SpanHistograms:
+    def __init__(self, ctx, names, flush_interval_s=5.0):
+        """
+        Parameters:
+        - ctx: The multiprocessing context used to create the shared arrays.
+        - names (iterable[str]): The span names; other names are ignored.
+        - flush_interval_s (float): Seconds between two merges of a process's buffer,
+            which bounds how stale live readers (metrics export) can be.
+        """
+        self.names = tuple(names)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.counts = ctx.Array('q', len(self.names) * NUM_BUCKETS)
+        self.totals = ctx.Array('d', len(self.names))
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._pid = None
+        self._local_counts = None
+        self._local_totals = None
+        self._last_flush = 0.0
+        util.register_after_fork(self, SpanHistograms._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Returns a context manager timing one occurrence of the span `name`."""
+        return _Span(self, name)
+
+    def add(self, name, seconds):
+        i = self._index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited by a forked consumer: start an empty buffer merged at exit.
+                self._pid = os.getpid()
+                self._local_counts = [0] * (len(self.names) * NUM_BUCKETS)
+                self._local_totals = [0.0] * len(self.names)
+                self._last_flush = time.monotonic()
+                util.Finalize(self, self.flush, exitpriority=10)
+            self._local_counts[i * NUM_BUCKETS + _bucket(seconds)] += 1
+            self._local_totals[i] += seconds
+            if time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self._flush()
+
+    def flush(self):
+        """Merges the buffer of this process into the shared histograms."""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not any(self._local_totals):
+            return
+        with self.counts.get_lock():
+            for j, count in enumerate(self._local_counts):
+                if count:
+                    self.counts[j] += count
+        with self.totals.get_lock():
+            for i, total in enumerate(self._local_totals):
+                self.totals[i] += total
+        self._local_counts = [0] * len(self._local_counts)
+        self._local_totals = [0.0] * len(self._local_totals)
+
+    def bucket_counts(self, name):
+        """
+        Returns:
+        - tuple: The merged counts of each bucket of span `name` and its total seconds,
+            without merging the buffer of the calling process.
+        """
+        i = self._index[name]
+        return self.counts[i * NUM_BUCKETS:(i + 1) * NUM_BUCKETS], self.totals[i]
+
+    def summary(self):
+        """
+        Returns:
+        - dict: Per span with at least one occurrence, its count, total seconds and
+            p50/p95/p99/max latencies in milliseconds.
+        """
+        self.flush()
+        summary = {}
+        for i, name in enumerate(self.names):
+            counts = self.counts[i * NUM_BUCKETS:(i + 1) * NUM_BUCKETS]
+            total_count = sum(counts)
+            if not total_count:
+                continue
+            stats = {"count": total_count, "total_s": round(self.totals[i], 3)}
+            for key, q in QUANTILES:
+                rank = q * total_count
+                seen = 0
+                for bucket, count in enumerate(counts):
+                    seen += count
+                    if seen >= rank:
+                        stats[key] = round(_bucket_seconds(bucket) * 1000, 3)
+                        break
+            last = max(bucket for bucket, count in enumerate(counts) if count)
+            stats["max_ms"] = round(_bucket_seconds(last) * 1000, 3)
+            summary[name] = stats
+        return summary
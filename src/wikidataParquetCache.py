@@ -0,0 +1,291 @@
+"""
+Columnar Parquet cache of a Wikidata dump.
+
+The dump is parsed once and written as sharded Parquet files with one row per
+entity. Labels and descriptions are kept as language -> value maps, sitelinks
+as their site keys, and P31 / P13046 as the value ids of their non-deprecated
+statements; the full claims stay available as a raw JSON blob. Readers project
+the columns they need, so filter and stats passes never inflate or parse the
+rest of the dump.
+
+Rows are turned back into dump-shaped entity dicts (see row_to_entity), so the
+filters and stats handlers work on cached entities unchanged. Aliases, sitelink
+titles and page metadata (pageid, ns, title) are not kept, so the cache serves
+those scripts only, not textification.
+
+pyarrow is imported on first use, so the dump reader (which imports this module)
+only needs it when a cache is built or read.
+"""
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import cache
+import glob
+import json
+import os
+import uuid
+from multiprocessing import util
+
+import orjson
+
+MANIFEST_NAME = "_cache.json"
+PROJECTED_CLAIM_PIDS = ("P31", "P13046")
+
+
+def _pyarrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+@cache
+def cache_schema():
+    """Returns the pyarrow schema of the cache shards."""
+    pa, _ = _pyarrow()
+    return pa.schema([
+        ("id", pa.string()),
+        ("type", pa.string()),
+        ("modified", pa.string()),
+        ("lastrevid", pa.int64()),
+        ("labels", pa.map_(pa.string(), pa.string())),
+        ("descriptions", pa.map_(pa.string(), pa.string())),
+        ("sitelinks", pa.list_(pa.string())),
+        ("claim_pids", pa.list_(pa.string())),
+        *[(pid.lower(), pa.list_(pa.string())) for pid in PROJECTED_CLAIM_PIDS],
+        ("claims", pa.binary()),
+    ])
+
+RowGroupTask = namedtuple("RowGroupTask", ["path", "row_group"])
+
+# Per-process shard writer used while building the cache.
+_WRITER = None
+
+
+def _claim_value_ids(claims, pid):
+    """
+    Returns one entry per non-deprecated statement of `pid`: the id of its item
+    value, or None for statements without one (novalue, somevalue, ...).
+    """
+    value_ids = []
+    for claim in claims.get(pid, []):
+        if claim.get("rank") == "deprecated":
+            continue
+        value = claim.get("mainsnak", {}).get("datavalue", {}).get("value")
+        value_ids.append(value.get("id") if isinstance(value, dict) else None)
+    return value_ids
+
+
+def entity_to_row(entity):
+    claims = entity.get("claims", {})
+    row = {
+        "id": entity.get("id"),
+        "type": entity.get("type"),
+        "modified": entity.get("modified"),
+        "lastrevid": entity.get("lastrevid"),
+        "labels": [(lang, label.get("value")) for lang, label in entity.get("labels", {}).items()],
+        "descriptions": [
+            (lang, description.get("value"))
+            for lang, description in entity.get("descriptions", {}).items()
+        ],
+        "sitelinks": list(entity.get("sitelinks", {})),
+        "claim_pids": list(claims),
+        "claims": orjson.dumps(claims),
+    }
+    for pid in PROJECTED_CLAIM_PIDS:
+        row[pid.lower()] = _claim_value_ids(claims, pid)
+    return row
+
+
+def row_to_entity(row):
+    """
+    Rebuilds a dump-shaped entity from the projected columns of a cached row.
+    Without the claims column, claims holds every property id (with an empty
+    statement list) plus minimal non-deprecated P31 / P13046 statements.
+    """
+    entity = {
+        key: row[key]
+        for key in ("id", "type", "modified", "lastrevid")
+        if key in row
+    }
+    for key in ("labels", "descriptions"):
+        if key in row:
+            entity[key] = {
+                lang: {"language": lang, "value": value}
+                for lang, value in row[key] or []
+            }
+    if "sitelinks" in row:
+        entity["sitelinks"] = {site: {"site": site} for site in row["sitelinks"] or []}
+
+    if "claims" in row:
+        entity["claims"] = orjson.loads(row["claims"])
+    elif "claim_pids" in row or any(pid.lower() in row for pid in PROJECTED_CLAIM_PIDS):
+        claims = {pid: [] for pid in row.get("claim_pids") or []}
+        for pid in PROJECTED_CLAIM_PIDS:
+            value_ids = row.get(pid.lower())
+            if not value_ids:
+                continue
+            claims[pid] = [
+                {
+                    "mainsnak": {"datavalue": {"value": {"id": value_id}}} if value_id else {},
+                    "rank": "normal",
+                }
+                for value_id in value_ids
+            ]
+        entity["claims"] = claims
+    return entity
+
+
+class _ShardWriter:
+    """
+    Buffers rows in one consumer process and writes them as row groups of
+    Parquet shards named after the process, rolling to a new shard every
+    rows_per_shard rows.
+    """
+
+    def __init__(self, cache_dir, row_group_size, rows_per_shard):
+        self.cache_dir = cache_dir
+        self.row_group_size = max(1, int(row_group_size))
+        self.rows_per_shard = max(self.row_group_size, int(rows_per_shard))
+        self.rows = []
+        self.writer = None
+        self.shard_rows = 0
+        # Flush the last rows when the consumer process exits.
+        util.Finalize(self, self.close, exitpriority=10)
+
+    def add(self, rows):
+        self.rows.extend(rows)
+        while len(self.rows) >= self.row_group_size:
+            self._write(self.rows[:self.row_group_size])
+            self.rows = self.rows[self.row_group_size:]
+
+    def _write(self, rows):
+        pa, pq = _pyarrow()
+        if self.writer is None:
+            path = os.path.join(self.cache_dir, f"part-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet")
+            self.writer = pq.ParquetWriter(path, cache_schema(), compression="zstd")
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=cache_schema()))
+        self.shard_rows += len(rows)
+        if self.shard_rows >= self.rows_per_shard:
+            self.writer.close()
+            self.writer = None
+            self.shard_rows = 0
+
+    def close(self):
+        if self.rows:
+            self._write(self.rows)
+            self.rows = []
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def _init_shard_writer(cache_dir, row_group_size, rows_per_shard):
+    global _WRITER
+    _WRITER = _ShardWriter(cache_dir, row_group_size, rows_per_shard)
+
+
+def _write_entities(items):
+    _WRITER.add([entity_to_row(entity) for entity in items])
+
+
+class WikidataParquetCache:
+    def __init__(self, cache_dir):
+        """
+        Parameters:
+        - cache_dir (str): Directory holding the Parquet shards and the manifest.
+        """
+        self.cache_dir = cache_dir
+        manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"{cache_dir} is not a complete Parquet dump cache")
+        with open(manifest_path, "r", encoding="utf-8") as f_in:
+            self.manifest = json.load(f_in)
+        self.shards = [os.path.join(cache_dir, name) for name in self.manifest["shards"]]
+
+    @staticmethod
+    def is_cache(path):
+        return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+    @property
+    def dump_date(self):
+        return self.manifest.get("dump_date")
+
+    @classmethod
+    def build(cls, reader, cache_dir, row_group_size=10000, rows_per_shard=1_000_000, verbose=True):
+        """
+        Converts a dump into a Parquet cache. Every consumer of the reader writes its
+        own shards, so conversion runs at the reader's parse throughput.
+
+        Parameters:
+        - reader (WikidataDumpReader): Reader over the source dump.
+        - cache_dir (str): Output directory; existing shards in it are replaced.
+        - row_group_size (int): Entities per Parquet row group (the unit of parallel reads).
+        - rows_per_shard (int): Entities per Parquet file.
+
+        Returns:
+        - WikidataParquetCache: The finished cache.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for path in glob.glob(os.path.join(cache_dir, "part-*.parquet")):
+            os.remove(path)
+
+        reader.run(
+            _write_entities,
+            handler_receives_batch=True,
+            verbose=verbose,
+            init_consumer=_init_shard_writer,
+            init_consumer_args=(cache_dir, row_group_size, rows_per_shard),
+        )
+        if reader.handler_errors.value:
+            raise RuntimeError(f"{reader.handler_errors.value} batches failed while building the Parquet cache")
+
+        shards = sorted(os.path.basename(path) for path in glob.glob(os.path.join(cache_dir, "part-*.parquet")))
+        _, pq = _pyarrow()
+        num_rows = sum(pq.ParquetFile(os.path.join(cache_dir, name)).metadata.num_rows for name in shards)
+        manifest = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "dump": {
+                "path": reader.file_path,
+                "size": os.path.getsize(reader.file_path),
+                "mtime": os.path.getmtime(reader.file_path),
+            },
+            "dump_date": reader.get_dump_date(),
+            "num_rows": num_rows,
+            "shards": shards,
+        }
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f_out:
+            json.dump(manifest, f_out, indent=2)
+        os.replace(tmp_path, manifest_path)
+        return cls(cache_dir)
+
+    def row_groups(self):
+        """
+        Returns every (shard path, row group) of the cache in a stable order.
+        """
+        _, pq = _pyarrow()
+        return [
+            RowGroupTask(path, row_group)
+            for path in self.shards
+            for row_group in range(pq.ParquetFile(path).num_row_groups)
+        ]
+
+    def read_entities(self, task, columns=None):
+        """
+        Reads one row group and rebuilds its entities.
+
+        Parameters:
+        - task (RowGroupTask): The row group to read.
+        - columns (list[str] or None): Columns to read (default: all). The id column
+            is always read.
+
+        Returns:
+        - list[dict]: Dump-shaped entities.
+        """
+        if columns is not None:
+            columns = list(dict.fromkeys(["id", *columns]))
+        _, pq = _pyarrow()
+        table = pq.ParquetFile(task.path).read_row_group(task.row_group, columns=columns)
+        return [row_to_entity(row) for row in table.to_pylist()]
@@ -0,0 +1,88 @@
+"""
+Shared fixtures: a small synthetic dump in the layout of the Wikidata JSON dumps,
+written as plain JSON, single- and multi-member gzip and multi-block bz2.
+"""
+import bz2
+import gzip
+import os
+import random
+
+import orjson
+import pytest
+
+NUM_ENTITIES = 20000
+
+
+def make_entity(i, rng):
+    entity = {
+        "type": "item",
+        "id": f"Q{i}",
+        "labels": {"en": {"language": "en", "value": "x" * rng.randint(1, 200)}},
+        "claims": {},
+    }
+    if i % 3:
+        entity["sitelinks"] = {"enwiki": {"site": "enwiki", "title": f"Page {i}"}}
+    return entity
+
+
+def dump_bytes(entities):
+    """Returns a dump with one entity per line, wrapped in a JSON array."""
+    lines = [orjson.dumps(entity) for entity in entities]
+    return b"[\n" + b",\n".join(lines) + b"\n]\n"
+
+
+@pytest.fixture(scope="session")
+def dump_entities():
+    rng = random.Random(1)
+    return [make_entity(i, rng) for i in range(NUM_ENTITIES)]
+
+
+@pytest.fixture(scope="session")
+def dump_data(dump_entities):
+    return dump_bytes(dump_entities)
+
+
+@pytest.fixture(scope="session")
+def dump_files(tmp_path_factory, dump_data):
+    """Paths of the same dump as .json, .gz, multi-member .gz and .bz2 (100 kB blocks)."""
+    root = tmp_path_factory.mktemp("dumps")
+    paths = {
+        "json": root / "dump.json",
+        "gz": root / "dump.gz",
+        "multi_gz": root / "multi.gz",
+        "bz2": root / "dump.bz2",
+    }
+    paths["json"].write_bytes(dump_data)
+    paths["gz"].write_bytes(gzip.compress(dump_data))
+    paths["bz2"].write_bytes(bz2.compress(dump_data, compresslevel=1))
+
+    # Members cut at line boundaries, as written by parallel compressors.
+    cuts = [0]
+    for k in range(1, 4):
+        cuts.append(dump_data.index(b"\n", k * len(dump_data) // 4) + 1)
+    cuts.append(len(dump_data))
+    paths["multi_gz"].write_bytes(b"".join(gzip.compress(dump_data[a:b]) for a, b in zip(cuts, cuts[1:])))
+    return {name: str(path) for name, path in paths.items()}
+
+
+@pytest.fixture
+def id_log(tmp_path):
+    """A file handlers in forked consumers append the IDs they handled to."""
+    return str(tmp_path / "ids.log")
+
+
+def log_ids(path, entities):
+    """Appends the IDs of entities to path in a single write (atomic with O_APPEND)."""
+    data = "".join(f"{entity['id']}\n" for entity in entities).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_ids(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f_in:
+        return f_in.read().split()
@@ -0,0 +1,35 @@
+import os
+import time
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+
+
+def test_consumers_are_added_while_the_queue_is_full(dump_files, dump_entities, id_log, tmp_path):
+    pid_log = str(tmp_path / "pids.log")
+
+    def handler(items):
+        time.sleep(0.01)
+        log_ids(id_log, items)
+        log_ids(pid_log, [{"id": os.getpid()}])
+
+    reader = WikidataDumpReader(
+        dump_files["json"], num_processes=3, min_processes=1, autoscale_interval_s=0.2,
+        batch_size=50, queue_size=20,
+    )
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert [event["action"] for event in reader.scaling_events][:2] == ["start", "start"]
+    assert [event["consumers"] for event in reader.scaling_events][:2] == [2, 3]
+    assert reader.consumers_started.value >= 3
+    assert len(set(read_ids(pid_log))) >= 3
+
+
+def test_consumers_are_not_scaled_without_min_processes(dump_files, dump_entities):
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, autoscale_interval_s=0.01, batch_size=50)
+    reader.run(lambda items: time.sleep(0.001), handler_receives_batch=True, verbose=False)
+
+    assert not reader.autoscale
+    assert reader.scaling_events == []
+    assert reader.iterations.value == len(dump_entities)
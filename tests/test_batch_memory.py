@@ -0,0 +1,64 @@
+import pytest
+
+from src.WikidataDumpReader import WikidataDumpReader
+from src.batchMemory import BatchMemoryTracker
+
+HUNGRY_ID = "Q777"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown memory stats mode"):
+        BatchMemoryTracker("heap")
+
+
+def test_top_batches_are_kept_by_memory_and_time():
+    tracker = BatchMemoryTracker("tracemalloc", top_n=2)
+    tracker.start()
+    try:
+        for i, size in enumerate([1, 8, 2, 16, 4]):
+            tracker.begin(0)
+            tracker.describe(0, [{"id": f"Q{i}"}, {"id": f"L{i}"}], [10, 5])
+            buffer = bytearray(size * 2**20)
+            del buffer
+            tracker.end(0)
+    finally:
+        tracker.stop()
+
+    report = tracker.report()
+    assert report["batches"] == 5
+    assert sorted(record["entity_id"] for record in report["top_by_memory"]) == ["Q1", "Q3"]
+    assert len(report["top_by_time"]) == 2
+    record = max(report["top_by_memory"], key=lambda r: r["peak_mb"])
+    assert record["peak_mb"] >= 16
+    assert (record["entity_bytes"], record["batch_entities"], record["batch_bytes"]) == (10, 2, 15)
+
+
+def test_merge_ranks_across_consumers():
+    reports = [
+        {"batches": 3, "max_rss_mb": 100.0, "max_batch_memory_mb": 5.0,
+         "top_by_memory": [{"rss_growth_mb": 5.0, "seconds": 0.1}], "top_by_time": [{"seconds": 0.1}]},
+        {"batches": 4, "max_rss_mb": 120.0, "max_batch_memory_mb": 9.0,
+         "top_by_memory": [{"rss_growth_mb": 9.0, "seconds": 2.0}], "top_by_time": [{"seconds": 2.0}]},
+    ]
+    merged = BatchMemoryTracker.merge(reports, "rss", top_n=1)
+
+    assert (merged["consumers"], merged["batches"]) == (2, 7)
+    assert (merged["max_consumer_rss_mb"], merged["max_batch_memory_mb"]) == (120.0, 9.0)
+    assert merged["top_by_memory"] == [{"rss_growth_mb": 9.0, "seconds": 2.0}]
+    assert merged["top_by_time"] == [{"seconds": 2.0}]
+
+
+def test_reader_reports_the_hungriest_entity(dump_files):
+    def handler(entity):
+        if entity["id"] == HUNGRY_ID:
+            buffer = bytearray(32 * 2**20)
+            del buffer
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=1)
+    reader.run(handler, verbose=False, max_iterations=2000, memory_stats="tracemalloc", memory_top_n=5)
+
+    report = reader.memory_report
+    assert (report["mode"], report["consumers"], report["batches"]) == ("tracemalloc", 2, 2000)
+    assert report["top_by_memory"][0]["entity_id"] == HUNGRY_ID
+    assert report["top_by_memory"][0]["peak_mb"] >= 32
+    assert len(report["top_by_time"]) == 5
@@ -0,0 +1,101 @@
+import asyncio
+import math
+
+import pytest
+
+from src.batchRetry import retry_batch, retry_batch_async
+
+
+class Handler:
+    """Batch handler failing on every batch that contains a bad item."""
+
+    def __init__(self, bad):
+        self.bad = set(bad)
+        self.calls = 0
+        self.handled = []
+
+    def __call__(self, items):
+        self.calls += 1
+        if self.bad.intersection(items):
+            raise ValueError("bad item")
+        self.handled.extend(items)
+
+
+class AsyncHandler(Handler):
+    async def __call__(self, items):
+        await asyncio.sleep(0)
+        super().__call__(items)
+
+
+@pytest.mark.parametrize("strategy", ["bisect", "per_item"])
+@pytest.mark.parametrize("bad", [{0}, {63}, {5, 6}, {1, 40, 99}, set(range(100))])
+def test_retry_isolates_the_failing_items(strategy, bad):
+    items = list(range(100))
+    handler = Handler(bad)
+    failed = []
+
+    processed = retry_batch(handler, items, strategy, lambda item, exc: failed.append(item))
+
+    assert processed == len(items) - len(bad)
+    assert sorted(failed) == sorted(bad)
+    assert sorted(handler.handled) == sorted(set(items) - bad)
+
+
+def test_bisect_needs_few_calls_for_one_bad_item():
+    handler = Handler({37})
+
+    retry_batch(handler, list(range(1024)), "bisect")
+
+    assert handler.calls <= 2 * math.log2(1024)
+
+
+def test_per_item_calls_once_per_item():
+    handler = Handler({3})
+
+    retry_batch(handler, list(range(10)), "per_item")
+
+    assert handler.calls == 10
+
+
+@pytest.mark.parametrize("strategy", ["bisect", "per_item"])
+def test_async_retry_matches_sync(strategy):
+    handler = AsyncHandler({2, 17})
+    failed = []
+
+    processed = asyncio.run(
+        retry_batch_async(handler, list(range(20)), strategy, lambda item, exc: failed.append(item))
+    )
+
+    assert processed == 18
+    assert sorted(failed) == [2, 17]
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        retry_batch(Handler(()), [1], "random")
+
+
+@pytest.mark.parametrize("strategy", ["bisect", "per_item"])
+def test_failed_single_item_batch_is_not_handled_again(strategy):
+    handler = Handler({7})
+    failed = []
+    exc = ValueError("bad item")
+
+    processed = retry_batch(handler, [7], strategy, lambda item, e: failed.append((item, e)), exc=exc)
+    processed_async = asyncio.run(
+        retry_batch_async(AsyncHandler({7}), [7], strategy, lambda item, e: failed.append((item, e)), exc=exc)
+    )
+
+    assert processed == processed_async == 0
+    assert handler.calls == 0
+    assert failed == [(7, exc), (7, exc)]
+
+
+def test_bisect_calls_in_order_and_skips_single_failed_items():
+    handler = Handler({1})
+
+    retry_batch(handler, [0, 1, 2, 3], "bisect")
+
+    # [0, 1] fails and is split, then [1] fails on its own and is reported.
+    assert handler.calls == 4
+    assert handler.handled == [0, 2, 3]
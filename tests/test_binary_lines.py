@@ -0,0 +1,60 @@
+import gzip
+import os
+
+import orjson
+import pytest
+
+from conftest import dump_bytes
+from src.WikidataDumpReader import WikidataDumpReader
+
+LABELS = ["Zürich", "東京", "Ελλάδα", "emoji 🙂", 'quote " and \\ backslash']
+
+
+@pytest.fixture(scope="module")
+def unicode_dump(tmp_path_factory):
+    entities = [
+        {"type": "item", "id": f"Q{i}", "labels": {"xx": {"language": "xx", "value": label * (i + 1)}}}
+        for i, label in enumerate(LABELS * 40)
+    ]
+    data = dump_bytes(entities)
+    root = tmp_path_factory.mktemp("unicode")
+    (root / "dump.json").write_bytes(data)
+    (root / "dump.gz").write_bytes(gzip.compress(data))
+    return entities, {"json": str(root / "dump.json"), "gz": str(root / "dump.gz")}
+
+
+def log_entities(path, entities):
+    data = b"".join(orjson.dumps(entity) + b"\n" for entity in entities)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_entities(path):
+    with open(path, "rb") as f_in:
+        return sorted((orjson.loads(line) for line in f_in), key=lambda entity: int(entity["id"][1:]))
+
+
+@pytest.mark.parametrize("kind", ["json", "gz"])
+@pytest.mark.parametrize("binary", [True, False])
+def test_entities_are_parsed_the_same_from_bytes_and_text(unicode_dump, tmp_path, kind, binary):
+    entities, paths = unicode_dump
+    log = str(tmp_path / "entities.log")
+    line_types = str(tmp_path / "types.log")
+
+    def prefilter(line):
+        log_entities(line_types, [type(line).__name__])
+        return True
+
+    reader = WikidataDumpReader(paths[kind], num_processes=2, batch_size=16, binary=binary)
+    reader.run(
+        lambda items: log_entities(log, items), handler_receives_batch=True, verbose=False,
+        line_prefilter=prefilter,
+    )
+
+    assert read_entities(log) == entities
+    with open(line_types, "rb") as f_in:
+        types = {orjson.loads(line) for line in f_in}
+    assert types and types <= ({"bytes", "memoryview"} if binary else {"str"})
@@ -0,0 +1,67 @@
+import time
+
+import orjson
+import pytest
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+
+BATCH_BYTES = 8 * 1024
+
+
+def line_bytes(entity):
+    """Size of the entity's dump line, with its ",\\n" separator."""
+    return len(orjson.dumps(entity)) + 2
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_batches_are_cut_at_the_byte_budget(dump_files, dump_entities, id_log, tmp_path, binary):
+    sizes_log = str(tmp_path / "sizes.log")
+
+    def handler(items):
+        log_ids(id_log, items)
+        log_ids(sizes_log, [{"id": f"{len(items)}:{sum(line_bytes(item) for item in items)}"}])
+
+    reader = WikidataDumpReader(
+        dump_files["json"], num_processes=2, batch_size=1000, batch_bytes=BATCH_BYTES, binary=binary
+    )
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    batches = [tuple(map(int, size.split(":"))) for size in read_ids(sizes_log)]
+    longest = max(line_bytes(entity) for entity in dump_entities)
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert all(nbytes < BATCH_BYTES + longest for _, nbytes in batches)
+    # Only the last batch of the dump may end below the budget.
+    assert sum(nbytes < BATCH_BYTES - longest for _, nbytes in batches) <= 1
+    assert max(count for count, _ in batches) < 1000
+
+
+def test_batch_size_still_bounds_the_lines(dump_files, tmp_path):
+    sizes_log = str(tmp_path / "sizes.log")
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=10, batch_bytes=2**20)
+    reader.run(lambda items: log_ids(sizes_log, [{"id": len(items)}]), handler_receives_batch=True, verbose=False)
+
+    assert max(int(size) for size in read_ids(sizes_log)) == 10
+
+
+def test_queued_bytes_stay_within_the_queue_budget(dump_files, dump_entities, id_log, tmp_path):
+    queue_bytes = 4 * BATCH_BYTES
+    queued_log = str(tmp_path / "queued.log")
+
+    reader = WikidataDumpReader(
+        dump_files["json"], num_processes=1, batch_size=1000, batch_bytes=BATCH_BYTES,
+        queue_size=1000, queue_bytes=queue_bytes,
+    )
+
+    def handler(items):
+        log_ids(queued_log, [{"id": reader.queued_bytes.value}])
+        log_ids(id_log, items)
+        time.sleep(0.002)
+
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    queued = [int(value) for value in read_ids(queued_log)]
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert max(queued) <= queue_bytes
+    # The producer ran ahead of the slow consumer up to the budget.
+    assert max(queued) > queue_bytes // 2
@@ -0,0 +1,76 @@
+import bz2
+import os
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.bz2Blocks import Bz2BlockIndex
+from src.WikidataDumpReader import WikidataDumpReader
+
+
+@pytest.fixture(scope="module")
+def bz2_index(dump_files):
+    return Bz2BlockIndex.build(dump_files["bz2"], show_progress=False)
+
+
+def test_blocks_decompress_to_the_dump(bz2_index, dump_data):
+    assert len(bz2_index.blocks) > 4
+    with open(bz2_index.file_path, "rb") as f:
+        blocks = [bz2_index.read_block(f, block_id) for block_id in range(len(bz2_index.blocks))]
+
+    assert b"".join(blocks) == dump_data
+
+
+@pytest.mark.parametrize("blocks_per_range", [1, 2, 5])
+def test_ranges_cover_every_line_once(bz2_index, dump_data, blocks_per_range):
+    lines = []
+    for first_block, end_block in bz2_index.ranges(blocks_per_range):
+        lines.extend(bz2_index.iter_range_lines(first_block, end_block))
+
+    assert b"".join(lines) == dump_data
+
+
+def test_save_and_load(bz2_index, dump_data, tmp_path):
+    index_path = str(tmp_path / "dump.bz2index")
+    bz2_index.save(index_path)
+    loaded = Bz2BlockIndex.load(bz2_index.file_path, index_path)
+
+    assert loaded.blocks == bz2_index.blocks
+    lines = []
+    for first_block, end_block in loaded.ranges(2):
+        lines.extend(loaded.iter_range_lines(first_block, end_block))
+    assert b"".join(lines) == dump_data
+
+
+def test_stale_index_is_not_loaded(bz2_index, tmp_path):
+    path = tmp_path / "dump.bz2"
+    path.write_bytes(open(bz2_index.file_path, "rb").read())
+    index = Bz2BlockIndex.build(str(path), show_progress=False)
+    index_path = str(tmp_path / "dump.bz2index")
+    index.save(index_path)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert Bz2BlockIndex.load(str(path), index_path) is None
+
+
+def test_multi_stream_file(tmp_path, dump_data):
+    path = tmp_path / "multi.bz2"
+    middle = dump_data.index(b"\n", len(dump_data) // 2) + 1
+    path.write_bytes(bz2.compress(dump_data[:middle], 1) + bz2.compress(dump_data[middle:], 1))
+    index = Bz2BlockIndex.build(str(path), show_progress=False)
+
+    lines = []
+    for first_block, end_block in index.ranges(3):
+        lines.extend(index.iter_range_lines(first_block, end_block))
+
+    assert b"".join(lines) == dump_data
+
+
+def test_parallel_producers_read_every_entity_once(dump_files, dump_entities, id_log):
+    reader = WikidataDumpReader(
+        dump_files["bz2"], num_processes=2, batch_size=200, num_producers=3, index_spacing=256 * 1024
+    )
+    reader.run(lambda items: log_ids(id_log, items), handler_receives_batch=True, verbose=False)
+
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+
+CRASH_ID = "Q12000"
+SPACING = 256 * 1024
+
+CASES = [
+    pytest.param("json", 1, id="json"),
+    pytest.param("gz", 1, id="gz"),
+    pytest.param("multi_gz", 1, id="multi_gz"),
+    pytest.param("bz2", 1, id="bz2"),
+    pytest.param("gz", 2, id="gz-2-producers"),
+    pytest.param("bz2", 2, id="bz2-2-producers"),
+]
+
+
+def make_reader(path, num_producers, index_spacing=SPACING):
+    # One consumer, so every batch handled before the crash has reported its completion.
+    return WikidataDumpReader(
+        path, num_processes=1, batch_size=250, num_producers=num_producers, index_spacing=index_spacing
+    )
+
+
+def crash_on(id_log, crash_id):
+    def handler(items):
+        if any(item["id"] == crash_id for item in items):
+            os._exit(3)
+        log_ids(id_log, items)
+    return handler
+
+
+@pytest.mark.parametrize("name,num_producers", CASES)
+def test_resume_delivers_every_entity_exactly_once(dump_files, dump_entities, id_log, tmp_path,
+                                                   name, num_producers):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    with pytest.raises(RuntimeError):
+        make_reader(dump_files[name], num_producers).run(
+            crash_on(id_log, CRASH_ID), handler_receives_batch=True, verbose=False,
+            checkpoint_path=checkpoint_path, checkpoint_interval_s=0.1,
+        )
+    first_run = len(read_ids(id_log))
+    assert 0 < first_run < len(dump_entities)
+
+    reader = make_reader(dump_files[name], num_producers)
+    reader.run(
+        lambda items: log_ids(id_log, items), handler_receives_batch=True, verbose=False,
+        checkpoint_path=checkpoint_path, resume=True,
+    )
+
+    ids = read_ids(id_log)
+    assert sorted(ids) == sorted(entity["id"] for entity in dump_entities)
+    assert reader.iterations.value == len(dump_entities) - first_run
+
+
+@pytest.mark.parametrize("name,num_producers", CASES[:4])
+def test_resume_after_completion_reads_nothing(dump_files, id_log, tmp_path, name, num_producers):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    make_reader(dump_files[name], num_producers).run(
+        lambda items: None, handler_receives_batch=True, verbose=False, checkpoint_path=checkpoint_path,
+    )
+
+    reader = make_reader(dump_files[name], num_producers)
+    reader.run(
+        lambda items: log_ids(id_log, items), handler_receives_batch=True, verbose=False,
+        checkpoint_path=checkpoint_path, resume=True,
+    )
+
+    assert read_ids(id_log) == []
+    assert reader.iterations.value == 0
+
+
+def test_resume_rejects_a_different_layout(dump_files, tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    make_reader(dump_files["gz"], 1).run(
+        lambda items: None, handler_receives_batch=True, verbose=False, checkpoint_path=checkpoint_path,
+    )
+
+    reader = make_reader(dump_files["gz"], 1, index_spacing=SPACING * 2)
+    with pytest.raises(ValueError):
+        reader.run(
+            lambda items: None, handler_receives_batch=True, verbose=False,
+            checkpoint_path=checkpoint_path, resume=True,
+        )
@@ -0,0 +1,139 @@
+import asyncio
+import gc
+import os
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+from src.deadLetter import DeadLetterStore
+
+FAILING_ID = "Q12345"
+
+
+def failing_prefilter(marker):
+    """Line prefilter raising (outside the handler's error handling) on FAILING_ID, once."""
+    def prefilter(line):
+        if f'"{FAILING_ID}"'.encode() in bytes(line):
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                pass
+            else:
+                raise ValueError("prefilter failed")
+        return True
+    return prefilter
+
+
+def test_async_consumer_fails_on_a_parse_error(dump_files, tmp_path):
+    async def handler(items):
+        pass
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    with pytest.raises(RuntimeError, match="Consumer exited"):
+        reader.run(
+            handler, handler_receives_batch=True, verbose=False,
+            line_prefilter=failing_prefilter(str(tmp_path / "failed")),
+        )
+
+
+def test_supervised_async_consumer_is_restarted_after_a_parse_error(dump_files, dump_entities, id_log, tmp_path):
+    async def handler(items):
+        await asyncio.sleep(0)
+        log_ids(id_log, items)
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    reader.run(
+        handler, handler_receives_batch=True, verbose=False, max_inflight_batches=4,
+        line_prefilter=failing_prefilter(str(tmp_path / "failed")), max_consumer_restarts=2,
+    )
+
+    assert set(read_ids(id_log)) == {entity["id"] for entity in dump_entities}
+    assert reader.consumer_restarts.value == 1
+
+
+PRELOADED = {}
+
+
+def preload(value):
+    PRELOADED["value"] = value
+
+
+@pytest.mark.parametrize("preloaded", [True, False])
+def test_init_before_fork_state_is_inherited_and_frozen(dump_files, id_log, preloaded):
+    def handler(items):
+        log_ids(id_log, [{"id": f"{PRELOADED.get('value')}:{gc.get_freeze_count() > 0}"}])
+
+    PRELOADED.clear()
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=5000)
+    reader.run(
+        handler, handler_receives_batch=True, verbose=False,
+        init_before_fork=preload if preloaded else None, init_before_fork_args=("tokenizer",),
+    )
+
+    assert set(read_ids(id_log)) == ({"tokenizer:True"} if preloaded else {"None:False"})
+    assert gc.get_freeze_count() == 0
+
+
+def test_failing_init_before_fork_leaves_the_gc_unfrozen(dump_files):
+    def fail():
+        raise RuntimeError("preload failed")
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=1)
+    with pytest.raises(RuntimeError, match="preload failed"):
+        reader.run(lambda item: None, verbose=False, init_before_fork=fail)
+    assert gc.get_freeze_count() == 0
+
+
+def failing_ids(dump_entities):
+    return {entity["id"] for entity in dump_entities[::997]}
+
+
+def check_counts(reader, id_log, dead_letter, dump_entities, failing, batch):
+    handled = read_ids(id_log)
+    assert sorted(handled) == sorted(entity["id"] for entity in dump_entities if entity["id"] not in failing)
+    assert reader.iterations.value == len(dump_entities) - len(failing)
+    assert sorted(record["id"] for record in dead_letter.iter_records()) == sorted(failing)
+    if batch:
+        # The failed batches and then each failing entity on its own.
+        assert reader.handler_errors.value > len(failing)
+    else:
+        assert reader.handler_errors.value == len(failing)
+
+
+@pytest.mark.parametrize("batch", [True, False])
+def test_async_consumer_counts_items_with_a_raising_handler(dump_files, dump_entities, id_log, tmp_path, batch):
+    failing = failing_ids(dump_entities)
+
+    async def handler(items):
+        await asyncio.sleep(0)
+        items = items if batch else [items]
+        if any(item["id"] in failing for item in items):
+            raise ValueError("handler failed")
+        log_ids(id_log, items)
+
+    dead_letter = DeadLetterStore(str(tmp_path / "dead_letter"), "async")
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    reader.run(
+        handler, handler_receives_batch=batch, verbose=False,
+        max_inflight_batches=4, dead_letter=dead_letter,
+    )
+
+    check_counts(reader, id_log, dead_letter, dump_entities, failing, batch)
+
+
+@pytest.mark.parametrize("batch", [True, False])
+def test_threaded_consumer_counts_items_with_a_raising_handler(dump_files, dump_entities, id_log, tmp_path, batch):
+    failing = failing_ids(dump_entities)
+
+    def handler(items):
+        items = items if batch else [items]
+        if any(item["id"] in failing for item in items):
+            raise ValueError("handler failed")
+        log_ids(id_log, items)
+
+    dead_letter = DeadLetterStore(str(tmp_path / "dead_letter"), "threaded")
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200, threads_per_consumer=4)
+    reader.run(handler, handler_receives_batch=batch, verbose=False, dead_letter=dead_letter)
+
+    check_counts(reader, id_log, dead_letter, dump_entities, failing, batch)
@@ -0,0 +1,81 @@
+import gzip
+import os
+
+import orjson
+import pytest
+
+from conftest import log_ids, read_ids
+from src.deadLetter import DeadLetterStore
+from src.lazyEntity import parse_lazy_entity
+from src.WikidataDumpReader import WikidataDumpReader
+
+POISON = {"Q7", "Q4321", "Q19999"}
+
+
+def poisoned(id_log):
+    def handler(items):
+        if any(item["id"] in POISON for item in items):
+            raise ValueError("poison")
+        log_ids(id_log, items)
+    return handler
+
+
+def test_store_round_trip(tmp_path):
+    store = DeadLetterStore(str(tmp_path), "vectordb_en")
+    entity = parse_lazy_entity(b'{"id":"Q1","claims":{"P31":[{"mainsnak":{}}]},"sitelinks":{}}')
+    store.add(entity, ValueError("boom"), attempts=2)
+    store.close()
+
+    (record,) = store.iter_records()
+    assert record["id"] == "Q1"
+    assert record["stage"] == "vectordb_en"
+    assert (record["error_type"], record["error"], record["attempts"]) == ("ValueError", "boom", 2)
+    # Lazy entities are written in full.
+    assert orjson.loads(record["line"])["claims"] == {"P31": [{"mainsnak": {}}]}
+    assert DeadLetterStore.stages(str(tmp_path)) == ["vectordb_en"]
+
+
+def test_truncated_file_is_read_up_to_its_last_record(tmp_path):
+    store = DeadLetterStore(str(tmp_path), "labels")
+    for i in range(3):
+        store.add({"id": f"Q{i}"}, ValueError("boom"))
+    store.close()
+    (path,) = store.paths()
+    with open(path, "rb") as f_in:
+        data = f_in.read()
+    with open(path, "wb") as f_out:
+        f_out.write(data[:-12])
+
+    ids = [record["id"] for record in store.iter_records()]
+    assert ids == ["Q0", "Q1", "Q2"][:len(ids)]
+
+
+@pytest.mark.parametrize("retry_strategy", ["bisect", "per_item"])
+def test_reader_dead_letters_exactly_the_failing_entities(dump_files, dump_entities, id_log, tmp_path,
+                                                           retry_strategy):
+    store = DeadLetterStore(str(tmp_path / "dead_letter"), "stage")
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200, retry_strategy=retry_strategy)
+    reader.run(poisoned(id_log), handler_receives_batch=True, verbose=False, dead_letter=store)
+
+    records = list(store.iter_records())
+    assert sorted(record["id"] for record in records) == sorted(POISON)
+    assert all(record["attempts"] == 2 for record in records)
+    # Each poisoned batch fails once as a whole, then once for its bad entity.
+    assert reader.handler_errors.value == 2 * len(POISON)
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities if entity["id"] not in POISON)
+    # Every consumer wrote its own file.
+    assert all(os.path.basename(path).startswith("part-") for path in store.paths())
+
+
+def test_reader_dead_letters_entities_of_per_entity_handlers(dump_files, tmp_path):
+    store = DeadLetterStore(str(tmp_path / "dead_letter"), "stage")
+
+    def handler(entity):
+        if entity["id"] in POISON:
+            raise ValueError("poison")
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    reader.run(handler, verbose=False, dead_letter=store)
+
+    assert sorted(record["id"] for record in store.iter_records()) == sorted(POISON)
+    assert reader.handler_errors.value == len(POISON)
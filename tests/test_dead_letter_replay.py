@@ -0,0 +1,61 @@
+import pytest
+
+from src.deadLetter import DeadLetterStore
+from src.runStats import RunStatsTracker
+
+main = pytest.importorskip("main")
+
+
+class Client:
+    """Stands in for the HF, AstraDB, Jina and cache clients of a stage."""
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def replayed(tmp_path, monkeypatch):
+    """Records (stage, id, LANG, FALLBACK_LANG, HF data_dir) for every replayed entity."""
+    handled = []
+
+    def record(stage):
+        def handler(items):
+            data_dir = main.HF_PUBLISHER.kwargs["data_dir"] if main.HF_PUBLISHER is not None else None
+            handled.extend((stage, item["id"], main.LANG, main.FALLBACK_LANG, data_dir) for item in items)
+        return handler
+
+    monkeypatch.setattr(main, "DEAD_LETTER_DIR", str(tmp_path / "dead_letter"))
+    monkeypatch.setattr(main, "STATS_TRACKER", RunStatsTracker(str(tmp_path / "stats.json"), {}))
+    for name in ("WD_LANG", "WD_FALLBACK_LANG", "LANG", "FALLBACK_LANG"):
+        monkeypatch.setattr(main, name, "en")
+    monkeypatch.setattr(main, "WD_LANGS", ())
+    monkeypatch.setattr(main, "init_worker", lambda enable_vector=False: None)
+    monkeypatch.setattr(main, "push_to_hf", record("wd_to_hf"))
+    monkeypatch.setattr(main, "push_to_vectorDB", record("vectordb_fr"))
+    for client in ("WikidataHFDatasetPublisher", "WikidataItemFilter", "WikidataVectorCache",
+                   "AstraDBConnect", "JinaAIAPIEmbedder"):
+        monkeypatch.setattr(main, client, Client)
+    return handled
+
+
+def add_dead_letter(stage, entity_id):
+    store = DeadLetterStore(main.DEAD_LETTER_DIR, stage)
+    store.add({"id": entity_id, "claims": {}}, ValueError("boom"))
+    store.close()
+
+
+def test_vector_replay_does_not_leak_its_language(replayed):
+    add_dead_letter("vectordb_fr", "Q1")
+    add_dead_letter("wd_to_hf", "Q2")
+    # Stages are replayed in name order, the vector stage first.
+    assert DeadLetterStore.stages(main.DEAD_LETTER_DIR) == ["vectordb_fr", "wd_to_hf"]
+
+    main.run_dead_letter_replay_stage()
+
+    assert replayed == [
+        ("vectordb_fr", "Q1", "fr", "fr", None),
+        ("wd_to_hf", "Q2", "en", "en", "data/en"),
+    ]
+    assert DeadLetterStore.stages(main.DEAD_LETTER_DIR) == []
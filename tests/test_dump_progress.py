@@ -0,0 +1,80 @@
+from multiprocessing import get_context
+
+import pytest
+
+from src import dumpProgress
+from src.WikidataDumpReader import WikidataDumpReader
+from src.dumpProgress import DumpProgress
+
+ctx = get_context("fork")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dumpProgress.time, "time", lambda: now[0])
+    return now
+
+
+def test_percent_rate_and_eta(clock):
+    progress = DumpProgress(ctx, [600, 400])
+    assert progress.sample()["eta_s"] is None
+
+    clock[0] += 10
+    progress.set(0, 300)
+    progress.set(1, 100)
+    sample = progress.sample()
+    assert sample["bytes_read"] == 400
+    assert sample["percent"] == 40.0
+    assert sample["bytes_per_s"] == 40
+    assert sample["eta_s"] == 15
+
+    clock[0] += 5
+    progress.finish(0)
+    progress.set(1, 10_000)
+    sample = progress.sample()
+    assert sample["percent"] == 100.0
+    assert sample["eta_s"] == 0
+
+
+def test_resumed_bytes_count_as_read_but_not_towards_the_rate(clock):
+    progress = DumpProgress(ctx, [500, 500], read_bytes={0: 500})
+    clock[0] += 10
+    progress.set(1, 100)
+
+    sample = progress.sample()
+    assert sample["percent"] == 60.0
+    assert sample["bytes_per_s"] == 10
+    assert sample["eta_s"] == 40
+
+
+def test_series_is_recorded_at_the_interval(clock):
+    progress = DumpProgress(ctx, [100])
+    progress.record(5)
+    clock[0] += 1
+    progress.set(0, 10)
+    progress.record(5)
+    clock[0] += 5
+    progress.record(5)
+
+    stats = progress.stats()
+    assert [sample["bytes_read"] for sample in stats["series"]] == [0, 10]
+    assert stats["total_bytes"] == 100
+    assert stats["bytes_read"] == 10
+
+
+def test_format_eta():
+    assert DumpProgress.format_eta(None) == "?"
+    assert DumpProgress.format_eta(75) == "1m15s"
+    assert DumpProgress.format_eta(3 * 3600 + 5 * 60 + 9) == "3h05m"
+
+
+@pytest.mark.parametrize("kind", ["json", "multi_gz", "bz2"])
+def test_pass_reads_the_whole_dump(dump_files, kind):
+    reader = WikidataDumpReader(dump_files[kind], num_processes=2, batch_size=500)
+    reader.run(lambda items: None, handler_receives_batch=True, verbose=False)
+
+    progress = reader.progress.stats()
+    assert progress["percent"] == 100.0
+    assert progress["bytes_read"] == progress["total_bytes"]
+    assert progress["series"]
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.gzipIndex import GzipIndex, iter_range_lines
+from src.WikidataDumpReader import WikidataDumpReader
+
+SPACING = 64 * 1024
+
+
+def read_ranges(index):
+    lines = []
+    for point, end_offset in index.ranges():
+        chunks = index.iter_chunks(point)
+        lines.extend(iter_range_lines(chunks, point.uncompressed_offset, end_offset, point.line_start))
+    return lines
+
+
+@pytest.mark.parametrize("name", ["gz", "multi_gz"])
+def test_ranges_cover_every_line_once(dump_files, dump_data, name):
+    index = GzipIndex.build(dump_files[name], spacing=SPACING, show_progress=False)
+
+    assert len(index.points) > 4
+    assert b"".join(read_ranges(index)) == dump_data
+
+
+@pytest.mark.parametrize("name", ["gz", "multi_gz"])
+def test_access_points_restart_decompression(dump_files, dump_data, name):
+    index = GzipIndex.build(dump_files[name], spacing=SPACING, show_progress=False)
+
+    for point in index.points:
+        chunks = index.iter_chunks(point)
+        head = next(chunks)
+        chunks.close()
+        start = point.uncompressed_offset
+        assert head == dump_data[start:start + len(head)]
+        assert point.line_start == (start == 0 or dump_data[start - 1:start] == b"\n")
+
+
+def test_save_and_load(dump_files, tmp_path):
+    index = GzipIndex.build(dump_files["gz"], spacing=SPACING, show_progress=False)
+    index_path = str(tmp_path / "dump.gzindex")
+    index.save(index_path)
+
+    loaded = GzipIndex.load(dump_files["gz"], index_path)
+
+    assert loaded.points == index.points
+    assert loaded.spacing == SPACING
+
+
+def test_load_rejects_stale_index(dump_files, tmp_path):
+    index_path = str(tmp_path / "dump.gzindex")
+    GzipIndex.build(dump_files["gz"], spacing=SPACING, show_progress=False).save(index_path)
+    stat = os.stat(dump_files["gz"])
+    os.utime(dump_files["gz"], (stat.st_atime, stat.st_mtime + 10))
+    try:
+        assert GzipIndex.load(dump_files["gz"], index_path) is None
+    finally:
+        os.utime(dump_files["gz"], (stat.st_atime, stat.st_mtime))
+
+
+def test_compressed_offset_at_is_monotonic(dump_files, dump_data):
+    index = GzipIndex.build(dump_files["gz"], spacing=SPACING, show_progress=False)
+    offsets = [index.compressed_offset_at(pos) for pos in range(0, len(dump_data), len(dump_data) // 50)]
+
+    assert offsets == sorted(offsets)
+    for point in index.points:
+        assert index.compressed_offset_at(point.uncompressed_offset) == point.compressed_offset
+
+
+def test_iter_range_lines_assigns_lines_by_start_offset():
+    data = b"aa\nbbbb\ncc\ndd\n"
+    # A range starting inside "bbbb" leaves that line to the previous range and
+    # keeps "dd" out because it starts at the end offset.
+    chunks = [data[4:7], data[7:]]
+
+    assert list(iter_range_lines(iter(chunks), 4, 11, line_start=False)) == [b"cc\n"]
+    assert list(iter_range_lines(iter([data]), 0, 3, line_start=True)) == [b"aa\n"]
+    assert list(iter_range_lines(iter([data + b"ee"]), 0, None, line_start=True))[-1] == b"ee"
+
+
+@pytest.mark.parametrize("name", ["gz", "multi_gz"])
+def test_parallel_producers_read_every_entity_once(dump_files, dump_entities, id_log, name):
+    reader = WikidataDumpReader(
+        dump_files[name], num_processes=2, batch_size=200, num_producers=3, index_spacing=SPACING
+    )
+    reader.run(lambda items: log_ids(id_log, items), handler_receives_batch=True, verbose=False)
+
+    ids = read_ids(id_log)
+    assert sorted(ids) == sorted(entity["id"] for entity in dump_entities)
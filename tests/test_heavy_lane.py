@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.deadLetter import DeadLetterStore
+from src.runTelemetry import process_rss_bytes
+from src.WikidataDumpReader import WikidataDumpReader
+
+HEAVY_LINE_BYTES = 320
+
+
+@pytest.fixture(scope="module")
+def heavy_ids(dump_data):
+    """IDs of the entities whose dump line (with its separator) is heavy."""
+    return {
+        line.split(b'"id":"', 1)[1].split(b'"', 1)[0].decode()
+        for line in dump_data.splitlines(keepends=True)
+        if len(line) >= HEAVY_LINE_BYTES
+    }
+
+
+@pytest.mark.parametrize("options", [
+    pytest.param({}, id="queue"),
+    pytest.param({"transport": "shm"}, id="shm"),
+])
+def test_heavy_lines_are_routed_alone_to_the_heavy_lane(dump_files, dump_entities, heavy_ids, id_log, tmp_path, options):
+    singles_log = str(tmp_path / "singles.log")
+
+    def handler(items):
+        log_ids(id_log, items)
+        if len(items) == 1:
+            log_ids(singles_log, items)
+
+    reader = WikidataDumpReader(
+        dump_files["json"], num_processes=2, batch_size=200, heavy_line_bytes=HEAVY_LINE_BYTES,
+        heavy_processes=2, **options
+    )
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    assert 0 < len(heavy_ids) < len(dump_entities)
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert heavy_ids <= set(read_ids(singles_log))
+    assert reader.heavy_entities.value == len(heavy_ids)
+
+
+def test_heavy_consumer_above_its_memory_limit_is_restarted(dump_files, dump_entities, heavy_ids, id_log, tmp_path):
+    oversized = min(heavy_ids)
+
+    def handler(items):
+        if any(item["id"] == oversized for item in items):
+            ballast = b"x" * (400 * 2**20)
+            time.sleep(2)
+            del ballast
+        log_ids(id_log, items)
+
+    store = DeadLetterStore(str(tmp_path / "dead_letter"), "stage")
+    reader = WikidataDumpReader(
+        dump_files["json"], num_processes=2, batch_size=200, heavy_line_bytes=HEAVY_LINE_BYTES,
+        heavy_memory_bytes=process_rss_bytes(os.getpid()) + 200 * 2**20,
+    )
+    reader.run(
+        handler, handler_receives_batch=True, verbose=False, dead_letter=store,
+        max_consumer_restarts=3, max_batch_attempts=2,
+    )
+
+    assert [record["id"] for record in store.iter_records()] == [oversized]
+    assert reader.consumer_restarts.value == 2
+    assert reader.crashed_batches.value == 1
+    assert sorted(read_ids(id_log) + [oversized]) == sorted(entity["id"] for entity in dump_entities)
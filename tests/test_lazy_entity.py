@@ -0,0 +1,91 @@
+import orjson
+import pytest
+
+from src.lazyEntity import LazyClaims, LazyEntity, materialize_entity, parse_lazy_entity
+
+
+def statement(pid, value, first_key="mainsnak", qualifiers=None):
+    body = {
+        "mainsnak": {"snaktype": "value", "property": pid, "datavalue": {"value": value}},
+        "type": "statement",
+        "rank": "normal",
+    }
+    if qualifiers:
+        body["qualifiers"] = qualifiers
+    if first_key != "mainsnak":
+        body = {first_key: f"{pid}$guid", **body}
+    return body
+
+
+CLAIMS = {
+    "P31": [statement("P31", {"id": "Q5"}, qualifiers={"P580": [{"property": "P580"}]})],
+    "P569": [statement("P569", {"time": "+1952-03-11"}), statement("P569", {"time": "+1952-03-12"})],
+    "P735": [statement("P735", {"id": "Q4"})],
+}
+
+
+def entity_line(claims, after_claims=True):
+    entity = {"type": "item", "id": "Q42", "labels": {"en": {"value": 'Douglas "claims": Adams'}}}
+    entity["claims"] = claims
+    if after_claims:
+        entity["sitelinks"] = {"enwiki": {"title": "Douglas Adams"}}
+    return orjson.dumps(entity)
+
+
+@pytest.mark.parametrize("after_claims", [True, False])
+def test_lazy_entity_matches_full_parse(after_claims):
+    line = entity_line(CLAIMS, after_claims)
+    entity = parse_lazy_entity(line)
+
+    assert isinstance(entity, LazyEntity)
+    assert isinstance(entity["claims"], LazyClaims)
+    assert entity["labels"] == {"en": {"value": 'Douglas "claims": Adams'}}
+    assert materialize_entity(entity) == orjson.loads(line)
+
+
+def test_single_properties_are_parsed_on_their_own():
+    claims = parse_lazy_entity(entity_line(CLAIMS))["claims"]
+
+    for pid, statements in CLAIMS.items():
+        assert claims.get(pid) == statements
+        assert pid in claims
+    assert len(claims) == len(CLAIMS)
+    # Qualifier properties are not top-level properties.
+    assert claims.get("P580") is None
+    assert "P999" not in claims
+    assert claims._claims is None
+
+    assert sorted(claims) == sorted(CLAIMS)
+    assert claims._claims is not None
+
+
+def test_statements_without_leading_mainsnak_fall_back_to_full_parse():
+    claims = dict(CLAIMS)
+    claims["P106"] = [statement("P106", {"id": "Q36180"}, first_key="id")]
+    lazy = parse_lazy_entity(entity_line(claims))["claims"]
+
+    assert lazy.get("P106") == claims["P106"]
+    assert len(lazy) == len(claims)
+
+
+def test_len_falls_back_to_full_parse():
+    claims = {"P106": [statement("P106", {"id": "Q36180"}, first_key="id")]}
+    lazy = parse_lazy_entity(entity_line(claims))["claims"]
+
+    assert len(lazy) == 1
+    assert lazy.get("P106") == claims["P106"]
+
+
+def test_lines_without_compact_claims_are_parsed_fully():
+    assert type(parse_lazy_entity(b'{"id":"Q1","labels":{}}')) is dict
+    assert parse_lazy_entity(b'{"id":"Q1", "claims": {}}') == {"id": "Q1", "claims": {}}
+
+
+def test_invalid_json_raises():
+    with pytest.raises(orjson.JSONDecodeError):
+        parse_lazy_entity(b'{"id":"Q1","labels":{,"claims":{}}')
+
+    # Malformed claims are only found once they are parsed.
+    claims = parse_lazy_entity(b'{"id":"Q1","claims":{"P31":[}}')["claims"]
+    with pytest.raises(orjson.JSONDecodeError):
+        claims.materialize()
@@ -0,0 +1,77 @@
+import os
+import re
+
+from src.WikidataDumpReader import WikidataDumpReader
+from src.metricsExport import MetricsExporter, SPAN_OCTAVES, _labels, _number
+from src.runStats import RunStatsTracker
+
+
+def metric_values(text):
+    """Maps every sample line of an exposition to its value."""
+    return {
+        line.rsplit(" ", 1)[0]: line.rsplit(" ", 1)[1]
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_labels_and_numbers_are_escaped():
+    assert _labels(stage="vectordb_en", scope='a"b\\c\nd') == '{stage="vectordb_en",scope="a\\"b\\\\c\\nd"}'
+    assert _number(3) == "3"
+    assert _number(True) == "1"
+    assert _number(0.25) == "0.25"
+    assert _number(float("inf")) == "+Inf"
+
+
+def test_stage_counters_and_span_histograms_are_rendered(tmp_path):
+    tracker = RunStatsTracker(str(tmp_path / "stats.json"), {})
+    tracker.watch_stage("labels")
+    tracker.start_counters(["items"]).add("items", 7)
+    tracker.start_counters(["rows"], scope="hf").add("rows", 3)
+    timers = tracker.start_timers(["write"])
+    for seconds in (0.0015, 0.003, 2.0):
+        timers.add("write", seconds)
+    timers.flush()
+
+    text = MetricsExporter(tracker).render()
+    values = metric_values(text)
+
+    assert "# TYPE wikidata_stage_counter_total counter" in text
+    assert "# TYPE wikidata_span_seconds histogram" in text
+    assert values['wikidata_stage_counter_total{stage="labels",scope="stage",counter="items"}'] == "7"
+    assert values['wikidata_stage_counter_total{stage="labels",scope="hf",counter="rows"}'] == "3"
+
+    span = 'stage="labels",scope="stage",span="write"'
+    buckets = [
+        (float(le), int(value)) for le, value in
+        re.findall(r'wikidata_span_seconds_bucket\{' + span + r',le="([^"]+)"\} (\d+)', text)
+    ]
+    assert len(buckets) == SPAN_OCTAVES + 1
+    assert [count for _, count in buckets] == sorted(count for _, count in buckets)
+    assert buckets[-1] == (float("inf"), 3)
+    assert max(count for le, count in buckets if le <= 0.001) == 0
+    assert min(count for le, count in buckets if le >= 0.004) == 2
+    assert min(count for le, count in buckets if le >= 2.1) == 3
+    assert values[f"wikidata_span_seconds_count{{{span}}}"] == "3"
+    assert abs(float(values[f"wikidata_span_seconds_sum{{{span}}}"]) - 2.0045) < 1e-9
+
+
+def test_reader_metrics_are_written_to_the_textfile(dump_files, dump_entities, tmp_path):
+    tracker = RunStatsTracker(str(tmp_path / "stats.json"), {})
+    tracker.watch_stage("wd_to_hf")
+    textfile = tmp_path / "metrics" / "wikidata.prom"
+
+    reader = WikidataDumpReader(
+        dump_files["gz"], num_processes=2, batch_size=500,
+        metrics=MetricsExporter(tracker, textfile_path=str(textfile)),
+    )
+    reader.run(lambda items: None, handler_receives_batch=True, verbose=False)
+
+    text = textfile.read_text()
+    values = metric_values(text)
+    assert "# TYPE wikidata_reader_entities_processed_total counter" in text
+    assert "# TYPE wikidata_reader_queue_fill gauge" in text
+    assert values['wikidata_reader_entities_processed_total{stage="wd_to_hf"}'] == str(len(dump_entities))
+    assert values['wikidata_reader_handler_errors_total{stage="wd_to_hf"}'] == "0"
+    dump_size = str(os.path.getsize(dump_files["gz"]))
+    assert values['wikidata_dump_size_bytes{stage="wd_to_hf"}'] == dump_size
+    assert values['wikidata_dump_read_bytes{stage="wd_to_hf"}'] == dump_size
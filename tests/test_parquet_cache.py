@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+from src.wikidataParquetCache import WikidataParquetCache
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def parquet_cache(dump_files, tmp_path_factory):
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=500)
+    return WikidataParquetCache.build(
+        reader, str(tmp_path_factory.mktemp("cache")), row_group_size=1000, rows_per_shard=5000, verbose=False
+    )
+
+
+def test_cache_holds_every_entity(parquet_cache, dump_entities):
+    assert parquet_cache.manifest["num_rows"] == len(dump_entities)
+    assert WikidataParquetCache.is_cache(parquet_cache.cache_dir)
+
+
+def test_row_groups_are_handled_in_batches(parquet_cache, dump_entities, id_log, tmp_path):
+    sizes_log = str(tmp_path / "sizes.log")
+
+    def handler(items):
+        log_ids(id_log, items)
+        log_ids(sizes_log, [{"id": len(items)}])
+
+    reader = WikidataDumpReader(parquet_cache.cache_dir, num_processes=2, batch_size=64, columns=["labels"])
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert max(int(size) for size in read_ids(sizes_log)) == 64
+
+
+def test_rows_rebuild_the_projected_fields(parquet_cache, dump_entities):
+    task = parquet_cache.row_groups()[0]
+    entities = parquet_cache.read_entities(task, columns=["labels", "sitelinks"])
+    by_id = {entity["id"]: entity for entity in dump_entities}
+
+    for entity in entities:
+        original = by_id[entity["id"]]
+        assert entity["labels"] == original["labels"]
+        assert set(entity["sitelinks"]) == set(original.get("sitelinks", {}))
+
+
+def test_pipeline_refuses_a_cache_as_dump(parquet_cache, monkeypatch):
+    main = pytest.importorskip("main")
+    monkeypatch.setattr(main, "DUMP_PATH", parquet_cache.cache_dir)
+    monkeypatch.setattr(main, "check_wdtextifier_stack", lambda: None)
+
+    with pytest.raises(ValueError, match="Parquet dump cache"):
+        main.create_dump_reader()
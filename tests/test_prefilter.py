@@ -0,0 +1,76 @@
+import itertools
+import random
+
+import orjson
+import pytest
+
+from conftest import log_ids, read_ids
+from src.WikidataDumpReader import WikidataDumpReader
+from src.WikidataFilter import WikidataItemFilter
+
+LABEL_LANGS = [(), ("en",), ("de",), ("mul",), ("fr",), ("en-gb",), ("fr", "de")]
+SITELINKS = [{}, {"enwiki": {}}, {"commonswiki": {}}, {"enwikiquote": {}}, {"dewiki": {}, "frwikivoyage": {}}]
+
+
+def make_entities():
+    rng = random.Random(7)
+    for n, (kind, labels, descriptions, sitelinks, claims) in enumerate(itertools.product(
+        ("Q", "P"),
+        LABEL_LANGS,
+        ((), ("en",), ("de",)),
+        SITELINKS,
+        ({}, {"P31": [{"mainsnak": {"datavalue": {"value": {"id": rng.choice(["Q5", "Q4167410"])}}},
+                       "rank": rng.choice(["normal", "deprecated"])}]}),
+    )):
+        yield {
+            "type": "property" if kind == "P" else "item",
+            "id": f"{kind}{n}",
+            "labels": {lang: {"language": lang, "value": f"label {n}"} for lang in labels},
+            "descriptions": {lang: {"language": lang, "value": "wiki\" text"} for lang in descriptions},
+            "claims": claims,
+            "sitelinks": sitelinks,
+        }
+
+
+@pytest.mark.parametrize("lang,fallback_lang", [("en", None), ("en", "de"), ("fr", "en")])
+def test_prefilter_never_drops_a_kept_entity(lang, fallback_lang):
+    item_filter = WikidataItemFilter(lang=lang, fallback_lang=fallback_lang)
+    kept = dropped = 0
+    for entity in make_entities():
+        line = orjson.dumps(entity)
+        passes = item_filter.prefilter(line)
+        assert item_filter.prefilter(memoryview(line)) == passes
+        assert item_filter.prefilter(line.decode("utf-8")) == passes
+        if item_filter.filter(entity):
+            assert passes, entity
+            kept += 1
+        elif not passes:
+            dropped += 1
+
+    # The scan must also do its job: drop a good share of the rejected entities.
+    assert kept and dropped
+
+
+def test_prefilter_drops_entities_without_label_or_sitelink():
+    item_filter = WikidataItemFilter(lang="en")
+
+    assert not item_filter.prefilter(b'{"id":"Q1","labels":{"de":{}},"sitelinks":{"enwiki":{}}}')
+    assert not item_filter.prefilter(b'{"id":"Q1","labels":{"en":{}},"sitelinks":{}}')
+    assert item_filter.prefilter(b'{"id":"P1","labels":{"mul":{}},"sitelinks":{}}')
+
+
+def test_reader_with_prefilter_keeps_the_same_entities(dump_files, tmp_path):
+    item_filter = WikidataItemFilter(lang="en")
+    results = {}
+    for line_prefilter in (None, item_filter.prefilter):
+        id_log = str(tmp_path / f"ids_{line_prefilter is None}.log")
+        reader = WikidataDumpReader(dump_files["gz"], num_processes=2, batch_size=200)
+        reader.run(
+            lambda items, id_log=id_log: log_ids(id_log, [item for item in items if item_filter.filter(item)]),
+            handler_receives_batch=True, verbose=False, line_prefilter=line_prefilter,
+        )
+        results[line_prefilter is None] = (sorted(read_ids(id_log)), reader.prefiltered.value)
+
+    (unfiltered_ids, _), (prefiltered_ids, prefiltered) = results[True], results[False]
+    assert prefiltered_ids == unfiltered_ids
+    assert prefiltered > 0
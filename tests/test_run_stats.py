@@ -0,0 +1,75 @@
+import os
+from multiprocessing import get_context
+
+import pytest
+
+from src.WikidataDumpReader import WikidataDumpReader
+from src.runStats import ShardedCounters
+
+ctx = get_context("fork")
+
+
+def add_and_exit(counters, count, crash):
+    for _ in range(count):
+        counters.add("items", 1)
+        counters.add("bytes", 10)
+    if crash:
+        os._exit(1)
+
+
+@pytest.mark.parametrize("crash", [False, True])
+def test_counts_of_exited_processes_are_kept(crash):
+    counters = ShardedCounters(ctx, ["items", "bytes"], num_slots=8)
+    processes = [ctx.Process(target=add_and_exit, args=(counters, 1000, crash)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert counters.read() == {"items": 4000, "bytes": 40000}
+
+
+def test_overflow_processes_flush_when_they_exit():
+    counters = ShardedCounters(ctx, ["items"], num_slots=2, flush_interval_s=3600)
+    processes = [ctx.Process(target=add_and_exit, args=(counters, 100, False)) for _ in range(5)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert counters.next_slot.value == 5
+    assert counters.read() == {"items": 500}
+
+
+def test_overflow_process_crash_loses_its_unflushed_counts():
+    counters = ShardedCounters(ctx, ["items"], num_slots=0, flush_interval_s=3600)
+    process = ctx.Process(target=add_and_exit, args=(counters, 100, True))
+    process.start()
+    process.join()
+
+    # Nothing was flushed within the interval.
+    assert counters.read() == {"items": 0}
+
+
+def test_unknown_names_are_ignored_and_local_counts_are_read():
+    counters = ShardedCounters(ctx, ["items"], num_slots=0)
+    counters.add("items", 3)
+    counters.add("unknown", 5)
+
+    assert counters.read() == {"items": 3}
+
+
+def test_counters_read_after_the_consumers_exit(dump_files, dump_entities):
+    counters = ShardedCounters(ctx, ["entities", "sitelinks"])
+
+    def handler(items):
+        counters.add("entities", len(items))
+        counters.add("sitelinks", sum("sitelinks" in item for item in items))
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=3, batch_size=100)
+    reader.run(handler, handler_receives_batch=True, verbose=False)
+
+    assert counters.read() == {
+        "entities": len(dump_entities),
+        "sitelinks": sum("sitelinks" in entity for entity in dump_entities),
+    }
@@ -0,0 +1,52 @@
+import os
+
+import orjson
+
+from src.runStats import RunStatsTracker
+from src.runTelemetry import RunTelemetry, process_rss_bytes
+
+
+def read_records(path):
+    with open(path, "rb") as f_in:
+        return [orjson.loads(line) for line in f_in]
+
+
+def test_process_rss_bytes():
+    assert process_rss_bytes(os.getpid()) > 0
+    assert process_rss_bytes(2**22 + 1) is None
+
+
+def test_file_is_rotated_at_max_bytes(tmp_path):
+    tracker = RunStatsTracker(str(tmp_path / "stats.json"), {})
+    path = str(tmp_path / "telemetry.jsonl")
+    telemetry = RunTelemetry(tracker, path, interval_s=3600, max_bytes=2000, backups=2)
+    telemetry.start()
+    records = [telemetry.sample() for _ in range(40)]
+    for record in records:
+        telemetry._write(record)
+    telemetry.stop()
+
+    assert sorted(os.listdir(tmp_path)) == ["telemetry.jsonl", "telemetry.jsonl.1", "telemetry.jsonl.2"]
+    for name in os.listdir(tmp_path):
+        assert 0 < os.path.getsize(tmp_path / name) <= 2000
+    # The newest records are kept, in order, across the files.
+    kept = read_records(f"{path}.2") + read_records(f"{path}.1") + read_records(path)
+    assert kept[:-1] == records[-len(kept) + 1:]
+
+
+def test_rates_are_computed_per_stage(tmp_path):
+    tracker = RunStatsTracker(str(tmp_path / "stats.json"), {})
+    telemetry = RunTelemetry(tracker, str(tmp_path / "telemetry.jsonl"))
+    tracker.watch_stage("labels")
+    counters = tracker.start_counters(["items"])
+
+    first = telemetry.sample()
+    counters.add("items", 50)
+    second = telemetry.sample()
+    tracker.watch_stage("wd_to_hf")
+    third = telemetry.sample()
+
+    assert "counter_rates" not in first
+    assert second["counters"] == {"stage": {"items": 50}}
+    assert second["counter_rates"]["stage"]["items"] > 0
+    assert "counter_rates" not in third
@@ -0,0 +1,57 @@
+import hashlib
+import time
+
+from src.samplingProfiler import SamplingProfiler
+
+
+def hash_data(data):
+    return hashlib.sha256(data).digest()
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def samples_of(profiler, name):
+    return sum(count for stack, count in profiler.stacks.items() if f";{name} (" in stack)
+
+
+def test_native_calls_are_sampled_for_their_duration():
+    data = b"x" * (256 * 2**20)
+    profiler = SamplingProfiler(0.01, root="test")
+    profiler.start()
+    start = time.perf_counter()
+    hash_data(data)
+    native_s = time.perf_counter() - start
+    spin(native_s)
+    profiler.stop()
+
+    native = samples_of(profiler, "hash_data")
+    python = samples_of(profiler, "spin")
+    assert python >= 5
+    assert native >= python / 2
+    assert all(stack.startswith("test;") for stack in profiler.stacks)
+
+
+def test_stop_ends_sampling():
+    profiler = SamplingProfiler(0.005)
+    profiler.start()
+    spin(0.05)
+    profiler.stop()
+    samples = sum(profiler.stacks.values())
+    spin(0.05)
+
+    assert samples > 0
+    assert sum(profiler.stacks.values()) == samples
+
+
+def test_merge(tmp_path):
+    first, second = tmp_path / "1.collapsed", tmp_path / "2.collapsed"
+    first.write_text("a;b 3\na;c 1\n")
+    second.write_text("a;b 2\n")
+    output = tmp_path / "out" / "merged.collapsed"
+
+    assert SamplingProfiler.merge([str(first), str(second)], str(output)) == 6
+    assert output.read_text() == "a;b 5\na;c 1\n"
@@ -0,0 +1,90 @@
+from multiprocessing import get_context
+from queue import Empty
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.lockedPipe import LockedPipe
+from src.sharedMemoryRing import SharedMemoryRing
+from src.WikidataDumpReader import WikidataDumpReader
+
+
+@pytest.fixture
+def ring():
+    ring = SharedMemoryRing(get_context("fork"), num_slots=4, slot_size=1024)
+    yield ring
+    ring.close()
+
+
+def take_all(ring, count):
+    batches = []
+    for _ in range(count):
+        token, lines, meta = ring.get(block=False)
+        batches.append(([bytes(line) for line in lines], meta))
+        ring.release(token)
+    return batches
+
+
+def test_round_trip(ring):
+    lines = [b'{"id":"Q%d"}' % i for i in range(10)]
+    ring.put_lines(lines, meta=("segment", 0))
+
+    assert take_all(ring, 1) == [(lines, ("segment", 0))]
+    with pytest.raises(Empty):
+        ring.get(block=False)
+    assert ring.stats()["depth"] == 0
+
+
+def test_batch_larger_than_a_slot_is_split(ring):
+    lines = [bytes([65 + i % 26]) * 200 for i in range(12)]
+    groups = ring.split_lines(lines)
+    ring.put_lines(lines, meta="m")
+
+    batches = take_all(ring, len(groups))
+    assert len(groups) > 1
+    assert [line for group, _ in batches for line in group] == lines
+    assert {meta for _, meta in batches} == {"m"}
+    assert ring.stats()["oversized_batches"] == 0
+
+
+def test_line_larger_than_a_slot_goes_through_the_pipe(ring):
+    big = b"x" * 5000
+    ring.put_lines([b"small", big, b"tail"])
+
+    batches = take_all(ring, 3)
+    assert [lines for lines, _ in batches] == [[b"small"], [big], [b"tail"]]
+    assert ring.stats()["oversized_batches"] == 1
+
+
+def test_slots_are_reused(ring):
+    for i in range(20):
+        ring.put_lines([b"%d" % i])
+        assert take_all(ring, 1) == [([b"%d" % i], None)]
+    assert ring.stats()["max_depth"] == 1
+
+
+def test_sentinel(ring):
+    ring.put_sentinel()
+    assert ring.get() is None
+
+
+def test_locked_pipe_get_nowait_skips_a_held_lock():
+    pipe = LockedPipe(get_context("fork"))
+    pipe.put(1)
+    with pipe.read_lock:
+        with pytest.raises(Empty):
+            pipe.get(block=False)
+    assert pipe.get(block=False) == 1
+    assert pipe.empty()
+
+
+@pytest.mark.parametrize("slot_size", [16 * 1024, 320], ids=["slots", "oversized-lines"])
+def test_reader_over_shm_handles_every_entity(dump_files, dump_entities, id_log, slot_size):
+    reader = WikidataDumpReader(
+        dump_files["gz"], num_processes=3, batch_size=200, transport="shm", queue_size=4, slot_size=slot_size
+    )
+    reader.run(lambda items: log_ids(id_log, items), handler_receives_batch=True, verbose=False)
+
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert reader.transport_stats["num_slots"] == 4
+    assert (reader.transport_stats["oversized_batches"] > 0) == (slot_size < 1024)
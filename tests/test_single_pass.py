@@ -0,0 +1,86 @@
+import pytest
+
+from conftest import log_ids, read_ids
+from src.deadLetter import DeadLetterStore
+from src.runStats import RunStatsTracker
+
+main = pytest.importorskip("main")
+
+FAILING_ID = "Q12345"
+
+
+class Client:
+    """Stands in for the HF, AstraDB, Jina and cache clients of a stage."""
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def single_pass(dump_files, tmp_path, monkeypatch):
+    """A single pass over the test dump with a HF sink and fr/de vector sinks logging what they get."""
+    handled = str(tmp_path / "handled.log")
+
+    def push_to_hf(items):
+        log_ids(handled, [{"id": f"wd_to_hf:{main.LANG}:{item['id']}"} for item in items])
+        main.STATS_TRACKER.counter_add("wd_hf_rows", len(items))
+
+    def push_to_vectorDB(items, label_factory=None):
+        if main.LANG == "fr" and any(item["id"] == FAILING_ID for item in items):
+            raise ValueError("vector sink failed")
+        log_ids(handled, [{"id": f"vectordb:{main.LANG}:{item['id']}"} for item in items])
+        main.STATS_TRACKER.counter_add("vector_input_items", len(items))
+
+    monkeypatch.setattr(main, "DUMP_PATH", dump_files["json"])
+    monkeypatch.setattr(main, "NUM_PROCESSES", 2)
+    monkeypatch.setattr(main, "READER_BATCH_SIZE", 200)
+    monkeypatch.setattr(main, "DEAD_LETTER_DIR", str(tmp_path / "dead_letter"))
+    monkeypatch.setattr(main, "CHECKPOINT_DIR", "")
+    monkeypatch.setattr(main, "STATS_TRACKER", RunStatsTracker(str(tmp_path / "stats.json"), {}))
+    monkeypatch.setattr(main, "SAVE_WD_TO_HF", True)
+    monkeypatch.setattr(main, "SAVE_TO_VECTORDB", True)
+    monkeypatch.setattr(main, "DELETE_STALE_VECTORS", False)
+    for name in ("WD_LANG", "WD_FALLBACK_LANG", "LANG", "FALLBACK_LANG"):
+        monkeypatch.setattr(main, name, "en")
+    monkeypatch.setattr(main, "WD_LANGS", ("fr", "de"))
+    monkeypatch.setattr(main, "check_wdtextifier_stack", lambda: None)
+    monkeypatch.setattr(main, "preload_text_state", lambda: None)
+    monkeypatch.setattr(main, "init_worker", lambda enable_vector=False: None)
+    monkeypatch.setattr(main, "push_to_hf", push_to_hf)
+    monkeypatch.setattr(main, "push_to_vectorDB", push_to_vectorDB)
+    for client in ("WikidataHFDatasetPublisher", "WikidataItemFilter", "WikidataVectorCache",
+                   "AstraDBConnect", "JinaAIAPIEmbedder"):
+        monkeypatch.setattr(main, client, Client)
+
+    main.run_single_pass_stage()
+    return read_ids(handled)
+
+
+def test_every_sink_gets_every_entity_in_its_language(single_pass, dump_entities):
+    ids = sorted(entity["id"] for entity in dump_entities)
+    by_sink = {}
+    for record in single_pass:
+        sink, lang, entity_id = record.split(":")
+        by_sink.setdefault((sink, lang), []).append(entity_id)
+
+    assert sorted(by_sink) == [("vectordb", "de"), ("vectordb", "fr"), ("wd_to_hf", "en")]
+    assert sorted(by_sink[("wd_to_hf", "en")]) == ids
+    assert sorted(by_sink[("vectordb", "de")]) == ids
+    assert sorted(by_sink[("vectordb", "fr")]) == [entity_id for entity_id in ids if entity_id != FAILING_ID]
+
+
+def test_a_failing_sink_only_dead_letters_its_own_entities(single_pass, dump_entities):
+    assert DeadLetterStore.stages(main.DEAD_LETTER_DIR) == ["vectordb_fr"]
+    records = list(DeadLetterStore(main.DEAD_LETTER_DIR, "vectordb_fr").iter_records())
+    assert [record["id"] for record in records] == [FAILING_ID]
+
+    stats = main.STATS_TRACKER.stats
+    vectordb = {lang: stats["stages"]["vectors_by_language"][lang]["vectordb"] for lang in ("fr", "de")}
+    assert stats["stages"]["wd_to_hf"]["wd_hf_rows"] == len(dump_entities)
+    assert stats["stages"]["wd_to_hf"]["handler_errors"] == 0
+    assert vectordb["de"]["vector_input_items"] == len(dump_entities)
+    assert vectordb["fr"]["vector_input_items"] == len(dump_entities) - 1
+    assert vectordb["fr"]["handler_errors"] > 0
+    assert stats["errors"]["by_stage"] == {"vectordb:fr": vectordb["fr"]["handler_errors"]}
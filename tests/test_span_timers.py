@@ -0,0 +1,52 @@
+from multiprocessing import get_context
+
+import pytest
+
+from src.spanTimers import SpanHistograms
+
+ctx = get_context("fork")
+
+
+def test_quantiles_are_within_a_bucket():
+    timers = SpanHistograms(ctx, ["embed", "write"])
+    for ms in range(1, 1001):
+        timers.add("embed", ms / 1000)
+    timers.add("unknown", 1.0)
+
+    summary = timers.summary()
+    assert list(summary) == ["embed"]
+    stats = summary["embed"]
+    assert stats["count"] == 1000
+    assert stats["total_s"] == pytest.approx(500.5, abs=1e-3)
+    for key, expected in (("p50_ms", 500), ("p95_ms", 950), ("p99_ms", 990), ("max_ms", 1000)):
+        assert stats[key] == pytest.approx(expected, rel=0.1)
+
+
+def test_span_times_a_block():
+    timers = SpanHistograms(ctx, ["block"])
+    with timers.span("block"):
+        pass
+    with pytest.raises(ValueError):
+        with timers.span("block"):
+            raise ValueError
+
+    assert timers.summary()["block"]["count"] == 2
+
+
+def add_spans(timers, count):
+    for _ in range(count):
+        timers.add("write", 0.002)
+
+
+def test_forked_processes_merge_when_they_exit():
+    timers = SpanHistograms(ctx, ["write"], flush_interval_s=3600)
+    processes = [ctx.Process(target=add_spans, args=(timers, 250)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    stats = timers.summary()["write"]
+    assert stats["count"] == 1000
+    assert stats["total_s"] == pytest.approx(2.0)
+    assert stats["p50_ms"] == pytest.approx(2, rel=0.1)
@@ -0,0 +1,128 @@
+import os
+import time
+
+import pytest
+
+from conftest import log_ids, read_ids
+from src.deadLetter import DeadLetterStore
+from src.WikidataDumpReader import WikidataDumpReader
+
+CRASH_ID = "Q12345"
+
+
+def crash_once(id_log, marker):
+    """Handler whose consumer dies (as on an OOM kill) the first time it sees CRASH_ID."""
+    def handler(items):
+        if any(item["id"] == CRASH_ID for item in items):
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                pass
+            else:
+                os._exit(9)
+        log_ids(id_log, items)
+    return handler
+
+
+@pytest.mark.parametrize("options", [
+    pytest.param({}, id="queue"),
+    pytest.param({"transport": "shm"}, id="shm"),
+    pytest.param({"num_producers": 2}, id="parallel-producers"),
+])
+def test_crashed_consumer_is_restarted_with_its_batch(dump_files, dump_entities, id_log, tmp_path, options):
+    reader = WikidataDumpReader(dump_files["gz"], num_processes=2, batch_size=200, index_spacing=256 * 1024, **options)
+    reader.run(
+        crash_once(id_log, str(tmp_path / "crashed")), handler_receives_batch=True, verbose=False,
+        max_consumer_restarts=2,
+    )
+
+    assert sorted(read_ids(id_log)) == sorted(entity["id"] for entity in dump_entities)
+    assert reader.consumer_restarts.value == 1
+    assert reader.crashed_batches.value == 0
+
+
+def test_threaded_consumer_is_restarted(dump_files, dump_entities, id_log, tmp_path):
+    marker = str(tmp_path / "crashed")
+
+    def handler(items):
+        if any(item["id"] == CRASH_ID for item in items):
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                pass
+            else:
+                # Escapes the handler's error handling and fails the whole consumer.
+                raise SystemExit(9)
+        log_ids(id_log, items)
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200, threads_per_consumer=4)
+    reader.run(handler, handler_receives_batch=True, verbose=False, max_consumer_restarts=2)
+
+    # Batches of the other threads of the crashed consumer are handled again.
+    assert set(read_ids(id_log)) == {entity["id"] for entity in dump_entities}
+    assert reader.consumer_restarts.value == 1
+
+
+def test_batch_crashing_every_consumer_is_given_up(dump_files, dump_entities, id_log, tmp_path):
+    def handler(items):
+        if any(item["id"] == CRASH_ID for item in items):
+            os._exit(9)
+        log_ids(id_log, items)
+
+    store = DeadLetterStore(str(tmp_path / "dead_letter"), "stage")
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    reader.run(
+        handler, handler_receives_batch=True, verbose=False, dead_letter=store,
+        max_consumer_restarts=5, max_batch_attempts=2,
+    )
+
+    dead = {record["id"] for record in store.iter_records()}
+    handled = read_ids(id_log)
+    assert CRASH_ID in dead
+    assert reader.crashed_batches.value == 1
+    assert reader.consumer_restarts.value == 2
+    assert reader.handler_errors.value == len(dead)
+    assert sorted(handled + sorted(dead)) == sorted(entity["id"] for entity in dump_entities)
+
+
+def test_run_fails_once_the_restart_budget_is_used(dump_files):
+    def handler(items):
+        os._exit(9)
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=2, batch_size=200)
+    with pytest.raises(RuntimeError, match="restart budget"):
+        reader.run(handler, handler_receives_batch=True, verbose=False, max_consumer_restarts=2)
+
+
+class QuickCheckReader(WikidataDumpReader):
+    def _check_transport(self, timeout_s=30):
+        super()._check_transport(timeout_s=1)
+
+
+@pytest.mark.parametrize("transport", ["queue", "shm"])
+def test_consumer_killed_holding_the_queue_lock_fails_the_run(dump_files, transport):
+    reader = QuickCheckReader(dump_files["json"], num_processes=2, batch_size=200, transport=transport)
+
+    def handler(items):
+        if any(item["id"] == CRASH_ID for item in items):
+            # Die as if killed while reading a batch.
+            if reader.ring is not None:
+                reader.ring.ready_slots.read_lock.acquire()
+            else:
+                reader.queue_lock.acquire()
+            os._exit(9)
+
+    with pytest.raises(RuntimeError, match="locked"):
+        reader.run(handler, handler_receives_batch=True, verbose=False, max_consumer_restarts=2)
+
+
+def test_stalled_pass_fails(dump_files):
+    def handler(items):
+        if any(item["id"] == CRASH_ID for item in items):
+            time.sleep(60)
+
+    reader = WikidataDumpReader(dump_files["json"], num_processes=1, batch_size=200, stall_timeout_s=1)
+    start = time.time()
+    with pytest.raises(RuntimeError, match="No progress"):
+        reader.run(handler, handler_receives_batch=True, verbose=False, max_consumer_restarts=2)
+    assert time.time() - start < 30